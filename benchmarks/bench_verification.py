@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Throughput of llm_verification.verify_extractions_with_llm against the
+local stand-in server, across batch sizes and concurrency levels:
+
+    python benchmarks/bench_verification.py --rows 400 --latency 0.2
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+
+from llm_stand_in import start_in_background
+from synthetic_posts import generate_posts
+from extractors.llm_verification import initialize_llm_client, verify_extractions_with_llm
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched, concurrent LLM verification")
+    parser.add_argument('--rows', type=int, default=400, help="Synthetic rows (all below the confidence threshold)")
+    parser.add_argument('--latency', type=float, default=0.2, help="Stand-in seconds per request")
+    parser.add_argument('--per-token-latency', type=float, default=0.0005, help="Stand-in seconds per prompt word")
+    parser.add_argument('--parallel', type=int, default=4, help="Requests the stand-in serves at once")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    logging.getLogger('extractors.llm_verification').setLevel(logging.WARNING)
+    server, base_url = start_in_background(latency=args.latency, per_token_latency=args.per_token_latency,
+                                           parallel=args.parallel)
+
+    df = generate_posts(args.rows)
+    df['title_quality_score'] = 0
+    df['approval_status'] = 'approved'
+
+    print(f"{'batch':>6} {'workers':>8} {'seconds':>9} {'rows/s':>9}")
+    for batch_size in args.batch_sizes:
+        for workers in args.concurrency:
+            config = {'base_url': base_url, 'batch_size': batch_size, 'max_concurrent_batches': workers}
+            client = initialize_llm_client(config)
+            start = time.perf_counter()
+            result = verify_extractions_with_llm(df, client, config)
+            elapsed = time.perf_counter() - start
+            assert len(result) == len(df) and result['overall_quality_score'].notna().all()
+            print(f"{batch_size:>6} {workers:>8} {elapsed:>9.2f} {len(df) / elapsed:>9.1f}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
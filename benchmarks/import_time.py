@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the CLI and the pipeline modules.
+
+Each target runs in a fresh interpreter, so the numbers include every
+import it triggers:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 10 --budget-ms 150
+
+`cli.py --help` and `cli.py report` should stay within the budget; the
+module imports show what a subcommand pays once it needs pandas, PRAW or
+requests. For a per-module breakdown of one target run
+`python -X importtime cli.py --help`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SRC_DIR = os.path.join(REPO_DIR, 'src')
+CLI = os.path.join(REPO_DIR, 'cli.py')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+def _import(module):
+    return [sys.executable, '-c', f"import sys; sys.path.insert(0, {SRC_DIR!r}); import {module}"]
+
+
+# Targets expected to start fast are checked against --budget-ms
+TARGETS = {
+    'python': ([sys.executable, '-c', 'pass'], False),
+    'cli --help': ([sys.executable, CLI, '--help'], True),
+    'cli report': ([sys.executable, CLI, 'report'], True),
+    'cli scrape --help': ([sys.executable, CLI, 'scrape', '--help'], False),
+    'import scrapers.master_scraper': (_import('scrapers.master_scraper'), False),
+    'import extractors.hybrid_extractor': (_import('extractors.hybrid_extractor'), False),
+    'import extractors.llm_verification': (_import('extractors.llm_verification'), False),
+}
+
+
+def time_command(command, repeat, cwd):
+    """Median and best wall time (ms) of a command over `repeat` runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 1),
+        'best_ms': round(min(timings), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI and module startup times")
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS), help="Commands to time")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per target; the median is reported")
+    parser.add_argument('--budget-ms', type=float, default=200, help="Startup budget for the fast CLI paths (median, ms)")
+    parser.add_argument('--output', default=None, help="Results JSON path (default: benchmarks/results/import_time_<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = []
+    over_budget = []
+    # An empty working directory keeps `report` from picking up real run summaries
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in args.targets:
+            command, budgeted = TARGETS[name]
+            result = {'target': name, **time_command(command, args.repeat, work_dir)}
+            results.append(result)
+            flag = ''
+            if budgeted and result['median_ms'] > args.budget_ms:
+                over_budget.append(name)
+                flag = f"  (over {args.budget_ms:.0f} ms budget)"
+            print(f"  {name}: {result['median_ms']:.1f} ms median, {result['best_ms']:.1f} ms best{flag}")
+
+    output_file = args.output
+    if output_file is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_file = os.path.join(RESULTS_DIR, f'import_time_{timestamp}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+
+    with open(output_file, 'w') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'budget_ms': args.budget_ms,
+            'results': results
+        }, f, indent=2)
+    print(f"\nResults saved to: {output_file}")
+
+    if over_budget:
+        sys.exit(f"Over startup budget: {', '.join(over_budget)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the extraction pipeline.
+
+Times the main file-to-file entry points on deterministic synthetic posts:
+
+    python benchmarks/run_benchmarks.py --sizes 10000 100000
+    python benchmarks/run_benchmarks.py --sizes 10000 --profile cprofile
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/baseline.json
+
+Results are written as JSON under benchmarks/results/ and, when a baseline
+is given, compared target by target. The cProfile mode writes one .prof file
+per target/size (open with snakeviz or `python -m pstats`); for sampling
+profiles run the same command under `py-spy record -- python ...`.
+"""
+
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'src', 'extractors'))
+
+from synthetic_posts import write_posts
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+def _target_title_focused(input_file, work_dir):
+    from title_focused_extractor import extract_fields_title_focused
+    extract_fields_title_focused(input_file, os.path.join(work_dir, 'title_focused.csv'))
+
+
+def _target_hybrid_rules(input_file, work_dir):
+    from hybrid_extractor import hybrid_extract_fields
+    hybrid_extract_fields(input_file, os.path.join(work_dir, 'hybrid.csv'), use_llm=False)
+
+
+def _target_prepare_model_data(input_file, work_dir):
+    from data_preparer import prepare_model_data
+    prepare_model_data(input_file, os.path.join(work_dir, 'model_ready.csv'))
+
+
+def _target_comprehensive_dataset(input_file, work_dir):
+    from comprehensive_dataset import create_comprehensive_dataset
+    create_comprehensive_dataset(input_file, os.path.join(work_dir, 'comprehensive.csv'))
+
+
+TARGETS = {
+    'extract_fields_title_focused': _target_title_focused,
+    'hybrid_extract_fields_rules': _target_hybrid_rules,
+    'prepare_model_data': _target_prepare_model_data,
+    'create_comprehensive_dataset': _target_comprehensive_dataset
+}
+
+
+def run_target(name, input_file, n_rows, work_dir, repeat=1, profile=None):
+    """Run one target `repeat` times and return timing stats"""
+    func = TARGETS[name]
+    timings = []
+
+    for attempt in range(repeat):
+        profiler = cProfile.Profile() if profile == 'cprofile' else None
+
+        # The extractors print summaries; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            func(input_file, work_dir)
+            if profiler:
+                profiler.disable()
+            timings.append(time.perf_counter() - start)
+
+        if profiler and attempt == 0:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(RESULTS_DIR, f'{name}_{n_rows}.prof'))
+
+    best = min(timings)
+    return {
+        'target': name,
+        'rows': n_rows,
+        'repeat': repeat,
+        'best_seconds': round(best, 4),
+        'mean_seconds': round(sum(timings) / len(timings), 4),
+        'rows_per_second': round(n_rows / best, 1) if best > 0 else None
+    }
+
+
+def compare_with_baseline(results, baseline_file):
+    """Print per-target speed ratios against a previous results file"""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+
+    previous = {(r['target'], r['rows']): r for r in baseline['results']}
+    print(f"\nComparison with baseline {baseline_file}:")
+    for result in results:
+        key = (result['target'], result['rows'])
+        if key not in previous:
+            print(f"  {result['target']} @ {result['rows']}: no baseline")
+            continue
+        ratio = result['best_seconds'] / previous[key]['best_seconds']
+        change = 'slower' if ratio > 1 else 'faster'
+        print(f"  {result['target']} @ {result['rows']}: {result['best_seconds']:.3f}s vs "
+              f"{previous[key]['best_seconds']:.3f}s ({ratio:.2f}x, {change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline on synthetic posts")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help="Row counts to benchmark (10k-1M)")
+    parser.add_argument('--targets', nargs='+', choices=sorted(TARGETS), default=list(TARGETS), help="Functions to benchmark")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per target; the best time is reported")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the synthetic post generator")
+    parser.add_argument('--profile', choices=['cprofile'], default=None, help="Write a cProfile .prof file per target")
+    parser.add_argument('--output', default=None, help="Results JSON path (default: benchmarks/results/bench_<timestamp>.json)")
+    parser.add_argument('--baseline', default=None, help="Results JSON to compare against")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The extractors write into data/processed by default; keep that out of the repo
+        previous_cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            for n_rows in args.sizes:
+                input_file = os.path.join(work_dir, f'synthetic_{n_rows}.csv')
+                print(f"Generating {n_rows:,} synthetic posts...")
+                write_posts(input_file, n_rows, args.seed)
+
+                for name in args.targets:
+                    result = run_target(name, input_file, n_rows, work_dir, args.repeat, args.profile)
+                    results.append(result)
+                    print(f"  {name}: {result['best_seconds']:.3f}s ({result['rows_per_second']:,.0f} rows/s)")
+        finally:
+            os.chdir(previous_cwd)
+
+    output_file = args.output
+    if output_file is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_file = os.path.join(RESULTS_DIR, f'bench_{timestamp}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+
+    with open(output_file, 'w') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'results': results
+        }, f, indent=2)
+    print(f"\nResults saved to: {output_file}")
+
+    if args.baseline:
+        compare_with_baseline(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Deterministic synthetic Reddit posts for benchmarking the extraction pipeline.
+
+Posts follow the shape of data/raw/ scrapes (Title, URL, Body, Source,
+Card_Name, Decision, Scraped_At) plus the rule-extracted columns that
+data_preparer and comprehensive_dataset expect. Title and body lengths are
+drawn from log-normal distributions roughly matching r/CreditCards posts,
+and the text mixes approval/denial phrasing with income, score and limit
+mentions so every regex path gets exercised.
+"""
+
+import numpy as np
+import pandas as pd
+
+SUBREDDITS = ['CreditCards', 'Chase', 'churning', 'personalfinance']
+CARDS = ['Freedom Unlimited', 'Freedom Flex', 'Freedom (Generic)']
+CARD_ALIASES = {
+    'Freedom Unlimited': ['CFU', 'Freedom Unlimited', 'Chase Freedom Unlimited'],
+    'Freedom Flex': ['CFF', 'Freedom Flex', 'Chase Freedom Flex'],
+    'Freedom (Generic)': ['Chase Freedom', 'Freedom']
+}
+
+TITLE_TEMPLATES = [
+    'Approved for {card}!',
+    'Got approved for {card} with {score} FICO',
+    'Denied for {card}, what now?',
+    '{card} denied - too many inquiries?',
+    'Finally got the {card} after being rejected',
+    'Should I apply for {card}?',
+    '{card} approval odds with {score} score',
+    'Instant approval for {card}, {limit} limit',
+    'Was denied for {card} again',
+    'Data point: {card} approved, income {income}'
+]
+
+BODY_SENTENCES = [
+    'My income is ${income} and my credit score is {score}.',
+    'Applied online this morning and got approved for ${limit} starting limit.',
+    'I make ${income} annually before taxes.',
+    'FICO {score} according to Experian, no late payments.',
+    'Credit limit of ${limit} which is more than I expected.',
+    'I have had a Chase checking account for about two years.',
+    'This is my first credit card so I was nervous.',
+    'I am a college student working part time.',
+    'Got denied because of too many recent accounts.',
+    'The letter said my credit history was too short.',
+    'Called recon and they would not budge.',
+    'Was preapproved in branch but still got a pending decision.',
+    'Anyone else see this with Chase recently?',
+    'Thinking about product changing later on.',
+    'Not sure if 5/24 applies to me here.',
+    'Total of {pulls} hard pulls in the last year.'
+]
+
+DECISIONS = ['Approved', 'Denied', 'Pre-Approved', 'Unknown']
+
+
+def generate_posts(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Generate n_rows synthetic posts; the same seed always yields the same frame"""
+    rng = np.random.RandomState(seed)
+
+    card_idx = rng.choice(len(CARDS), size=n_rows, p=[0.55, 0.35, 0.10])
+    title_idx = rng.randint(len(TITLE_TEMPLATES), size=n_rows)
+    # Body sentence counts: log-normal, median ~6 sentences, long right tail
+    body_lengths = np.clip(rng.lognormal(mean=1.8, sigma=0.7, size=n_rows).astype(int), 1, 60)
+    incomes = rng.randint(15, 250, size=n_rows) * 1000
+    scores = rng.randint(580, 830, size=n_rows)
+    limits = rng.randint(5, 150, size=n_rows) * 100
+    pulls = rng.randint(0, 8, size=n_rows)
+    subreddit_idx = rng.randint(len(SUBREDDITS), size=n_rows)
+    decision_idx = rng.choice(len(DECISIONS), size=n_rows, p=[0.5, 0.3, 0.1, 0.1])
+    day_offsets = rng.randint(0, 180, size=n_rows)
+    sentence_draws = rng.randint(len(BODY_SENTENCES), size=int(body_lengths.sum()))
+
+    titles, bodies, card_names = [], [], []
+    cursor = 0
+    for i in range(n_rows):
+        card = CARDS[card_idx[i]]
+        aliases = CARD_ALIASES[card]
+        values = {
+            'card': aliases[i % len(aliases)],
+            'score': scores[i],
+            'income': f"{incomes[i]:,}",
+            'limit': f"{limits[i]:,}",
+            'pulls': pulls[i]
+        }
+
+        titles.append(TITLE_TEMPLATES[title_idx[i]].format(**values))
+        sentences = sentence_draws[cursor:cursor + body_lengths[i]]
+        cursor += body_lengths[i]
+        bodies.append(' '.join(BODY_SENTENCES[s].format(**values) for s in sentences))
+        card_names.append(card)
+
+    scraped_at = pd.Timestamp('2025-07-01') + pd.to_timedelta(day_offsets, unit='D')
+
+    # About half the rows carry rule-extracted values, matching rule_extractor output
+    has_income = rng.rand(n_rows) < 0.5
+    has_score = rng.rand(n_rows) < 0.6
+    has_limit = rng.rand(n_rows) < 0.4
+
+    return pd.DataFrame({
+        'Title': titles,
+        'URL': [f'https://www.reddit.com/r/{SUBREDDITS[s]}/comments/{i:07x}/' for i, s in enumerate(subreddit_idx)],
+        'Body': bodies,
+        'Source': [f'Reddit-{SUBREDDITS[s]}' for s in subreddit_idx],
+        'Card_Name': card_names,
+        'Decision': [DECISIONS[d] for d in decision_idx],
+        'Scraped_At': scraped_at.strftime('%Y-%m-%dT%H:%M:%S'),
+        'Extracted Income': np.where(has_income, incomes.astype(str), ''),
+        'Extracted Credit Score': np.where(has_score, scores.astype(str), ''),
+        'Extracted Approval Amount': np.where(has_limit, limits.astype(str), '')
+    })
+
+
+def write_posts(path: str, n_rows: int, seed: int = 42) -> str:
+    """Generate posts and write them as a raw-style CSV"""
+    generate_posts(n_rows, seed).to_csv(path, index=False)
+    return path
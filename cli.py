@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the pipeline:
+
+    python cli.py scrape [master_scraper options]
+    python cli.py extract [--input FILE] [--llm [--cascade] [--resume]]
+    python cli.py hybrid [hybrid_extractor options]
+    python cli.py filter [--cascade] [--prefilter | --calibrate-prefilter]
+    python cli.py recompute data/processed/hybrid_llm_dataset.csv [--plan-only]
+    python cli.py prepare [--input FILE]
+    python cli.py verify --input FILE [--output FILE] [--llm]
+    python cli.py report [--run NAME | --quality --start DATE --end DATE]
+    python cli.py search '5/24' [--start DATE --card NAME --limit N]
+
+Only the standard library is imported up front; pandas, PRAW, requests and
+the extractors are imported inside the subcommand that needs them, so
+`--help` and `report` start in milliseconds (see benchmarks/import_time.py).
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+METRICS_DIR = 'data/metrics'
+
+
+def latest_file(directory, pattern='*.csv'):
+    files = glob.glob(os.path.join(directory, pattern))
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def run_scrape(args):
+    from scrapers.master_scraper import main
+    main(args.rest)
+
+
+def run_ingest(args):
+    from scrapers.ingest import main
+    main(args.rest)
+
+
+def run_stream(args):
+    from scrapers.stream_scraper import main
+    main(args.rest)
+
+
+def run_filter(args):
+    from extractors.llm_filter import main
+    main(args.rest)
+
+
+def run_hybrid(args):
+    from extractors.hybrid_extractor import main
+    main(args.rest)
+
+
+def run_store(args):
+    from database.post_store import main
+    main(args.rest)
+
+
+def run_search(args):
+    from database.search_index import main
+    main(args.rest)
+
+
+def run_sql(args):
+    from database.analytics import main
+    main(args.rest)
+
+
+def run_compact(args):
+    from database.compaction import main
+    main(args.rest)
+
+
+def run_recompute(args):
+    from extractors.provenance import main
+    main(args.rest)
+
+
+def run_extract(args):
+    input_file = args.input or latest_file('data/raw')
+    if input_file is None:
+        print("No raw data files found in data/raw/")
+        return 1
+
+    from extractors.rule_extractor import extract_fields_from_csv
+    print(f"Processing {input_file}...")
+    output_file = extract_fields_from_csv(input_file)
+    print(f"Rule extraction completed: {output_file}")
+    if not args.llm:
+        return 0
+
+    from utils.metrics import metrics, configure_logging
+    from utils.checkpoint import RunInterrupted
+    from utils.llm_client import DEFAULT_CASCADE
+    from extractors.llm_extractor import extract_with_llm
+
+    configure_logging()
+    models = DEFAULT_CASCADE if args.cascade else args.model
+    print(f"Processing {output_file} with LLM ({models})...")
+    with metrics.timer('llm_extract.total'):
+        try:
+            output_file = extract_with_llm(output_file, models=models, resume=args.resume)
+        except RunInterrupted as e:
+            print(e)
+            metrics.write_summary('llm_extract')
+            return 130
+    print(f"LLM extraction completed: {output_file}")
+    print(f"Run summary saved to: {metrics.write_summary('llm_extract')}")
+    return 0
+
+
+def run_prepare(args):
+    input_file = args.input or latest_file('data/processed', '*rule_extracted*.csv')
+    if input_file is None:
+        print("No rule-extracted data files found in data/processed/")
+        return 1
+
+    from utils.metrics import metrics
+    from extractors.data_preparer import prepare_model_data
+    print(f"Preparing model data from {input_file}...")
+    output_file = prepare_model_data(input_file)
+    print(f"Model preparation completed: {output_file}")
+    print(f"Run summary saved to: {metrics.write_summary('prepare')}")
+    return 0
+
+
+def run_verify(args):
+    from utils.metrics import configure_logging
+    from extractors.llm_verification import create_verified_dataset
+
+    configure_logging(args.log_level)
+    config = {'confidence_threshold': args.confidence} if args.confidence is not None else None
+    df = create_verified_dataset(args.input, args.output, enable_llm_verification=args.llm, config=config)
+    print(f"Verified {len(df)} rows" + (f", saved to {args.output}" if args.output else ""))
+    return 0
+
+
+def run_report(args):
+    if args.quality:
+        from extractors.quality_metrics import quality_report_from_store
+        report = quality_report_from_store(args.start, args.end)
+        print(json.dumps(report, indent=2, default=str))
+        return 0
+
+    path = latest_file(METRICS_DIR, f"{args.run or '*'}_*.json")
+    if path is None:
+        print(f"No run summaries found in {METRICS_DIR}/")
+        return 1
+    with open(path, encoding='utf-8') as f:
+        summary = json.load(f)
+
+    print(f"Run: {summary.get('run')} ({path})")
+    print(f"Started: {summary.get('started_at')}, elapsed {summary.get('elapsed_seconds')}s")
+    for section in ('counters', 'gauges', 'hit_ratios'):
+        values = summary.get(section) or {}
+        if values:
+            print(f"\n{section.replace('_', ' ').capitalize()}:")
+            for name, value in sorted(values.items()):
+                print(f"  {name}: {value}")
+    histograms = summary.get('histograms') or {}
+    if histograms:
+        print("\nTimings:")
+        for name, hist in sorted(histograms.items()):
+            print(f"  {name}: n={hist['count']} mean={hist['mean']} p95={hist['p95']}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Credit card approval data pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # Pass-through subcommands hand their remaining arguments to the module's own parser
+    for name, handler, help_text in (
+            ('scrape', run_scrape, "Scrape Reddit into the master dataset (master_scraper options)"),
+            ('ingest', run_ingest, "Ingest from Reddit and local file sources (ingest options)"),
+            ('stream', run_stream, "Continuously ingest a subreddit stream (stream_scraper options)"),
+            ('hybrid', run_hybrid, "Rule + LLM hybrid extraction (hybrid_extractor options)"),
+            ('filter', run_filter, "LLM relevance filter with optional embedding pre-filter (llm_filter options)"),
+            ('store', run_store, "Month-partitioned post store: import, summary, compact, stats"),
+            ('search', run_search, "Full-text search over collected posts (search_index options)"),
+            ('sql', run_sql, "SQL over the approvals/features/llm_audit views (analytics options)"),
+            ('compact', run_compact, "Sort, dedupe and relabel the master dataset (compaction options)"),
+            ('recompute', run_recompute, "Recompute extracted fields whose extractor changed (provenance options)")):
+        sub = subparsers.add_parser(name, help=help_text, add_help=False)
+        sub.set_defaults(handler=handler, passthrough=True)
+
+    extract = subparsers.add_parser('extract', help="Rule-based extraction, optionally followed by the LLM extractor")
+    extract.add_argument('--input', default=None, help="Raw CSV (default: newest in data/raw/)")
+    extract.add_argument('--llm', action='store_true', help="Fill missing fields with the LLM extractor")
+    extract.add_argument('--model', default='mistral', help="Ollama model, or a comma-separated cascade")
+    extract.add_argument('--cascade', action='store_true', help="Small model first, escalating uncertain posts")
+    extract.add_argument('--resume', action='store_true', help="Skip posts an interrupted LLM run already finished")
+    extract.set_defaults(handler=run_extract)
+
+    prepare = subparsers.add_parser('prepare', help="Build the ML-ready dataset")
+    prepare.add_argument('--input', default=None, help="Rule-extracted CSV (default: newest in data/processed/)")
+    prepare.set_defaults(handler=run_prepare)
+
+    verify = subparsers.add_parser('verify', help="Create a verified dataset, optionally checked by the LLM")
+    verify.add_argument('--input', required=True, help="Processed CSV to verify")
+    verify.add_argument('--output', default=None, help="Where to write the verified dataset")
+    verify.add_argument('--llm', action='store_true', help="Run LLM verification on low-confidence rows")
+    verify.add_argument('--confidence', type=int, default=None, help="Confidence threshold below which rows are verified")
+    verify.add_argument('--log-level', default='INFO', help="Logging level")
+    verify.set_defaults(handler=run_verify)
+
+    report = subparsers.add_parser('report', help="Show the latest run summary or the quality report")
+    report.add_argument('--run', default=None, help="Run name, e.g. hybrid or scrape (default: newest of any)")
+    report.add_argument('--quality', action='store_true', help="Quality report from the metrics store instead")
+    report.add_argument('--start', default=None, help="First batch date for --quality (YYYY-MM-DD)")
+    report.add_argument('--end', default=None, help="Last batch date for --quality (YYYY-MM-DD)")
+    report.set_defaults(handler=run_report)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, rest = parser.parse_known_args(argv)
+    if rest and not getattr(args, 'passthrough', False):
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    args.rest = rest
+    return args.handler(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
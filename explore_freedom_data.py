@@ -179,6 +179,23 @@ for card in ['Freedom Unlimited', 'Freedom Flex']:
     rate = approved / total if total > 0 else 0
     print(f"  {card}: {approved}/{total} ({rate:.1%})")
 
+# =============================================================================
+# CELL 10: Processed Data via SQL (typed views, aggregated in SQLite)
+# =============================================================================
+import sys
+sys.path.append('src')
+from database.analytics import Analytics
+
+analytics = Analytics().refresh()
+print("=== PROCESSED DATA ===")
+print(analytics.approval_rates(by='card_name'))
+print(analytics.feature_summary())
+print(analytics.query("""
+    SELECT card_name, (credit_score / 50) * 50 AS score_band, COUNT(*) AS posts, ROUND(AVG(target), 3) AS approval_rate
+    FROM approvals WHERE credit_score IS NOT NULL
+    GROUP BY card_name, score_band ORDER BY card_name, score_band
+"""))
+
 print("\n" + "="*50)
 print("Copy these code blocks into VS Code notebook cells!")
 print("Each section marked with 'CELL X:' should be a separate cell.") 
\ No newline at end of file
@@ -9,12 +9,13 @@ import os
 # Add src to path so we can import our modules
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from extractors.rule_extractor import main as run_rule_extractor
-from extractors.llm_extractor import main as run_llm_extractor
-from extractors.data_preparer import main as run_data_preparer
-
 def main():
     """Run the complete extraction pipeline"""
+    # Imported here so importing this script stays cheap; see cli.py for single stages
+    from extractors.rule_extractor import main as run_rule_extractor
+    from extractors.llm_extractor import main as run_llm_extractor
+    from extractors.data_preparer import main as run_data_preparer
+
     print("=== Reddit Data Extraction Pipeline ===")
     
     # Step 1: Rule-based extraction
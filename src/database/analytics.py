@@ -0,0 +1,244 @@
+"""
+SQL analytics over the processed datasets.
+
+Processed CSVs (hybrid, comprehensive and verified outputs) are loaded in
+chunks through the typed schema into one SQLite table, `processed`, in
+`data/store/analytics.db`; files are reloaded only when they change. Typed
+views sit on top, so notebooks stop re-running `pd.to_numeric` on
+'Not extracted' columns and re-filtering `target`:
+
+- `posts`: the latest loaded row per (URL, card) across datasets
+- `approvals`: posts with a known decision, with income, credit score and
+  approval amount as integers (cleaned values preferred)
+- `features`: the model features of `approvals`, flags as 0/1
+- `llm_audit`: posts the LLM looked at, its verdict next to the rule result
+
+Aggregations run in SQLite and only their results come back as DataFrames:
+
+    from database.analytics import Analytics
+    analytics = Analytics().refresh()
+    analytics.approval_rates(by='card_name')
+    analytics.query("SELECT card_name, AVG(credit_score) FROM approvals GROUP BY 1")
+
+    python src/database/analytics.py --refresh "SELECT * FROM llm_audit LIMIT 5"
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics
+from extractors.schema import apply_schema, INT_COLUMNS, BOOL_COLUMNS
+
+ANALYTICS_DB = 'data/store/analytics.db'
+PROCESSED_PATTERN = 'data/processed/*.csv'
+
+# A processed CSV is loaded when its header has these columns
+REQUIRED_COLUMNS = {'URL', 'Card_Name', 'approval_status'}
+
+TEXT_COLUMNS = [
+    'Title', 'URL', 'Body', 'Source', 'Card_Name', 'Scraped_At', 'approval_status',
+    'llm_approval_status', 'llm_reasoning'
+]
+LOADED_COLUMNS = TEXT_COLUMNS + [col for col in INT_COLUMNS + BOOL_COLUMNS if col not in TEXT_COLUMNS]
+
+VIEWS = {
+    'posts': """
+        SELECT * FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY url, card_name ORDER BY loaded_at DESC, rowid DESC) AS version
+            FROM processed
+        ) WHERE version = 1
+    """,
+    'approvals': """
+        SELECT url, title, source, card_name, scraped_at, DATE(scraped_at) AS scraped_date,
+               approval_status, target,
+               COALESCE(income_clean, extracted_income) AS income,
+               COALESCE(credit_score_clean, extracted_credit_score) AS credit_score,
+               COALESCE(approval_amount_clean, extracted_approval_amount) AS approval_amount,
+               title_quality_score, used_llm, dataset
+        FROM posts
+        WHERE target IS NOT NULL
+    """,
+    'features': """
+        SELECT a.url, a.card_name, a.target, a.income, a.credit_score, a.approval_amount,
+               COALESCE(p.is_student, 0) AS is_student,
+               COALESCE(p.is_first_card, 0) AS is_first_card,
+               COALESCE(p.has_chase_account, 0) AS has_chase_account,
+               COALESCE(p.mentions_income, 0) AS mentions_income,
+               COALESCE(p.mentions_credit_score, 0) AS mentions_credit_score,
+               p.text_length
+        FROM approvals a JOIN posts p ON p.url = a.url AND p.card_name = a.card_name
+    """,
+    'llm_audit': """
+        SELECT url, title, card_name, dataset,
+               approval_status AS final_status, llm_approval_status, llm_confidence, title_quality_score,
+               llm_approval_status = approval_status AS llm_agrees,
+               llm_confidence > title_quality_score AS llm_overrode,
+               extracted_income, llm_income,
+               extracted_credit_score, llm_credit_score,
+               extracted_approval_amount, llm_approval_amount,
+               llm_reasoning
+        FROM posts
+        WHERE used_llm = 1
+    """
+}
+
+
+def sql_name(column: str) -> str:
+    """'Extracted Credit Score' -> extracted_credit_score"""
+    return re.sub(r'\W+', '_', column).strip('_').lower()
+
+
+def sql_type(column: str) -> str:
+    if column in TEXT_COLUMNS:
+        return 'TEXT'
+    return 'INTEGER'
+
+
+def is_processed_dataset(path: str) -> bool:
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    return REQUIRED_COLUMNS.issubset(header)
+
+
+class Analytics:
+    """Typed SQL views over the processed datasets"""
+
+    def __init__(self, path: str = ANALYTICS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with closing(self.connect()) as connection, connection:
+            self._create_schema(connection)
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def _create_schema(self, connection: sqlite3.Connection):
+        columns = ', '.join(f'{sql_name(col)} {sql_type(col)}' for col in LOADED_COLUMNS)
+        connection.execute(f'CREATE TABLE IF NOT EXISTS processed (dataset TEXT, loaded_at TEXT, {columns})')
+        connection.execute('CREATE INDEX IF NOT EXISTS processed_dataset ON processed (dataset)')
+        connection.execute('CREATE INDEX IF NOT EXISTS processed_post ON processed (url, card_name)')
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS datasets (
+                path TEXT PRIMARY KEY, mtime REAL, size INTEGER, rows INTEGER, loaded_at TEXT
+            )""")
+        for name, sql in VIEWS.items():
+            connection.execute(f'DROP VIEW IF EXISTS {name}')
+            connection.execute(f'CREATE VIEW {name} AS {sql}')
+
+    def refresh(self, paths: Optional[Iterable[str]] = None, chunksize: int = 50000) -> 'Analytics':
+        """Load new or changed processed CSVs; unchanged files are skipped"""
+        paths = sorted(glob.glob(PROCESSED_PATTERN)) if paths is None else list(paths)
+        with closing(self.connect()) as connection:
+            loaded = {path: (mtime, size) for path, mtime, size in
+                      connection.execute('SELECT path, mtime, size FROM datasets')}
+            for path in paths:
+                stat = os.stat(path)
+                if loaded.get(path) == (stat.st_mtime, stat.st_size):
+                    metrics.incr('analytics.files_unchanged')
+                    continue
+                if not is_processed_dataset(path):
+                    continue
+                with connection:
+                    rows = self._load(connection, path, chunksize)
+                    connection.execute('INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?)',
+                                       (path, stat.st_mtime, stat.st_size, rows, datetime.now().isoformat()))
+                metrics.incr('analytics.files_loaded')
+                print(f"Loaded {rows} rows from {path}")
+        return self
+
+    def _load(self, connection: sqlite3.Connection, path: str, chunksize: int) -> int:
+        dataset = os.path.basename(path)
+        loaded_at = datetime.now().isoformat()
+        connection.execute('DELETE FROM processed WHERE dataset = ?', (dataset,))
+
+        placeholders = ', '.join('?' * (len(LOADED_COLUMNS) + 2))
+        names = ', '.join(['dataset', 'loaded_at'] + [sql_name(col) for col in LOADED_COLUMNS])
+        rows = 0
+        for chunk in pd.read_csv(path, chunksize=chunksize, low_memory=False):
+            typed = apply_schema(chunk).reindex(columns=LOADED_COLUMNS)
+            for col in BOOL_COLUMNS:
+                # Flags the dataset doesn't have stay NULL rather than False
+                if col in chunk.columns:
+                    typed[col] = typed[col].astype('Int8')
+            values = typed.astype(object).where(typed.notna(), None)
+            connection.executemany(f'INSERT INTO processed ({names}) VALUES ({placeholders})',
+                                   ((dataset, loaded_at, *row) for row in values.itertuples(index=False, name=None)))
+            rows += len(chunk)
+        return rows
+
+    def query(self, sql: str, params: Sequence = ()) -> pd.DataFrame:
+        """Run SQL against the views and return the (aggregated) result"""
+        with closing(self.connect()) as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def datasets(self) -> pd.DataFrame:
+        return self.query('SELECT * FROM datasets ORDER BY loaded_at')
+
+    def approval_rates(self, by: str = 'card_name', min_posts: int = 1) -> pd.DataFrame:
+        """Approved/denied counts and approval rate per group (e.g. card_name, source, scraped_date)"""
+        group = sql_name(by)
+        return self.query(f"""
+            SELECT {group}, COUNT(*) AS posts, SUM(target) AS approved, COUNT(*) - SUM(target) AS denied,
+                   ROUND(AVG(target), 4) AS approval_rate
+            FROM approvals GROUP BY {group} HAVING COUNT(*) >= ? ORDER BY posts DESC
+        """, (min_posts,))
+
+    def feature_summary(self) -> pd.DataFrame:
+        """Coverage and mean of each numeric feature, split by outcome"""
+        return self.query("""
+            SELECT target, COUNT(*) AS posts,
+                   COUNT(income) AS with_income, ROUND(AVG(income)) AS mean_income,
+                   COUNT(credit_score) AS with_credit_score, ROUND(AVG(credit_score), 1) AS mean_credit_score,
+                   COUNT(approval_amount) AS with_approval_amount, ROUND(AVG(approval_amount)) AS mean_approval_amount,
+                   ROUND(AVG(is_student), 3) AS student_share, ROUND(AVG(is_first_card), 3) AS first_card_share
+            FROM features GROUP BY target
+        """)
+
+    def llm_agreement(self) -> pd.DataFrame:
+        """How often the LLM agreed with the rules, and how often it overrode them, per card"""
+        return self.query("""
+            SELECT card_name, COUNT(*) AS posts, ROUND(AVG(llm_agrees), 3) AS agreement_rate,
+                   SUM(llm_overrode) AS overrides, ROUND(AVG(llm_confidence), 2) AS mean_llm_confidence
+            FROM llm_audit GROUP BY card_name ORDER BY posts DESC
+        """)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQL analytics over the processed datasets")
+    parser.add_argument('sql', nargs='?', default=None, help="Query against posts/approvals/features/llm_audit")
+    parser.add_argument('--refresh', action='store_true', help="Load new or changed processed CSVs first")
+    parser.add_argument('--file', action='append', default=None, help="Processed CSV to load (default: data/processed/*.csv)")
+    parser.add_argument('--db', default=ANALYTICS_DB, help="Analytics database")
+    args = parser.parse_args(argv)
+
+    analytics = Analytics(args.db)
+    if args.refresh or args.file:
+        analytics.refresh(args.file)
+
+    with pd.option_context('display.max_columns', None, 'display.width', 160):
+        if args.sql:
+            print(analytics.query(args.sql).to_string(index=False))
+        else:
+            print("Approval rates by card:")
+            print(analytics.approval_rates().to_string(index=False))
+            print("\nFeatures by outcome:")
+            print(analytics.feature_summary().to_string(index=False))
+            audit = analytics.llm_agreement()
+            if len(audit):
+                print("\nLLM agreement:")
+                print(audit.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+Compaction and dedupe of the master dataset.
+
+`master_scraper` and the other ingesters only ever append to
+`data/raw/freedom_cards_dataset.csv`. Compaction rewrites it with an
+external merge sort, so memory stays bounded by `chunk_rows` whatever the
+file size:
+
+1. The file is read in chunks; each chunk is sorted by canonical post id
+   (the Reddit id from the URL, otherwise the normalized URL) and written
+   to a temporary run file.
+2. The runs are merged. Rows of one post arrive together, and only the
+   latest row per (post, card) is kept, so URL variants and re-appended
+   posts collapse into one.
+3. Posts whose `Rule_Version` differs from the current card/decision rules
+   get their cards and decisions re-derived from title and body. Current
+   rows are copied as they are, and posts the current rules find no
+   card/decision in keep their old labels (`--drop-unmatched` drops them).
+
+The result replaces the master file atomically; rows appended while it
+runs would be lost, so run it when no scraper is writing. With `--output`
+the master file is left untouched.
+
+    python src/database/compaction.py
+    python src/database/compaction.py --chunk-rows 20000 --no-relabel
+    python src/database/compaction.py --output data/raw/compacted.csv
+"""
+
+import argparse
+import csv
+import heapq
+import itertools
+import os
+import re
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics
+from utils.proximity_index import attribute_decisions, rule_version
+from scrapers.sources import MASTER_COLUMNS
+
+REDDIT_ID_PATTERN = re.compile(r'reddit\.com/(?:r/[^/]+/)?comments/([a-z0-9]+)', re.IGNORECASE)
+REDDIT_SHORT_PATTERN = re.compile(r'redd\.it/([a-z0-9]+)', re.IGNORECASE)
+TRACKING_PARAMS = ('utm_', 'ref', 'share_id', 'context')
+
+COLUMN = {name: i for i, name in enumerate(MASTER_COLUMNS)}
+
+# Bodies can exceed the csv module's 128KB default field limit
+csv.field_size_limit(2 ** 31 - 1)
+
+
+@dataclass
+class CompactionReport:
+    rows_in: int = 0
+    rows_out: int = 0
+    duplicates_dropped: int = 0
+    posts: int = 0
+    relabeled_posts: int = 0
+    labels_changed: int = 0
+    unmatched_posts: int = 0
+    unmatched_dropped: int = 0
+    runs: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    seconds: float = 0.0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def canonical_post_id(url: str) -> str:
+    """Reddit post id for any form of a Reddit link, otherwise the URL without tracking noise"""
+    url = str(url or '').strip()
+    match = REDDIT_ID_PATTERN.search(url) or REDDIT_SHORT_PATTERN.search(url)
+    if match:
+        return f"reddit:{match.group(1).lower()}"
+
+    parts = urlsplit(url)
+    host = parts.netloc.lower().removeprefix('www.')
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                       if not key.lower().startswith(TRACKING_PARAMS)])
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip('/'), query, parts.fragment))
+
+
+def upgrade_master_layout(master_file: str, output_file: Optional[str] = None) -> bool:
+    """
+    Rewrite a master file written with older columns into MASTER_COLUMNS.
+
+    Missing columns (e.g. Rule_Version) are left empty, which marks the
+    rows as outdated for the next compaction. The file is upgraded in place
+    unless `output_file` is given. Returns True if it rewrote.
+
+    Raises:
+        ValueError: If the file has columns the master layout doesn't know
+    """
+    with open(master_file, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), None)
+    if header is None or header == MASTER_COLUMNS:
+        return False
+    unknown = [column for column in header if column not in MASTER_COLUMNS]
+    if unknown:
+        raise ValueError(f"{master_file} is not a master dataset (unknown columns: {', '.join(unknown)})")
+
+    positions = [header.index(column) if column in header else None for column in MASTER_COLUMNS]
+    target = output_file or master_file
+    directory = os.path.dirname(os.path.abspath(target))
+    with tempfile.NamedTemporaryFile('w', newline='', encoding='utf-8', dir=directory,
+                                     suffix='.upgrade', delete=False) as out, \
+            open(master_file, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        writer = csv.writer(out)
+        writer.writerow(MASTER_COLUMNS)
+        for row in reader:
+            writer.writerow([row[i] if i is not None and i < len(row) else '' for i in positions])
+    os.replace(out.name, target)
+    return True
+
+
+def _read_rows(path: str) -> Iterator[List[str]]:
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        width = len(MASTER_COLUMNS)
+        for row in reader:
+            if row:
+                yield (row + [''] * width)[:width]
+
+
+def _write_runs(master_file: str, work_dir: str, chunk_rows: int, report: CompactionReport) -> List[str]:
+    """Sorted run files of (canonical id, sequence, row...)"""
+    runs = []
+    rows = _read_rows(master_file)
+    for chunk_number in itertools.count():
+        chunk = []
+        for row in itertools.islice(rows, chunk_rows):
+            chunk.append([canonical_post_id(row[COLUMN['URL']]), f"{report.rows_in:012d}"] + row)
+            report.rows_in += 1
+        if not chunk:
+            break
+        chunk.sort(key=lambda item: (item[0], item[1]))
+        path = os.path.join(work_dir, f'run-{chunk_number:05d}.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(chunk)
+        runs.append(path)
+    report.runs = len(runs)
+    return runs
+
+
+def _merge_runs(runs: List[str]) -> Iterator[List[str]]:
+    files = [open(path, newline='', encoding='utf-8') for path in runs]
+    try:
+        # Sequence numbers are zero-padded, so string order is append order
+        yield from heapq.merge(*(csv.reader(f) for f in files), key=lambda item: (item[0], item[1]))
+    finally:
+        for f in files:
+            f.close()
+
+
+def _compact_post(rows: List[List[str]], current_version: str, relabel: bool, drop_unmatched: bool,
+                  report: CompactionReport) -> List[List[str]]:
+    """Latest row per card for one post, relabeled if its rules are outdated"""
+    latest = {}
+    for row in rows:
+        latest[row[COLUMN['Card_Name']]] = row
+    report.duplicates_dropped += len(rows) - len(latest)
+    kept = list(latest.values())
+
+    if not relabel or all(row[COLUMN['Rule_Version']] == current_version for row in kept):
+        return kept
+
+    # The most recently appended row carries the post text
+    base = rows[-1]
+    text = f"{base[COLUMN['Title']]} {base[COLUMN['Body']]}".lower()
+    card_rows = attribute_decisions(text)
+    if not card_rows:
+        # Nothing to relabel with; keep the old labels (and version, so later rules get another try)
+        report.unmatched_posts += 1
+        if drop_unmatched:
+            report.unmatched_dropped += 1
+            return []
+        return kept
+    report.relabeled_posts += 1
+
+    old_labels = {(row[COLUMN['Card_Name']], row[COLUMN['Decision']]) for row in kept}
+    if set(card_rows) != old_labels:
+        report.labels_changed += 1
+
+    relabeled = []
+    for card_name, decision in card_rows:
+        row = list(base)
+        row[COLUMN['Card_Name']] = card_name
+        row[COLUMN['Decision']] = decision
+        row[COLUMN['Rule_Version']] = current_version
+        relabeled.append(row)
+    return relabeled
+
+
+def compact_master(master_file: str, chunk_rows: int = 100000, relabel: bool = True,
+                   output_file: Optional[str] = None, drop_unmatched: bool = False) -> CompactionReport:
+    """
+    Rewrite the master file sorted by canonical post id with duplicates dropped.
+
+    Args:
+        master_file (str): Master CSV to compact
+        chunk_rows (int): Rows per sorted run; bounds memory use
+        relabel (bool): Re-derive Card_Name/Decision for rows with an outdated Rule_Version
+        output_file (Optional[str]): Write here instead of replacing the master file
+        drop_unmatched (bool): Drop outdated posts the current rules attribute no card/decision to
+
+    Returns:
+        CompactionReport: Row, label and byte counts plus the time taken
+    """
+    start = time.perf_counter()
+    report = CompactionReport(bytes_before=os.path.getsize(master_file))
+    current_version = rule_version()
+    directory = os.path.dirname(os.path.abspath(output_file or master_file))
+
+    with tempfile.TemporaryDirectory(prefix='compaction-', dir=directory) as work_dir:
+        source = master_file
+        if output_file is None:
+            upgrade_master_layout(master_file)
+        elif upgrade_master_layout(master_file, os.path.join(work_dir, 'upgraded.csv')):
+            source = os.path.join(work_dir, 'upgraded.csv')
+
+        with metrics.timer('compaction.sort_runs'):
+            runs = _write_runs(source, work_dir, chunk_rows, report)
+
+        target = os.path.join(work_dir, 'compacted.csv')
+        with metrics.timer('compaction.merge'), open(target, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.writer(out)
+            writer.writerow(MASTER_COLUMNS)
+            for _, group in itertools.groupby(_merge_runs(runs), key=lambda item: item[0]):
+                rows = [item[2:] for item in group]
+                report.posts += 1
+                for row in _compact_post(rows, current_version, relabel, drop_unmatched, report):
+                    writer.writerow(row)
+                    report.rows_out += 1
+
+        os.replace(target, output_file or master_file)
+
+    report.bytes_after = os.path.getsize(output_file or master_file)
+    report.seconds = round(time.perf_counter() - start, 3)
+    for name in ('rows_in', 'rows_out', 'duplicates_dropped', 'relabeled_posts', 'labels_changed',
+                 'unmatched_posts', 'unmatched_dropped'):
+        metrics.incr(f'compaction.{name}', getattr(report, name))
+    metrics.set_gauge('compaction.bytes_reclaimed', report.bytes_reclaimed)
+    return report
+
+
+def print_report(report: CompactionReport):
+    print(f"Compacted {report.rows_in:,} rows into {report.rows_out:,} ({report.posts:,} posts, {report.runs} sorted runs)")
+    print(f"- Duplicates dropped: {report.duplicates_dropped:,}")
+    print(f"- Posts relabeled under the current rules: {report.relabeled_posts:,} "
+          f"({report.labels_changed:,} with changed labels)")
+    print(f"- Outdated posts the current rules don't match: {report.unmatched_posts:,} "
+          f"({report.unmatched_dropped:,} dropped, the rest kept with their old labels)")
+    print(f"- Size: {report.bytes_before:,} -> {report.bytes_after:,} bytes ({report.bytes_reclaimed:,} reclaimed)")
+    print(f"- Time: {report.seconds}s")
+
+
+def main(argv=None):
+    from scrapers.ingest import MASTER_FILE
+
+    parser = argparse.ArgumentParser(description="Sort, dedupe and relabel the master dataset")
+    parser.add_argument('--master', default=MASTER_FILE, help="Master CSV to compact")
+    parser.add_argument('--output', default=None, help="Write the compacted file here instead of replacing the master")
+    parser.add_argument('--chunk-rows', type=int, default=100000, help="Rows per sorted run (bounds memory)")
+    parser.add_argument('--no-relabel', dest='relabel', action='store_false', help="Keep labels from outdated rules")
+    parser.add_argument('--drop-unmatched', action='store_true',
+                        help="Drop outdated posts the current rules attribute no card/decision to (default: keep them)")
+    args = parser.parse_args(argv)
+
+    print(f"Compacting {args.master} (rules {rule_version()})...")
+    report = compact_master(args.master, args.chunk_rows, args.relabel, args.output, args.drop_unmatched)
+    print_report(report)
+    print(f"Run summary saved to: {metrics.write_summary('compaction')}")
+
+
+if __name__ == '__main__':
+    main()
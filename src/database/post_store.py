@@ -0,0 +1,324 @@
+"""
+Post store partitioned by creation month.
+
+Accepted posts are written under `data/store/posts/month=YYYY-MM/` keyed by
+the post's own `created_utc` (falling back to `Scraped_At` for sources that
+don't carry one), next to the append-only master CSV. Each flush adds a small
+part file to the partitions it touches. Readers take a time range and only
+open the partitions that overlap it, so "last 180 days" or "this month"
+reads a handful of files instead of the whole history. `compact()` merges a
+partition's small part files into one, sorted by creation time, with
+duplicate rows dropped. Appended posts are also added to the full-text
+index (`search_index.py`) as they are written.
+
+    python src/database/post_store.py import data/raw/freedom_cards_dataset.csv
+    python src/database/post_store.py summary --days 30
+    python src/database/post_store.py compact
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics
+from scrapers.sources import MASTER_COLUMNS
+from database.search_index import SearchIndex, SEARCH_INDEX_FILE
+
+STORE_DIR = 'data/store/posts'
+
+STORE_COLUMNS = ['Post_Id', 'Created_Utc'] + MASTER_COLUMNS
+# One stored row per (post, card); later writes of the same key win
+KEY_COLUMNS = ['Source', 'Post_Id', 'Card_Name']
+
+# Parts below this size are merged by compaction
+SMALL_PART_BYTES = 8 * 1024 * 1024
+
+PARTITION_PATTERN = re.compile(r'^month=(\d{4})-(\d{2})$')
+REDDIT_ID_PATTERN = re.compile(r'/comments/([a-z0-9]+)')
+
+TimeBound = Union[None, str, float, datetime, pd.Timestamp]
+
+
+def to_timestamp(value: TimeBound) -> Optional[float]:
+    """Epoch seconds (UTC) from a date string, datetime or epoch number"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize('UTC')
+    return stamp.timestamp()
+
+
+def month_of(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m')
+
+
+def month_bounds(month: str):
+    """[start, end) epoch seconds of a YYYY-MM month"""
+    start = datetime.strptime(month, '%Y-%m').replace(tzinfo=timezone.utc)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.timestamp(), end.timestamp()
+
+
+def event_time(row: Sequence) -> Optional[float]:
+    """Creation time of a store row, or its scrape time when the source gave none"""
+    created = row[1]
+    if created not in (None, ''):
+        return float(created)
+    return to_timestamp(row[STORE_COLUMNS.index('Scraped_At')])
+
+
+def new_part_name(label: str = '') -> str:
+    """Part file name; names sort in write order (to the microsecond), so later parts win"""
+    return f"part-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{label}{uuid.uuid4().hex[:8]}.csv"
+
+
+def post_id_from_url(url: str) -> str:
+    """Reddit post id from a permalink, or a stable hash of the URL"""
+    match = REDDIT_ID_PATTERN.search(str(url))
+    if match:
+        return match.group(1)
+    return uuid.uuid5(uuid.NAMESPACE_URL, str(url)).hex[:16]
+
+
+class PostStore:
+    """Month-partitioned CSV store of accepted posts"""
+
+    def __init__(self, root: str = STORE_DIR, index_file: Optional[str] = SEARCH_INDEX_FILE):
+        self.root = root
+        # None skips full-text indexing on append
+        self.index_file = index_file
+        self._index = None
+
+    # Writing
+
+    def append(self, rows: Iterable[Sequence]) -> int:
+        """
+        Write rows (STORE_COLUMNS order) as one new part file per partition.
+
+        Returns the number of rows written.
+        """
+        by_month = {}
+        for row in rows:
+            timestamp = event_time(row)
+            month = month_of(timestamp if timestamp is not None else time.time())
+            by_month.setdefault(month, []).append(row)
+
+        part_name = new_part_name()
+        for month, month_rows in by_month.items():
+            directory = self._partition_dir(month)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, part_name)
+            with open(path + '.tmp', 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(STORE_COLUMNS)
+                writer.writerows(month_rows)
+            # Readers never see a half-written part
+            os.replace(path + '.tmp', path)
+
+        written = sum(len(month_rows) for month_rows in by_month.values())
+        metrics.incr('store.rows_written', written)
+
+        if self.index_file and written:
+            if self._index is None:
+                self._index = SearchIndex(self.index_file)
+            with metrics.timer('store.index_update'):
+                self._index.add_rows(row for month_rows in by_month.values() for row in month_rows)
+        return written
+
+    def import_master(self, master_file: str, chunksize: int = 50000) -> int:
+        """Backfill from a master-format CSV; those rows have no creation time"""
+        written = 0
+        for chunk in pd.read_csv(master_file, chunksize=chunksize, dtype=str, keep_default_na=False):
+            chunk.insert(0, 'Created_Utc', '')
+            chunk.insert(0, 'Post_Id', chunk['URL'].map(post_id_from_url))
+            # Older master files have no Rule_Version column
+            written += self.append(chunk.reindex(columns=STORE_COLUMNS, fill_value='').itertuples(index=False, name=None))
+        return written
+
+    # Reading
+
+    def _partition_dir(self, month: str) -> str:
+        return os.path.join(self.root, f'month={month}')
+
+    def partitions(self) -> List[str]:
+        """Months with data, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        months = [match.group(1) + '-' + match.group(2)
+                  for match in map(PARTITION_PATTERN.match, os.listdir(self.root)) if match]
+        return sorted(months)
+
+    def prune(self, start: TimeBound = None, end: TimeBound = None) -> List[str]:
+        """Months overlapping [start, end)"""
+        start_ts, end_ts = to_timestamp(start), to_timestamp(end)
+        months = self.partitions()
+        kept = []
+        for month in months:
+            month_start, month_end = month_bounds(month)
+            if start_ts is not None and month_end <= start_ts:
+                continue
+            if end_ts is not None and month_start >= end_ts:
+                continue
+            kept.append(month)
+        metrics.incr('store.partitions_scanned', len(kept))
+        metrics.incr('store.partitions_pruned', len(months) - len(kept))
+        return kept
+
+    def part_files(self, month: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self._partition_dir(month), 'part-*.csv')))
+
+    def iter_partitions(self, start: TimeBound = None, end: TimeBound = None,
+                        columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """One DataFrame per partition overlapping [start, end), rows filtered to the range"""
+        start_ts, end_ts = to_timestamp(start), to_timestamp(end)
+        for month in self.prune(start, end):
+            df = self._read_partition(month)
+            if df.empty:
+                continue
+            month_start, month_end = month_bounds(month)
+            # Partitions wholly inside the range need no row filter
+            if (start_ts is not None and month_start < start_ts) or (end_ts is not None and month_end > end_ts):
+                times = df['Event_Time']
+                mask = pd.Series(True, index=df.index)
+                if start_ts is not None:
+                    mask &= times >= start_ts
+                if end_ts is not None:
+                    mask &= times < end_ts
+                df = df[mask]
+            yield df[columns] if columns else df
+
+    def read(self, start: TimeBound = None, end: TimeBound = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Posts created in [start, end), reading only the overlapping partitions"""
+        frames = list(self.iter_partitions(start, end, columns))
+        if not frames:
+            return pd.DataFrame(columns=columns or STORE_COLUMNS + ['Event_Time'])
+        return pd.concat(frames, ignore_index=True)
+
+    def read_recent(self, days: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return self.read(start=time.time() - days * 86400, columns=columns)
+
+    def _read_partition(self, month: str) -> pd.DataFrame:
+        frames = [pd.read_csv(path, dtype=str, keep_default_na=False) for path in self.part_files(month)]
+        if not frames:
+            return pd.DataFrame(columns=STORE_COLUMNS + ['Event_Time'])
+        df = pd.concat(frames, ignore_index=True).drop_duplicates(KEY_COLUMNS, keep='last')
+        created = pd.to_numeric(df['Created_Utc'], errors='coerce')
+        scraped = pd.to_datetime(df['Scraped_At'], errors='coerce', format='ISO8601')
+        if scraped.dt.tz is None:
+            scraped = scraped.dt.tz_localize('UTC')
+        df['Event_Time'] = created.fillna((scraped - pd.Timestamp(0, tz='UTC')).dt.total_seconds())
+        metrics.incr('store.rows_read', len(df))
+        return df.reset_index(drop=True)
+
+    # Maintenance
+
+    def partition_stats(self) -> List[dict]:
+        stats = []
+        for month in self.partitions():
+            files = self.part_files(month)
+            stats.append({'month': month, 'files': len(files),
+                          'bytes': sum(os.path.getsize(path) for path in files)})
+        return stats
+
+    def compact(self, small_part_bytes: int = SMALL_PART_BYTES) -> dict:
+        """
+        Merge each partition's small part files into one sorted, deduplicated part.
+
+        Parts at or above `small_part_bytes` are left alone, and partitions
+        with fewer than two small parts are skipped.
+        """
+        report = {'partitions': 0, 'files_before': 0, 'files_after': 0,
+                  'bytes_before': 0, 'bytes_after': 0, 'rows_dropped': 0}
+        start = time.perf_counter()
+        for month in self.partitions():
+            small = [path for path in self.part_files(month) if os.path.getsize(path) < small_part_bytes]
+            if len(small) < 2:
+                continue
+
+            frames = [pd.read_csv(path, dtype=str, keep_default_na=False) for path in small]
+            df = pd.concat(frames, ignore_index=True)
+            rows_before = len(df)
+            df = df.drop_duplicates(KEY_COLUMNS, keep='last')
+            sort_time = pd.to_numeric(df['Created_Utc'], errors='coerce')
+            df = df.assign(_sort=sort_time).sort_values(['_sort', 'Scraped_At'], kind='stable').drop(columns='_sort')
+
+            path = os.path.join(self._partition_dir(month), new_part_name('compacted-'))
+            df.reindex(columns=STORE_COLUMNS, fill_value='').to_csv(path + '.tmp', index=False)
+            os.replace(path + '.tmp', path)
+            # A crash before this point leaves duplicates, which readers drop by key
+            bytes_before = sum(os.path.getsize(old) for old in small)
+            for old in small:
+                os.remove(old)
+
+            report['partitions'] += 1
+            report['files_before'] += len(small)
+            report['files_after'] += 1
+            report['bytes_before'] += bytes_before
+            report['bytes_after'] += os.path.getsize(path)
+            report['rows_dropped'] += rows_before - len(df)
+
+        report['seconds'] = round(time.perf_counter() - start, 3)
+        metrics.incr('store.compacted_partitions', report['partitions'])
+        return report
+
+
+def print_summary(df: pd.DataFrame, label: str):
+    print(f"{label}: {len(df)} rows, {df['Post_Id'].nunique() if len(df) else 0} posts")
+    if len(df):
+        print(f"Decisions: {df['Decision'].value_counts().to_dict()}")
+        print(f"Cards: {df['Card_Name'].value_counts().to_dict()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Month-partitioned post store")
+    parser.add_argument('--root', default=STORE_DIR, help="Store directory")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backfill = subparsers.add_parser('import', help="Backfill the store from a master-format CSV")
+    backfill.add_argument('master_file', help="Master CSV, e.g. data/raw/freedom_cards_dataset.csv")
+
+    summary = subparsers.add_parser('summary', help="Rows, decisions and cards in a time range")
+    summary.add_argument('--start', default=None, help="First creation date, inclusive (YYYY-MM-DD)")
+    summary.add_argument('--end', default=None, help="Last creation date, exclusive (YYYY-MM-DD)")
+    summary.add_argument('--days', type=int, default=None, help="Only the last N days (overrides --start)")
+
+    compact = subparsers.add_parser('compact', help="Merge small part files per partition")
+    compact.add_argument('--small-mb', type=float, default=SMALL_PART_BYTES / 1024 / 1024, help="Parts below this size are merged")
+
+    subparsers.add_parser('stats', help="Files and bytes per partition")
+    args = parser.parse_args(argv)
+
+    store = PostStore(args.root)
+    if args.command == 'import':
+        print(f"Imported {store.import_master(args.master_file)} rows into {args.root}")
+    elif args.command == 'summary':
+        start = time.time() - args.days * 86400 if args.days else args.start
+        months = store.prune(start, args.end)
+        print(f"Partitions read: {len(months)} of {len(store.partitions())}")
+        print_summary(store.read(start, args.end), 'Posts in range')
+    elif args.command == 'compact':
+        report = store.compact(int(args.small_mb * 1024 * 1024))
+        print(f"Compacted {report['partitions']} partitions: {report['files_before']} -> {report['files_after']} files, "
+              f"{report['bytes_before']:,} -> {report['bytes_after']:,} bytes, "
+              f"{report['rows_dropped']} duplicate rows dropped in {report['seconds']}s")
+    else:
+        for stats in store.partition_stats():
+            print(f"{stats['month']}: {stats['files']} files, {stats['bytes']:,} bytes")
+
+
+if __name__ == '__main__':
+    main()
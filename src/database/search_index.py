@@ -0,0 +1,234 @@
+"""
+Full-text search over collected posts.
+
+A SQLite FTS5 index (`data/store/search.db`) is kept next to the post
+store: every `PostStore.append` adds its new posts to it, so there is no
+separate indexing pass. One document per post (title and body); the
+cards it was stored under are kept with it. Queries return post ids
+ranked by BM25 (title matches weigh more than body matches) with a
+highlighted snippet, optionally limited to a creation-time range.
+
+    python src/database/search_index.py '5/24'
+    python src/database/search_index.py 'pre-approved in branch' --start 2025-01-01 --limit 5
+    python src/database/search_index.py '"pre approved" OR preapproved NEAR(branch)' --raw
+    python src/database/search_index.py --rebuild
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics
+
+SEARCH_INDEX_FILE = 'data/store/search.db'
+
+# Title hits count double in the BM25 score
+TITLE_WEIGHT = 2.0
+BODY_WEIGHT = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    url TEXT,
+    created_utc REAL,
+    cards TEXT,
+    UNIQUE (source, post_id)
+);
+CREATE INDEX IF NOT EXISTS docs_created ON docs (created_utc);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(title, body, tokenize = 'unicode61');
+"""
+
+QUERY_TOKEN_PATTERN = re.compile(r'"[^"]*"|\S+')
+
+
+@dataclass
+class SearchHit:
+    post_id: str
+    source: str
+    url: str
+    created_utc: Optional[float]
+    cards: str
+    score: float
+    snippet: str
+
+
+def to_match_query(text: str) -> str:
+    """
+    Plain search text as an FTS5 query: every term must appear.
+
+    Each term is quoted, so '5/24' or 'pre-approved' match as phrases
+    ('5 24', 'pre approved') instead of being read as FTS5 operators.
+    """
+    terms = []
+    for token in QUERY_TOKEN_PATTERN.findall(text):
+        token = token.strip('"').replace('"', '')
+        if token:
+            terms.append(f'"{token}"')
+    return ' '.join(terms)
+
+
+class SearchIndex:
+    """SQLite FTS5 index of post titles and bodies"""
+
+    def __init__(self, path: str = SEARCH_INDEX_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def add_rows(self, rows: Iterable[Sequence]) -> int:
+        """
+        Index post-store rows (STORE_COLUMNS order); returns new posts indexed.
+
+        A post stored once per card is indexed once, with its cards listed.
+        """
+        from database.post_store import STORE_COLUMNS, event_time
+        position = {column: i for i, column in enumerate(STORE_COLUMNS)}
+
+        added = 0
+        with closing(self._connect()) as connection, connection:
+            for row in rows:
+                key = (row[position['Source']], str(row[position['Post_Id']]))
+                card = row[position['Card_Name']]
+                existing = connection.execute(
+                    'SELECT id, cards FROM docs WHERE source = ? AND post_id = ?', key).fetchone()
+                if existing:
+                    doc_id, cards = existing
+                    if card and card not in cards.split('|'):
+                        connection.execute('UPDATE docs SET cards = ? WHERE id = ?',
+                                           ('|'.join(filter(None, [cards, card])), doc_id))
+                    continue
+
+                cursor = connection.execute(
+                    'INSERT INTO docs (source, post_id, url, created_utc, cards) VALUES (?, ?, ?, ?, ?)',
+                    (*key, row[position['URL']], event_time(row), card or ''))
+                connection.execute('INSERT INTO posts_fts (rowid, title, body) VALUES (?, ?, ?)',
+                                   (cursor.lastrowid, row[position['Title']], row[position['Body']]))
+                added += 1
+        metrics.incr('search_index.posts_added', added)
+        return added
+
+    def search(self, query: str, limit: int = 20, start: Optional[float] = None, end: Optional[float] = None,
+               card: Optional[str] = None, raw: bool = False) -> List[SearchHit]:
+        """
+        Posts matching `query`, best first.
+
+        Args:
+            query (str): Search text; every term must appear. With `raw`, FTS5 query syntax
+            limit (int): Maximum hits
+            start (Optional[float]): Earliest creation time (epoch seconds), inclusive
+            end (Optional[float]): Latest creation time (epoch seconds), exclusive
+            card (Optional[str]): Only posts stored under this card
+            raw (bool): Pass the query to FTS5 unchanged (OR, NEAR, prefix*)
+
+        Returns:
+            list: SearchHit per matching post
+
+        Raises:
+            ValueError: If a raw query isn't valid FTS5 syntax
+        """
+        match = query if raw else to_match_query(query)
+        if not match:
+            return []
+
+        sql = [f"""
+            SELECT docs.post_id, docs.source, docs.url, docs.created_utc, docs.cards,
+                   bm25(posts_fts, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score,
+                   snippet(posts_fts, -1, '[', ']', '...', 12)
+            FROM posts_fts JOIN docs ON docs.id = posts_fts.rowid
+            WHERE posts_fts MATCH ?"""]
+        params: list = [match]
+        if start is not None:
+            sql.append('AND docs.created_utc >= ?')
+            params.append(start)
+        if end is not None:
+            sql.append('AND docs.created_utc < ?')
+            params.append(end)
+        if card:
+            sql.append("AND ('|' || docs.cards || '|') LIKE ?")
+            params.append(f'%|{card}|%')
+        sql.append('ORDER BY score LIMIT ?')
+        params.append(limit)
+
+        started = time.perf_counter()
+        with closing(self._connect()) as connection:
+            try:
+                rows = connection.execute('\n'.join(sql), params).fetchall()
+            except sqlite3.OperationalError as e:
+                if not raw:
+                    raise
+                raise ValueError(f"Invalid FTS5 query {query!r}: {e}") from e
+        metrics.observe('search_index.query_seconds', time.perf_counter() - started)
+        # bm25() is lower for better matches; report higher-is-better
+        return [SearchHit(post_id, source, url, created, cards, round(-score, 4), snippet)
+                for post_id, source, url, created, cards, score, snippet in rows]
+
+    def count(self) -> int:
+        with closing(self._connect()) as connection:
+            return connection.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+
+    def rebuild(self, store) -> int:
+        """Drop the index and re-add every post in the store"""
+        with closing(self._connect()) as connection, connection:
+            connection.execute('DELETE FROM docs')
+            connection.execute('DELETE FROM posts_fts')
+        from database.post_store import STORE_COLUMNS
+        added = 0
+        for df in store.iter_partitions(columns=STORE_COLUMNS):
+            added += self.add_rows(df.itertuples(index=False, name=None))
+        with closing(self._connect()) as connection:
+            connection.execute("INSERT INTO posts_fts (posts_fts) VALUES ('optimize')")
+        return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text search over collected posts")
+    parser.add_argument('query', nargs='?', default=None, help="Search text; every term must appear")
+    parser.add_argument('--limit', type=int, default=20, help="Maximum hits")
+    parser.add_argument('--start', default=None, help="Earliest creation date (YYYY-MM-DD)")
+    parser.add_argument('--end', default=None, help="Latest creation date, exclusive (YYYY-MM-DD)")
+    parser.add_argument('--card', default=None, help="Only posts about this card, e.g. 'Freedom Flex'")
+    parser.add_argument('--raw', action='store_true', help="Use FTS5 query syntax (OR, NEAR, prefix*)")
+    parser.add_argument('--rebuild', action='store_true', help="Re-index every post in the post store")
+    parser.add_argument('--index', default=SEARCH_INDEX_FILE, help="Index database")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.index)
+    if args.rebuild:
+        from database.post_store import PostStore
+        print(f"Indexed {index.rebuild(PostStore(index_file=None))} posts into {args.index}")
+    if not args.query:
+        if not args.rebuild:
+            parser.error("Give a query or --rebuild")
+        return
+
+    from database.post_store import to_timestamp
+    started = time.perf_counter()
+    try:
+        hits = index.search(args.query, args.limit, to_timestamp(args.start), to_timestamp(args.end), args.card, args.raw)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(hits)} hits for {args.query!r} in {elapsed_ms:.1f} ms ({index.count()} posts indexed)")
+    for hit in hits:
+        print(f"\n{hit.score:8.3f}  {hit.post_id}  {hit.source}  {hit.cards}")
+        print(f"          {hit.snippet}")
+        print(f"          {hit.url}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,10 @@ import re
 import numpy as np
 from datetime import datetime
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from extractors.schema import apply_schema, format_for_display, parse_int_column, memory_per_row
 
 def extract_approval_status(text):
     """Extract approval status from text"""
@@ -58,8 +62,13 @@ def extract_features_from_text(text):
     
     return features
 
-def create_comprehensive_dataset(input_file, output_file=None):
-    """Create comprehensive dataset with original posts and all extracted features"""
+def create_comprehensive_dataset(input_file, output_file=None, display=False):
+    """Create comprehensive dataset with original posts and all extracted features
+    
+    The output keeps typed columns (empty cells for missing numbers, True/False
+    flags). Pass display=True to export the human-readable 'Not extracted' and
+    Yes/No rendering instead.
+    """
     
     print(f"Loading data from {input_file}...")
     df = pd.read_csv(input_file)
@@ -79,18 +88,14 @@ def create_comprehensive_dataset(input_file, output_file=None):
     # Step 3: Clean and convert extracted fields
     print("Cleaning extracted fields...")
     
-    # Clean income (remove $ and commas, convert to numeric)
-    df['income_clean'] = pd.to_numeric(df['Extracted Income'].astype(str).str.replace('$', '').str.replace(',', ''), errors='coerce')
-    
-    # Clean credit score (convert to numeric)
-    df['credit_score_clean'] = pd.to_numeric(df['Extracted Credit Score'], errors='coerce')
-    
-    # Clean approval amount (remove $ and commas, convert to numeric)
-    df['approval_amount_clean'] = pd.to_numeric(df['Extracted Approval Amount'].astype(str).str.replace('$', '').str.replace(',', ''), errors='coerce')
+    # Clean income, credit score and approval amount (strip $ and commas, nullable ints)
+    df['income_clean'] = parse_int_column(df['Extracted Income'])
+    df['credit_score_clean'] = parse_int_column(df['Extracted Credit Score'])
+    df['approval_amount_clean'] = parse_int_column(df['Extracted Approval Amount'])
     
     # Step 4: Create target variable
     print("Creating target variable...")
-    df['target'] = (df['approval_status'] == 'approved').astype(int)
+    df['target'] = (df['approval_status'] == 'approved').astype('int8')
     
     # Step 5: Create comprehensive dataset with all information
     print("Creating comprehensive dataset...")
@@ -114,18 +119,8 @@ def create_comprehensive_dataset(input_file, output_file=None):
         'mentions_income', 'mentions_credit_score', 'text_length'
     ]
     
-    # Create comprehensive dataset
-    comprehensive_df = df[comprehensive_columns].copy()
-    
-    # Fill missing values for display
-    comprehensive_df['income_clean'] = comprehensive_df['income_clean'].fillna('Not extracted')
-    comprehensive_df['credit_score_clean'] = comprehensive_df['credit_score_clean'].fillna('Not extracted')
-    comprehensive_df['approval_amount_clean'] = comprehensive_df['approval_amount_clean'].fillna('Not extracted')
-    
-    # Convert boolean columns to Yes/No for readability
-    boolean_cols = ['is_student', 'is_first_card', 'has_chase_account', 'mentions_income', 'mentions_credit_score']
-    for col in boolean_cols:
-        comprehensive_df[col] = comprehensive_df[col].map({True: 'Yes', False: 'No'})
+    # Create comprehensive dataset with compact dtypes (Int32, category, bool)
+    comprehensive_df = apply_schema(df[comprehensive_columns])
     
     # Generate output filename if not provided
     if output_file is None:
@@ -136,18 +131,20 @@ def create_comprehensive_dataset(input_file, output_file=None):
     os.makedirs('data/processed', exist_ok=True)
     
     # Save comprehensive dataset
-    comprehensive_df.to_csv(output_file, index=False)
+    export_df = format_for_display(comprehensive_df) if display else comprehensive_df
+    export_df.to_csv(output_file, index=False)
     
     # Print summary
     print(f"\n=== Comprehensive Dataset Summary ===")
     print(f"Final shape: {comprehensive_df.shape}")
     print(f"Columns: {list(comprehensive_df.columns)}")
+    print(f"Memory per row: {memory_per_row(comprehensive_df):.0f} bytes")
     print(f"Approval status distribution:")
     print(comprehensive_df['approval_status'].value_counts())
     print(f"Target distribution:")
     print(comprehensive_df['target'].value_counts())
     print(f"\nSample of extracted data:")
-    print(comprehensive_df[['Title', 'approval_status', 'income_clean', 'credit_score_clean', 'is_student', 'is_first_card']].head(5))
+    print(format_for_display(comprehensive_df[['Title', 'approval_status', 'income_clean', 'credit_score_clean', 'is_student', 'is_first_card']].head(5)))
     print(f"\nSaved to: {output_file}")
     
     return output_file
@@ -209,8 +206,11 @@ def main():
     latest_file = sorted(processed_files)[-1]
     input_file = f'data/processed/{latest_file}'
     
+    # Export 'Not extracted'/Yes-No strings instead of typed columns
+    display = '--display' in sys.argv
+    
     print(f"Creating comprehensive dataset from {input_file}...")
-    output_file = create_comprehensive_dataset(input_file)
+    output_file = create_comprehensive_dataset(input_file, display=display)
     print(f"Comprehensive dataset created: {output_file}")
 
 if __name__ == "__main__":
@@ -3,6 +3,12 @@ import re
 import numpy as np
 from datetime import datetime
 import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics
+from extractors.schema import parse_int_column
 
 def extract_approval_status(text):
     """Extract approval status from text"""
@@ -62,35 +68,39 @@ def prepare_model_data(input_file, output_file=None):
     """Prepare extracted data for machine learning"""
     
     print(f"Loading data from {input_file}...")
+    stage_start = time.perf_counter()
     df = pd.read_csv(input_file)
+    metrics.observe('prepare.load_seconds', time.perf_counter() - stage_start)
+    metrics.incr('prepare.rows_in', len(df))
     
     print(f"Original shape: {df.shape}")
     
     # Step 1: Extract approval status
     print("Extracting approval status...")
+    stage_start = time.perf_counter()
     df['approval_status'] = df.apply(lambda row: extract_approval_status(f"{row['Title']} {row['Body']}"), axis=1)
+    metrics.observe('prepare.approval_status_seconds', time.perf_counter() - stage_start)
     
     # Step 2: Extract text features
     print("Extracting text features...")
+    stage_start = time.perf_counter()
     text_features = df.apply(lambda row: extract_features_from_text(f"{row['Title']} {row['Body']}"), axis=1)
     text_features_df = pd.DataFrame(text_features.tolist())
     df = pd.concat([df, text_features_df], axis=1)
+    metrics.observe('prepare.features_seconds', time.perf_counter() - stage_start)
     
     # Step 3: Clean and convert extracted fields
     print("Cleaning extracted fields...")
+    stage_start = time.perf_counter()
     
-    # Clean income (remove $ and commas, convert to numeric)
-    df['income_clean'] = pd.to_numeric(df['Extracted Income'].astype(str).str.replace('$', '').str.replace(',', ''), errors='coerce')
-    
-    # Clean credit score (convert to numeric)
-    df['credit_score_clean'] = pd.to_numeric(df['Extracted Credit Score'], errors='coerce')
-    
-    # Clean approval amount (remove $ and commas, convert to numeric)
-    df['approval_amount_clean'] = pd.to_numeric(df['Extracted Approval Amount'].astype(str).str.replace('$', '').str.replace(',', ''), errors='coerce')
+    # Clean income, credit score and approval amount (strip $ and commas, nullable ints)
+    df['income_clean'] = parse_int_column(df['Extracted Income'])
+    df['credit_score_clean'] = parse_int_column(df['Extracted Credit Score'])
+    df['approval_amount_clean'] = parse_int_column(df['Extracted Approval Amount'])
     
     # Step 4: Create target variable
     print("Creating target variable...")
-    df['target'] = (df['approval_status'] == 'approved').astype(int)
+    df['target'] = (df['approval_status'] == 'approved').astype('int8')
     
     # Step 5: Filter for usable data
     print("Filtering for usable data...")
@@ -127,14 +137,17 @@ def prepare_model_data(input_file, output_file=None):
     final_df = usable_df[model_features].copy()
     
     # Fill missing values with appropriate defaults
-    final_df['income_clean'] = final_df['income_clean'].fillna(final_df['income_clean'].median())
-    final_df['credit_score_clean'] = final_df['credit_score_clean'].fillna(final_df['credit_score_clean'].median())
+    for col in ['income_clean', 'credit_score_clean']:
+        median = final_df[col].median()
+        if pd.notna(median):
+            final_df[col] = final_df[col].fillna(int(median))
     final_df['approval_amount_clean'] = final_df['approval_amount_clean'].fillna(0)  # 0 if no approval amount
+    final_df['text_length'] = final_df['text_length'].astype('int32')
     
     # Convert boolean columns to int
     boolean_cols = ['is_student', 'is_first_card', 'has_chase_account', 'mentions_income', 'mentions_credit_score']
     for col in boolean_cols:
-        final_df[col] = final_df[col].astype(int)
+        final_df[col] = final_df[col].astype('int8')
     
     # Generate output filename if not provided
     if output_file is None:
@@ -146,6 +159,8 @@ def prepare_model_data(input_file, output_file=None):
     
     # Save model-ready data
     final_df.to_csv(output_file, index=False)
+    metrics.observe('prepare.clean_and_save_seconds', time.perf_counter() - stage_start)
+    metrics.incr('prepare.rows_out', len(final_df))
     
     # Print summary
     print(f"\n=== Model Ready Data Summary ===")
@@ -177,6 +192,7 @@ def main():
     print(f"Preparing model data from {input_file}...")
     output_file = prepare_model_data(input_file)
     print(f"Model preparation completed: {output_file}")
+    print(f"Run summary saved to: {metrics.write_summary('prepare')}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,309 @@
+"""
+Embedding-based relevance pre-filter ahead of the LLM relevance check.
+
+Posts are embedded (a small local sentence-transformers model when it is
+installed, otherwise a hashed bag-of-words vector) and compared against
+labeled prototype vectors with one matrix multiplication. The margin
+between the best "relevant" and best "irrelevant" prototype decides the
+post: confident cases are accepted or rejected outright and only the
+ambiguous middle band is sent to the LLM. Embeddings are cached per post id
+so re-runs only embed new posts.
+
+The accept/reject margins are calibrated against LLM labels rather than
+fixed: a calibration run sends every post to the LLM and picks, per
+embedder, the widest margins whose accepted and rejected posts still agree
+with the LLM at `TARGET_PRECISION`. Without a calibration for the current
+embedder the pre-filter decides nothing.
+"""
+
+import json
+import os
+import re
+import zlib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+
+from utils.metrics import metrics
+
+EMBEDDING_CACHE_FILE = 'data/processed/embedding_cache.npz'
+CALIBRATION_FILE = 'data/processed/prefilter_calibration.json'
+
+SENTENCE_MODEL = 'all-MiniLM-L6-v2'
+
+# Margin (best relevant - best irrelevant cosine) outside which the LLM is skipped.
+# Uncalibrated defaults; llm_filter only uses calibrated margins
+ACCEPT_MARGIN = 0.08
+REJECT_MARGIN = -0.08
+
+# Share of pre-filter accepts (rejects) the LLM must agree with
+TARGET_PRECISION = 0.95
+# Fewest posts a calibrated accept or reject band may rest on
+MIN_CALIBRATION_POSTS = 20
+
+# Labeled prototypes; extend with real labeled posts via build_prototypes(labeled_df=...)
+PROTOTYPES = {
+    'relevant': [
+        "Approved for Chase Freedom Unlimited today with a 5k starting limit, income 60k, credit score 720",
+        "Got denied for the Freedom Unlimited, too many recent inquiries, called recon and they would not budge",
+        "Instant approval for Chase Freedom Flex, first credit card, student with 680 FICO",
+        "CFU approval data point: 3 years history, 750 score, 12k credit limit",
+        "Freedom Flex denied due to 5/24, reconsideration line could not help",
+        "Finally approved for my first Chase card, the Freedom Unlimited, after being denied last year"
+    ],
+    'irrelevant': [
+        "Which card should I get next for travel rewards, Sapphire Preferred or Venture X?",
+        "How do I redeem Ultimate Rewards points for flights?",
+        "Approved for Capital One Savor with a 3k limit",
+        "Should I pay my statement balance or current balance to build credit?",
+        "Chase customer service is terrible, my payment has been pending for days",
+        "What is the best way to maximize the rotating 5% categories this quarter?"
+    ]
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9$]+")
+
+
+class HashingEmbedder:
+    """Signed hashed bag of words and bigrams, L2-normalized (no model download needed)"""
+
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+
+    def _vector(self, text: str) -> np.ndarray:
+        tokens = _TOKEN_RE.findall(str(text).lower())
+        features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+
+        hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features), dtype=np.uint64, count=len(features))
+        signs = np.where(hashes & np.uint64(1 << 31), -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, (hashes % np.uint64(self.dim)).astype(np.int64), signs)
+        # Sublinear term frequency keeps long posts from being dominated by repeats
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if not len(texts):
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.vstack([self._vector(text) for text in texts])
+
+
+class SentenceEmbedder:
+    """Small CPU sentence-transformers model (optional dependency)"""
+
+    def __init__(self, model_name: str = SENTENCE_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f'st-{model_name}'
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts), batch_size=64, normalize_embeddings=True,
+                                            show_progress_bar=False), dtype=np.float32)
+
+
+def get_embedder(kind: str = 'auto'):
+    """'sentence', 'hashing', or 'auto' (sentence-transformers if it loads, else hashing)"""
+    if kind in ('auto', 'sentence'):
+        try:
+            return SentenceEmbedder()
+        except ImportError:
+            if kind == 'sentence':
+                raise
+            print("sentence-transformers not installed; using hashed bag-of-words embeddings")
+        except OSError as e:
+            # Model files missing and no way to download them
+            if kind == 'sentence':
+                raise
+            print(f"Could not load {SENTENCE_MODEL} ({e}); using hashed bag-of-words embeddings")
+    return HashingEmbedder()
+
+
+class EmbeddingCache:
+    """Post id -> embedding, persisted as .npz and tied to the embedder that produced it"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_FILE, embedder_name: str = ''):
+        self.path = path
+        self.embedder_name = embedder_name
+        self.vectors: Dict[str, np.ndarray] = {}
+        self.dirty = False
+
+        if os.path.exists(path):
+            data = np.load(path, allow_pickle=False)
+            # Vectors from a different embedder aren't comparable; start over
+            if str(data['embedder']) == embedder_name:
+                self.vectors = dict(zip(data['ids'].tolist(), data['vectors']))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def embed(self, ids: Sequence[str], texts: Sequence[str], embedder) -> np.ndarray:
+        """Embeddings for the given posts, computing only the ones not cached yet"""
+        missing = [i for i, post_id in enumerate(ids) if post_id not in self.vectors]
+        metrics.incr('prefilter.embedding_cache.hits', len(ids) - len(missing))
+        metrics.incr('prefilter.embedding_cache.misses', len(missing))
+
+        if missing:
+            new_vectors = embedder.encode([texts[i] for i in missing])
+            for i, vector in zip(missing, new_vectors):
+                self.vectors[ids[i]] = vector
+            self.dirty = True
+
+        if not len(ids):
+            return np.empty((0, embedder.dim), dtype=np.float32)
+        return np.vstack([self.vectors[post_id] for post_id in ids])
+
+    def save(self):
+        if not self.dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        ids = list(self.vectors)
+        vectors = np.vstack([self.vectors[post_id] for post_id in ids]) if ids else np.empty((0, 0), dtype=np.float32)
+        with open(self.path, 'wb') as f:
+            np.savez_compressed(f, ids=np.array(ids, dtype=str), vectors=vectors,
+                                embedder=np.array(self.embedder_name))
+        self.dirty = False
+
+
+def build_prototypes(embedder, labeled_df: Optional[pd.DataFrame] = None) -> Dict[str, np.ndarray]:
+    """
+    Prototype matrices per label.
+
+    Args:
+        embedder: Object with encode(texts) -> (n, dim) array
+        labeled_df (pd.DataFrame): Optional Title/Body/relevant rows added to the built-in examples
+
+    Returns:
+        dict: {'relevant': (k, dim) array, 'irrelevant': (m, dim) array}
+    """
+    examples = {label: list(texts) for label, texts in PROTOTYPES.items()}
+    if labeled_df is not None and len(labeled_df):
+        texts = (labeled_df['Title'].fillna('').astype(str) + ' ' + labeled_df['Body'].fillna('').astype(str)).tolist()
+        for text, relevant in zip(texts, labeled_df['relevant'].astype(bool)):
+            examples['relevant' if relevant else 'irrelevant'].append(text)
+    return {label: embedder.encode(texts) for label, texts in examples.items()}
+
+
+def relevance_margins(embeddings: np.ndarray, prototypes: Dict[str, np.ndarray]) -> np.ndarray:
+    """Best relevant minus best irrelevant cosine similarity for every post, in one pass"""
+    stacked = np.vstack([prototypes['relevant'], prototypes['irrelevant']])
+    similarities = embeddings @ stacked.T
+    n_relevant = len(prototypes['relevant'])
+    return similarities[:, :n_relevant].max(axis=1) - similarities[:, n_relevant:].max(axis=1)
+
+
+def _band_threshold(margins: np.ndarray, agrees: np.ndarray, target_precision: float,
+                    min_posts: int) -> Optional[tuple]:
+    """
+    Widest band from the top of `margins` (sorted best first) whose posts agree at target precision.
+
+    Returns:
+        tuple: (threshold margin, precision, posts in band), or None when no band qualifies
+    """
+    precision = np.cumsum(agrees) / np.arange(1, len(agrees) + 1)
+    # A threshold can only fall between distinct margins
+    ends = np.append(margins[1:] != margins[:-1], True)
+    valid = np.flatnonzero(ends & (precision >= target_precision) & (np.arange(1, len(agrees) + 1) >= min_posts))
+    if not len(valid):
+        return None
+    k = valid[-1]
+    return float(margins[k]), round(float(precision[k]), 4), int(k + 1)
+
+
+def calibrate_margins(margins: np.ndarray, relevant: np.ndarray, embedder_name: str,
+                      target_precision: float = TARGET_PRECISION,
+                      min_posts: int = MIN_CALIBRATION_POSTS) -> Dict[str, object]:
+    """
+    Accept/reject margins from posts the LLM has labeled.
+
+    Args:
+        margins (np.ndarray): prefilter_margin of each post
+        relevant (np.ndarray): The LLM's relevance answer for each post
+        embedder_name (str): Embedder the margins came from (calibrations don't transfer)
+        target_precision (float): Required agreement with the LLM in each band
+        min_posts (int): Fewest posts a band may rest on
+
+    Returns:
+        dict: Margins (None where no band qualifies), their precision and coverage
+    """
+    margins = np.asarray(margins, dtype=float)
+    relevant = np.asarray(relevant, dtype=bool)
+    calibration = {'embedder': embedder_name, 'posts': int(len(margins)), 'target_precision': target_precision,
+                   'accept_margin': None, 'accept_precision': None, 'accepted': 0,
+                   'reject_margin': None, 'reject_precision': None, 'rejected': 0}
+
+    order = np.argsort(-margins, kind='stable')
+    accept = _band_threshold(margins[order], relevant[order], target_precision, min_posts)
+    if accept:
+        calibration['accept_margin'], calibration['accept_precision'], calibration['accepted'] = accept
+
+    # The reject band has to stay below the accept band
+    below = margins < calibration['accept_margin'] if accept else np.ones(len(margins), dtype=bool)
+    order = np.argsort(margins[below], kind='stable')
+    reject = _band_threshold(margins[below][order], ~relevant[below][order], target_precision, min_posts)
+    if reject:
+        calibration['reject_margin'], calibration['reject_precision'], calibration['rejected'] = reject
+    return calibration
+
+
+def save_calibration(calibration: Dict[str, object], path: str = CALIBRATION_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(calibration, f, indent=2)
+
+
+def load_calibration(embedder_name: str, path: str = CALIBRATION_FILE) -> Optional[Dict[str, object]]:
+    """Calibration for this embedder, or None if it hasn't been calibrated"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        calibration = json.load(f)
+    return calibration if calibration.get('embedder') == embedder_name else None
+
+
+def prefilter_posts(df: pd.DataFrame, embedder=None, cache: Optional[EmbeddingCache] = None,
+                    prototypes: Optional[Dict[str, np.ndarray]] = None, id_column: str = 'URL',
+                    accept_margin: float = ACCEPT_MARGIN, reject_margin: float = REJECT_MARGIN) -> pd.DataFrame:
+    """
+    Score posts against the prototypes and decide which still need the LLM.
+
+    Args:
+        df (pd.DataFrame): Posts with Title and Body (and `id_column` for caching)
+        embedder: Embedder to use (defaults to get_embedder())
+        cache (EmbeddingCache): Per-post embedding cache
+        prototypes (dict): Output of build_prototypes
+        id_column (str): Column used as the cache key
+        accept_margin (float): Margin at or above which a post is accepted
+        reject_margin (float): Margin at or below which a post is rejected
+
+    Returns:
+        pd.DataFrame: df with `prefilter_margin` and `prefilter_decision`
+            ('accept', 'reject' or 'llm') columns
+    """
+    embedder = embedder or get_embedder()
+    prototypes = prototypes or build_prototypes(embedder)
+
+    texts = (df['Title'].fillna('').astype(str) + ' ' + df['Body'].fillna('').astype(str)).tolist()
+    if cache is not None and id_column in df.columns:
+        ids = df[id_column].astype(str).tolist()
+        embeddings = cache.embed(ids, texts, embedder)
+    else:
+        embeddings = embedder.encode(texts)
+
+    margins = relevance_margins(embeddings, prototypes) if len(df) else np.empty(0)
+    decisions = np.where(margins >= accept_margin, 'accept',
+                         np.where(margins <= reject_margin, 'reject', 'llm'))
+
+    result = df.copy()
+    result['prefilter_margin'] = margins
+    result['prefilter_decision'] = decisions
+
+    for decision in ['accept', 'reject', 'llm']:
+        metrics.incr(f'prefilter.{decision}', int((decisions == decision).sum()))
+    return result
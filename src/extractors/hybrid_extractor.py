@@ -1,13 +1,19 @@
 import pandas as pd
 import re
 import os
+import sys
+import argparse
 import json
+import time
+import csv
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Iterator, Optional
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 # Import the rule-based functions from title_focused_extractor
-from title_focused_extractor import (
+from extractors.title_focused_extractor import (
     classify_approval_status_from_title,
     extract_income_from_title_and_body,
     extract_credit_score_from_title_and_body,
@@ -16,28 +22,72 @@ from title_focused_extractor import (
     verify_freedom_card_mention,
     extract_features_from_text
 )
+from utils.card_registry import get_registry
+from utils.proximity_index import outcome_attributed_to_card
+from utils.near_dedupe import drop_near_duplicates, NearDuplicateIndex, post_text
+from utils.metrics import metrics, configure_logging
+from utils.prompt_context import context_for_prompt, print_token_savings, CLASSIFICATION_BODY_BUDGET
+from utils.llm_client import OllamaClient, ModelCascade, parse_model_list, adaptive_map, DEFAULT_CASCADE, MAX_CONCURRENCY, OLLAMA_URL
+from utils.checkpoint import Checkpoint, RunInterrupted, checkpoint_path, interruptible, row_key
+from extractors.schema import apply_schema, format_for_display, clean_int_range, clean_int_value, memory_per_row
+from extractors.quality_metrics import record_quality_metrics
+from extractors.provenance import ProvenanceLog, provenance_path, provenance_writer
+
+logger = logging.getLogger(__name__)
+
+# Cascade tiers keep answers at or above this confidence (0-10)
+CASCADE_MIN_CONFIDENCE = 7
+_cascades: Dict[str, ModelCascade] = {}
+
+TARGET_CARDS = get_registry().tracked_cards
+
+COMPREHENSIVE_COLUMNS = [
+    'Title', 'URL', 'Body', 'Source', 'Card_Name', 'Scraped_At',
+    'approval_status', 'title_quality_score',
+    'Extracted Income', 'Extracted Credit Score', 'Extracted Approval Amount',
+    'income_clean', 'credit_score_clean', 'approval_amount_clean',
+    'target', 'is_student', 'is_first_card', 'has_chase_account',
+    'mentions_income', 'mentions_credit_score', 'text_length'
+]
+
+# Columns filled by the rule-based step
+RULE_COLUMNS = [
+    'approval_status', 'title_quality_score',
+    'Extracted Income', 'Extracted Credit Score', 'Extracted Approval Amount'
+]
+
+LLM_COLUMNS = [
+    'llm_approval_status', 'llm_confidence', 'llm_income', 
+    'llm_credit_score', 'llm_approval_amount', 'llm_reasoning', 'used_llm'
+]
 
 def setup_ollama_client(model: str = "mistral"):
     """Setup Ollama client with local model"""
     # Test if Ollama is running
-    try:
-        response = requests.get("http://localhost:11434/api/tags")
-        if response.status_code == 200:
-            print(f"Ollama is running. Using model: {model}")
-            return model
-        else:
-            raise Exception("Ollama not responding")
-    except Exception as e:
-        raise Exception(f"Ollama not running or not accessible: {e}")
+    if OllamaClient().is_available():
+        print(f"Ollama is running. Using model: {model}")
+        return model
+    raise Exception(f"Ollama not running or not accessible at {OLLAMA_URL}")
+
+def get_cascade(model: str) -> ModelCascade:
+    """Cascade for a model spec; 'phi3:mini,mistral' escalates from the first model to the last"""
+    if model not in _cascades:
+        _cascades[model] = ModelCascade(parse_model_list(model), OllamaClient(timeout_seconds=30, max_retries=1))
+    return _cascades[model]
 
-def llm_classify_post(title: str, body: str, card_name: str, model: str = "mistral") -> Dict[str, Any]:
-    """Use Ollama LLM to classify a single post"""
+def llm_classify_post(title: str, body: str, card_name: str, model: str = "mistral",
+                      rule_status: Optional[str] = None) -> Dict[str, Any]:
+    """Use Ollama LLM to classify a single post
+    
+    `model` may be a comma-separated cascade (smallest first); answers below
+    CASCADE_MIN_CONFIDENCE, or contradicting `rule_status`, escalate.
+    """
     
     prompt = f"""
 You are analyzing a Reddit post about credit card applications. Please classify this post and extract key information.
 
 POST TITLE: {title}
-POST BODY: {body}
+POST BODY: {context_for_prompt(body, CLASSIFICATION_BODY_BUDGET)}
 CARD: {card_name}
 
 IMPORTANT: Only classify posts that are about {card_name} (Freedom Unlimited or Freedom Flex). If the post is clearly about other cards (Capital One, Citi, Amex, etc.) and doesn't mention {card_name}, mark as "unknown".
@@ -72,53 +122,17 @@ Respond only with valid JSON.
 """
 
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.1,
-                    "num_predict": 300
-                }
-            },
-            timeout=30
+        result, _ = get_cascade(model).run(
+            prompt,
+            parse=parse_classification_response,
+            accept=lambda result: is_confident_classification(result, rule_status),
+            num_predict=300
         )
-        
-        if response.status_code == 200:
-            result_text = response.json()["response"]
-            # Clean up the response to extract JSON
-            result_text = result_text.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
-            
-            try:
-                result = json.loads(result_text)
-                return result
-            except json.JSONDecodeError:
-                # Try to extract JSON from the response
-                import re
-                json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-                if json_match:
-                    try:
-                        result = json.loads(json_match.group())
-                        return result
-                    except:
-                        pass
-                
-                # If all else fails, return a default response
-                return {
-                    "approval_status": "unknown",
-                    "confidence": 0,
-                    "income": None,
-                    "credit_score": None,
-                    "approval_amount": None,
-                    "reasoning": f"Failed to parse LLM response: {result_text[:100]}"
-                }
-        else:
-            raise Exception(f"Ollama API error: {response.status_code}")
+        return result
     
     except Exception as e:
-        print(f"LLM classification failed: {e}")
+        metrics.incr('hybrid.llm_failures')
+        logger.warning(f"LLM classification failed: {e}")
         return {
             "approval_status": "unknown",
             "confidence": 0,
@@ -128,8 +142,88 @@ Respond only with valid JSON.
             "reasoning": f"LLM error: {str(e)}"
         }
 
-def validate_with_llm(df: pd.DataFrame, confidence_threshold: int = 5, model: str = "mistral") -> pd.DataFrame:
-    """Use LLM to validate posts with low confidence scores"""
+def parse_classification_response(result_text: str) -> Dict[str, Any]:
+    """Parse the JSON classification returned by the model"""
+    # Clean up the response to extract JSON
+    result_text = result_text.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    
+    try:
+        return json.loads(result_text)
+    except json.JSONDecodeError:
+        # Try to extract JSON from the response
+        json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                pass
+        
+        # If all else fails, return a default response
+        metrics.incr('llm.parse_failures')
+        return {
+            "approval_status": "unknown",
+            "confidence": 0,
+            "income": None,
+            "credit_score": None,
+            "approval_amount": None,
+            "reasoning": f"Failed to parse LLM response: {result_text[:100]}"
+        }
+
+def is_confident_classification(result: Dict[str, Any], rule_status: Optional[str] = None) -> bool:
+    """Whether a cascade tier's answer can be kept without asking a larger model"""
+    try:
+        confidence = float(result.get('confidence') or 0)
+    except (TypeError, ValueError):
+        return False
+    if confidence < CASCADE_MIN_CONFIDENCE:
+        return False
+    
+    # Disagreeing with a clear rule-based decision escalates as well
+    status = result.get('approval_status')
+    decided = ['approved', 'denied']
+    return not (rule_status in decided and status in decided and status != rule_status)
+
+def llm_result_updates(title_quality_score, llm_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Column updates for one post from an LLM classification"""
+    updates = {
+        'llm_approval_status': llm_result['approval_status'],
+        'llm_confidence': llm_result['confidence'],
+        'llm_income': llm_result['income'],
+        'llm_credit_score': llm_result['credit_score'],
+        'llm_approval_amount': llm_result['approval_amount'],
+        'llm_reasoning': llm_result['reasoning'],
+        'used_llm': True
+    }
+    
+    # Override rule-based classification if LLM is more confident
+    if llm_result['confidence'] > title_quality_score:
+        updates['approval_status'] = llm_result['approval_status']
+        updates['title_quality_score'] = llm_result['confidence']
+        
+        # Override extracted values if LLM found them
+        if llm_result['income']:
+            updates['Extracted Income'] = llm_result['income']
+        if llm_result['credit_score']:
+            updates['Extracted Credit Score'] = llm_result['credit_score']
+        if llm_result['approval_amount']:
+            updates['Extracted Approval Amount'] = llm_result['approval_amount']
+    
+    # If LLM says it's not about Freedom cards, mark for exclusion
+    if llm_result['approval_status'] == 'unknown' and 'not about freedom' in llm_result['reasoning'].lower():
+        updates['approval_status'] = 'exclude'
+    
+    return updates
+
+def validate_with_llm(df: pd.DataFrame, confidence_threshold: int = 5, model: str = "mistral",
+                      checkpoint: Optional[Checkpoint] = None,
+                      provenance: Optional[ProvenanceLog] = None) -> pd.DataFrame:
+    """Use LLM to validate posts with low confidence scores
+    
+    With a checkpoint, each post's LLM updates are appended to it as they
+    complete and posts already in it are restored without calling the LLM.
+    Ctrl-C stops after the current post and raises RunInterrupted. Fields the
+    LLM overrides are recorded in `provenance`.
+    """
     
     print(f"Validating {len(df)} posts with LLM (confidence threshold: {confidence_threshold})...")
     
@@ -143,53 +237,65 @@ def validate_with_llm(df: pd.DataFrame, confidence_threshold: int = 5, model: st
     df['used_llm'] = False
     
     llm_count = 0
+    resumed_count = 0
+    
+    def apply_updates(idx, key, updates):
+        # Update with LLM results (and overrides when the LLM is more confident)
+        for column, value in updates.items():
+            df.at[idx, column] = value
+        if provenance is not None:
+            provenance.record_llm(key, updates, model)
+    
+    def rows_to_classify():
+        nonlocal resumed_count
+        for idx, row in df.iterrows():
+            key = row_key(row)
+            if checkpoint is not None and key in checkpoint:
+                apply_updates(idx, key, checkpoint.get(key))
+                resumed_count += 1
+            else:
+                yield idx, row, key
     
-    for idx, row in df.iterrows():
+    def classify(item):
+        idx, row, _ = item
         # Use LLM for all posts to get confidence scores and validation
-        print(f"Using LLM for post {idx + 1}/{len(df)}: {row['Title'][:50]}...")
-        
+        logger.debug(f"Using LLM for post {idx + 1}/{len(df)}: {row['Title'][:50]}...")
         llm_result = llm_classify_post(
             row['Title'], 
             row['Body'], 
             row['Card_Name'],
-            model
+            model,
+            rule_status=row['approval_status']
         )
-        
-        # Update with LLM results
-        df.at[idx, 'llm_approval_status'] = llm_result['approval_status']
-        df.at[idx, 'llm_confidence'] = llm_result['confidence']
-        df.at[idx, 'llm_income'] = llm_result['income']
-        df.at[idx, 'llm_credit_score'] = llm_result['credit_score']
-        df.at[idx, 'llm_approval_amount'] = llm_result['approval_amount']
-        df.at[idx, 'llm_reasoning'] = llm_result['reasoning']
-        df.at[idx, 'used_llm'] = True
-        
-        llm_count += 1
-        
-        # Override rule-based classification if LLM is more confident
-        if llm_result['confidence'] > row['title_quality_score']:
-            df.at[idx, 'approval_status'] = llm_result['approval_status']
-            df.at[idx, 'title_quality_score'] = llm_result['confidence']
-            
-            # Override extracted values if LLM found them
-            if llm_result['income']:
-                df.at[idx, 'Extracted Income'] = llm_result['income']
-            if llm_result['credit_score']:
-                df.at[idx, 'Extracted Credit Score'] = llm_result['credit_score']
-            if llm_result['approval_amount']:
-                df.at[idx, 'Extracted Approval Amount'] = llm_result['approval_amount']
-        
-        # If LLM says it's not about Freedom cards, mark for exclusion
-        if llm_result['approval_status'] == 'unknown' and 'not about freedom' in llm_result['reasoning'].lower():
-            df.at[idx, 'approval_status'] = 'exclude'
-    
-    print(f"LLM validation completed. Used LLM for {llm_count} posts.")
+        return llm_result_updates(row['title_quality_score'], llm_result)
+    
+    # Calls overlap as far as the shared concurrency limiter allows; results arrive in row order
+    with interruptible(checkpoint) as stop:
+        for (idx, row, key), updates in adaptive_map(classify, rows_to_classify(), should_stop=lambda: stop.requested):
+            apply_updates(idx, key, updates)
+            if checkpoint is not None:
+                checkpoint.record(key, updates)
+            llm_count += 1
+            metrics.incr('hybrid.llm_rows')
+        stop.check()
+    
+    metrics.incr('hybrid.llm_rows_resumed', resumed_count)
+    print(f"LLM validation completed. Used LLM for {llm_count} posts ({resumed_count} restored from checkpoint).")
+    get_cascade(model).print_report()
+    print_token_savings()
     return df
 
 def hybrid_extract_fields(input_file: str, output_file: str = None, 
                          use_llm: bool = True, confidence_threshold: int = 5,
-                         model: str = "mistral") -> str:
-    """Hybrid extraction using rules first, then LLM validation for uncertain cases"""
+                         model: str = "mistral", display: bool = False,
+                         resume: bool = False) -> str:
+    """Hybrid extraction using rules first, then LLM validation for uncertain cases
+    
+    Output columns are typed (nullable ints, True/False flags); display=True
+    exports the 'Not extracted' and Yes/No rendering instead. LLM results are
+    checkpointed per post; resume=True skips posts an interrupted run finished.
+    Which extractor produced each field is saved to <output>.provenance.csv.
+    """
     
     print("Starting hybrid extraction...")
     
@@ -197,88 +303,75 @@ def hybrid_extract_fields(input_file: str, output_file: str = None,
     print("Step 1: Rule-based extraction...")
     
     # Load dataset
+    stage_start = time.perf_counter()
     df = pd.read_csv(input_file)
+    metrics.incr('hybrid.rows_in', len(df))
     
     # Initialize new columns
     df['approval_status'] = ''
     df['title_quality_score'] = 0
-    df['Extracted Income'] = ''
-    df['Extracted Credit Score'] = ''
-    df['Extracted Approval Amount'] = ''
+    df['Extracted Income'] = None
+    df['Extracted Credit Score'] = None
+    df['Extracted Approval Amount'] = None
     
-    # Process each row with rule-based extraction
+    # Process each row with rule-based extraction, recording which rule produced each field
+    provenance = ProvenanceLog()
     for idx, row in df.iterrows():
-        title = str(row['Title'])
-        body = str(row['Body'])
-        
-        # Use Decision column if available, otherwise classify from title
-        if 'Decision' in df.columns:
-            decision = str(row['Decision']).lower()
-            if decision in ['approved', 'pre-approved']:
-                approval_status = 'approved'
-            elif decision in ['denied', 'rejected']:
-                approval_status = 'denied'
-            else:
-                approval_status = classify_approval_status_from_title(title)
-        else:
-            # Fallback to title classification
-            approval_status = classify_approval_status_from_title(title)
-        
-        df.at[idx, 'approval_status'] = approval_status
-        
-        # Calculate title quality score
-        quality_score = calculate_title_quality_score(title)
-        df.at[idx, 'title_quality_score'] = quality_score
-        
-        # Extract other fields (title first, then body)
-        income = extract_income_from_title_and_body(title, body)
-        if income:
-            df.at[idx, 'Extracted Income'] = income
-        
-        credit_score = extract_credit_score_from_title_and_body(title, body)
-        if credit_score:
-            df.at[idx, 'Extracted Credit Score'] = credit_score
-        
-        approval_amount = extract_approval_amount_from_title_and_body(title, body)
-        if approval_amount:
-            df.at[idx, 'Extracted Approval Amount'] = approval_amount
+        record = rule_extract_record(row.to_dict(), provenance)
+        for column in RULE_COLUMNS:
+            df.at[idx, column] = record[column]
+    
+    metrics.observe('hybrid.rules_seconds', time.perf_counter() - stage_start)
     
     # Step 2: Filter for high-quality posts
     print("Step 2: Filtering high-quality posts...")
+    stage_start = time.perf_counter()
     
     quality_df = df[
         (df['approval_status'].isin(['approved', 'denied'])) &
         (df['title_quality_score'] >= 1) &  # Lowered threshold to see more posts
-        (df['Card_Name'].isin(['Freedom Unlimited', 'Freedom Flex', 'Freedom (Generic)'])) &
-        (~df['Title'].str.contains('sapphire|preferred|reserve|csr|csp', case=False, na=False)) &
-        (~df['Body'].str.contains('sapphire|preferred|reserve|csr|csp', case=False, na=False)) &
-        # Exclude posts that are clearly about other cards
-        (~df['Title'].str.contains('capital one|savor|citi|custom cash|amex|bce|bce', case=False, na=False)) &
-        (~df['Body'].str.contains('capital one|savor|citi|custom cash|amex|bce|bce', case=False, na=False))
+        (df['Card_Name'].isin(TARGET_CARDS))
     ]
     
-    # Additional verification: ensure the specific card is actually mentioned
+    # Additional verification: ensure the specific card is actually mentioned and,
+    # when other cards are mentioned too, that the outcome sits next to this one
     verified_posts = []
     for idx, row in quality_df.iterrows():
-        if verify_freedom_card_mention(row['Title'], row['Body'], row['Card_Name']):
+        if is_card_outcome(row['Title'], row['Body'], row['Card_Name']):
             verified_posts.append(idx)
     
     quality_df = quality_df.loc[verified_posts]
     
+    # Collapse cross-posts and reposts so they aren't sent to the LLM or counted twice
+    before_dedupe = len(quality_df)
+    quality_df, _ = drop_near_duplicates(quality_df, group_column='Card_Name')
+    print(f"Removed {before_dedupe - len(quality_df)} near-duplicate posts")
+    
     print(f"Rule-based filtering found {len(quality_df)} high-quality posts")
+    metrics.observe('hybrid.filter_seconds', time.perf_counter() - stage_start)
+    metrics.incr('hybrid.rows_filtered', len(quality_df))
     
     # Step 3: LLM validation for all posts (optional)
+    checkpoint = None
     if use_llm:
         print("Step 3: LLM validation for all posts...")
+        stage_start = time.perf_counter()
+        checkpoint = Checkpoint(checkpoint_path('hybrid_llm', input_file), resume=resume)
         try:
             setup_ollama_client(model)
-            quality_df = validate_with_llm(quality_df, confidence_threshold, model)
+            quality_df = validate_with_llm(quality_df, confidence_threshold, model, checkpoint, provenance)
+        except RunInterrupted:
+            raise
         except Exception as e:
             print(f"LLM validation failed: {e}")
             print("Continuing with rule-based results only...")
+            # Keep the completed LLM rows for a --resume run
+            checkpoint = None
+        metrics.observe('hybrid.llm_stage_seconds', time.perf_counter() - stage_start)
     
     # Step 4: Final processing
     print("Step 4: Final processing...")
+    stage_start = time.perf_counter()
     
     # Remove posts that LLM marked as not about Freedom cards
     if use_llm and 'approval_status' in quality_df.columns:
@@ -286,14 +379,9 @@ def hybrid_extract_fields(input_file: str, output_file: str = None,
         print(f"Removed posts that LLM identified as not about Freedom cards")
     
     # Clean and validate extracted data
-    quality_df['income_clean'] = quality_df['Extracted Income'].apply(lambda x: 
-        int(x) if x and str(x).isdigit() and 10000 <= int(x) <= 500000 else None)
-    
-    quality_df['credit_score_clean'] = quality_df['Extracted Credit Score'].apply(lambda x: 
-        int(x) if x and str(x).isdigit() and 300 <= int(x) <= 850 else None)
-    
-    quality_df['approval_amount_clean'] = quality_df['Extracted Approval Amount'].apply(lambda x: 
-        int(x) if x and str(x).isdigit() and 500 <= int(x) <= 50000 else None)
+    quality_df['income_clean'] = clean_int_range(quality_df['Extracted Income'], 10000, 500000)
+    quality_df['credit_score_clean'] = clean_int_range(quality_df['Extracted Credit Score'], 300, 850)
+    quality_df['approval_amount_clean'] = clean_int_range(quality_df['Extracted Approval Amount'], 500, 50000)
     
     # Create target variable (1 for approved, 0 for denied)
     quality_df['target'] = quality_df['approval_status'].map({'approved': 1, 'denied': 0})
@@ -307,32 +395,14 @@ def hybrid_extract_fields(input_file: str, output_file: str = None,
             quality_df.at[idx, feature_name] = feature_value
     
     # Select comprehensive set of columns for output
-    comprehensive_columns = [
-        'Title', 'URL', 'Body', 'Source', 'Card_Name', 'Scraped_At',
-        'approval_status', 'title_quality_score',
-        'Extracted Income', 'Extracted Credit Score', 'Extracted Approval Amount',
-        'income_clean', 'credit_score_clean', 'approval_amount_clean',
-        'target', 'is_student', 'is_first_card', 'has_chase_account',
-        'mentions_income', 'mentions_credit_score', 'text_length'
-    ]
+    comprehensive_columns = list(COMPREHENSIVE_COLUMNS)
     
     # Add LLM columns if used
     if use_llm and 'llm_approval_status' in quality_df.columns:
-        comprehensive_columns.extend([
-            'llm_approval_status', 'llm_confidence', 'llm_income', 
-            'llm_credit_score', 'llm_approval_amount', 'llm_reasoning', 'used_llm'
-        ])
-    
-    # Fill missing values for display
-    quality_df['income_clean'] = quality_df['income_clean'].fillna('Not extracted')
-    quality_df['credit_score_clean'] = quality_df['credit_score_clean'].fillna('Not extracted')
-    quality_df['approval_amount_clean'] = quality_df['approval_amount_clean'].fillna('Not extracted')
-    
-    # Convert boolean columns to Yes/No for readability
-    boolean_columns = ['is_student', 'is_first_card', 'has_chase_account', 'mentions_income', 'mentions_credit_score']
-    for col in boolean_columns:
-        if col in quality_df.columns:
-            quality_df[col] = quality_df[col].map({True: 'Yes', False: 'No'})
+        comprehensive_columns.extend(LLM_COLUMNS)
+    
+    # Compact dtypes; display strings are only produced for display exports
+    quality_df = apply_schema(quality_df[comprehensive_columns])
     
     # Generate output filename if not provided
     if output_file is None:
@@ -343,11 +413,21 @@ def hybrid_extract_fields(input_file: str, output_file: str = None,
     os.makedirs('data/processed', exist_ok=True)
     
     # Save results
-    quality_df[comprehensive_columns].to_csv(output_file, index=False)
+    export_df = format_for_display(quality_df) if display else quality_df
+    export_df.to_csv(output_file, index=False)
+    provenance.save(provenance_path(output_file), keys=map(row_key, quality_df[['URL', 'Card_Name']].to_dict('records')))
+    metrics.observe('hybrid.features_seconds', time.perf_counter() - stage_start)
+    metrics.incr('hybrid.rows_out', len(quality_df))
+    
+    # Per-batch quality metrics feed the time-series store used by quality reports
+    record_quality_metrics(quality_df, os.path.basename(input_file))
+    if checkpoint is not None:
+        checkpoint.complete()
     
     print(f"Hybrid extraction completed:")
     print(f"- Total posts processed: {len(df)}")
     print(f"- High-quality posts found: {len(quality_df)}")
+    print(f"- Memory per row: {memory_per_row(quality_df):.0f} bytes")
     print(f"- Approval status breakdown:")
     print(quality_df['approval_status'].value_counts())
     if use_llm and 'used_llm' in quality_df.columns:
@@ -357,47 +437,294 @@ def hybrid_extract_fields(input_file: str, output_file: str = None,
     
     return output_file
 
-def main():
-    """Main function to run the hybrid extractor"""
-    import sys
+# Streaming pipeline: each post flows rules -> filter -> (LLM) -> features on its own,
+# so time-to-first-result and memory don't grow with the input size.
+
+def rule_extract_record(record: Dict[str, Any], provenance: Optional[ProvenanceLog] = None) -> Dict[str, Any]:
+    """Step 1 for a single post: approval status, title quality score and extracted fields"""
+    title = str(record.get('Title'))
+    body = str(record.get('Body'))
+    
+    # Use Decision column if available, otherwise classify from title
+    decision = str(record.get('Decision')).lower() if 'Decision' in record else ''
+    if decision in ['approved', 'pre-approved']:
+        approval_status = 'approved'
+    elif decision in ['denied', 'rejected']:
+        approval_status = 'denied'
+    else:
+        approval_status = classify_approval_status_from_title(title)
+    
+    record['approval_status'] = approval_status
+    record['title_quality_score'] = calculate_title_quality_score(title)
+    record['Extracted Income'] = extract_income_from_title_and_body(title, body) or None
+    record['Extracted Credit Score'] = extract_credit_score_from_title_and_body(title, body) or None
+    record['Extracted Approval Amount'] = extract_approval_amount_from_title_and_body(title, body) or None
+    if provenance is not None:
+        provenance.record_rules(record, decision_used=decision in ['approved', 'pre-approved', 'denied', 'rejected'])
+    return record
+
+def is_card_outcome(title, body, card_name) -> bool:
+    """The card is mentioned and the post's outcome is attributed to it (not to another card)"""
+    return (verify_freedom_card_mention(title, body, card_name) and
+            outcome_attributed_to_card(f"{title} {body}", card_name))
+
+def passes_quality_filter(record: Dict[str, Any]) -> bool:
+    """Step 2 for a single post; same criteria as the batch filter in hybrid_extract_fields"""
+    return (
+        record['approval_status'] in ['approved', 'denied'] and
+        record['title_quality_score'] >= 1 and
+        record.get('Card_Name') in TARGET_CARDS and
+        is_card_outcome(record.get('Title'), record.get('Body'), record['Card_Name'])
+    )
+
+def finalize_record(record: Dict[str, Any], columns) -> Dict[str, Any]:
+    """Step 4 for a single post: cleaned values, target and text features"""
+    record['income_clean'] = clean_int_value(record['Extracted Income'], 10000, 500000)
+    record['credit_score_clean'] = clean_int_value(record['Extracted Credit Score'], 300, 850)
+    record['approval_amount_clean'] = clean_int_value(record['Extracted Approval Amount'], 500, 50000)
+    record['target'] = {'approved': 1, 'denied': 0}.get(record['approval_status'])
+    record.update(extract_features_from_text(f"{record['Title']} {record['Body']}"))
+    return {column: record.get(column) for column in columns}
+
+def iter_records(input_file: str, chunksize: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Read a raw CSV lazily, one post dict at a time"""
+    for chunk in pd.read_csv(input_file, chunksize=chunksize):
+        for record in chunk.to_dict('records'):
+            yield record
+
+def stream_hybrid_extract(records: Iterable[Dict[str, Any]], use_llm: bool = True,
+                          confidence_threshold: int = 5, model: str = "mistral",
+                          max_pending: int = 32, llm_workers: int = MAX_CONCURRENCY,
+                          dedupe_index: Optional[NearDuplicateIndex] = None,
+                          provenance: Optional[ProvenanceLog] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming hybrid extraction: yields finished output rows as soon as they're ready.
+    
+    Rule results are speculative: posts whose title quality score reaches
+    `confidence_threshold` are emitted straight away, the rest wait on a
+    bounded LLM queue and are emitted (possibly out of input order) as their
+    classifications complete. When `max_pending` LLM calls are in flight the
+    generator stops reading input until one finishes.
+    
+    Args:
+        records (Iterable[dict]): Raw posts (Title, Body, Card_Name, ...)
+        use_llm (bool): Send uncertain posts to the LLM
+        confidence_threshold (int): Title quality score at which rules are trusted
+        model (str): Ollama model name
+        max_pending (int): Maximum LLM calls queued or in flight
+        llm_workers (int): Worker threads for LLM calls (the shared limiter caps how many run at once)
+        dedupe_index (NearDuplicateIndex): Index used to drop near-duplicate posts
+        provenance (ProvenanceLog): Records which extractor produced each field; a post's
+            records stay in it until the consumer pops them, and dropped posts are discarded
+    
+    Yields:
+        dict: One output row per accepted post
+    """
+    if use_llm:
+        try:
+            setup_ollama_client(model)
+        except Exception as e:
+            print(f"LLM validation unavailable: {e}")
+            print("Continuing with rule-based results only...")
+            use_llm = False
+    
+    columns = COMPREHENSIVE_COLUMNS + (LLM_COLUMNS if use_llm else [])
+    dedupe_index = dedupe_index if dedupe_index is not None else NearDuplicateIndex()
+    
+    def discard(record):
+        # Keep provenance memory bounded by the posts still in flight
+        if provenance is not None:
+            provenance.discard(row_key(record))
+    
+    def classify(record):
+        llm_result = llm_classify_post(record['Title'], record['Body'], record['Card_Name'], model,
+                                       rule_status=record['approval_status'])
+        updates = llm_result_updates(record['title_quality_score'], llm_result)
+        record.update(updates)
+        if provenance is not None:
+            provenance.record_llm(row_key(record), updates, model)
+        metrics.incr('hybrid.llm_rows')
+        return record
+    
+    def drain(pending, block):
+        done, _ = wait(pending, return_when=FIRST_COMPLETED) if block else (
+            [future for future in pending if future.done()], None)
+        for future in done:
+            pending.remove(future)
+            record = future.result()
+            # Remove posts that LLM marked as not about Freedom cards
+            if record['approval_status'] != 'exclude':
+                yield record
+            else:
+                discard(record)
+                metrics.incr('hybrid.llm_excluded')
     
-    # Parse command line arguments
-    use_llm = '--no-llm' not in sys.argv
-    confidence_threshold = 5  # Default threshold
-    model = "mistral"  # Default model
+    executor = ThreadPoolExecutor(max_workers=llm_workers) if use_llm else None
+    pending = set()
+    try:
+        for record in records:
+            metrics.incr('hybrid.rows_in')
+            record = rule_extract_record(record, provenance)
+            
+            if passes_quality_filter(record):
+                # Collapse cross-posts and reposts before they reach the LLM
+                if dedupe_index.add(record.get('URL'), post_text(record['Title'], record['Body'])) is not None:
+                    discard(record)
+                    metrics.incr('hybrid.near_duplicates')
+                else:
+                    metrics.incr('hybrid.rows_filtered')
+                    if use_llm:
+                        record.update({'llm_approval_status': '', 'llm_confidence': 0, 'llm_income': None,
+                                       'llm_credit_score': None, 'llm_approval_amount': None,
+                                       'llm_reasoning': '', 'used_llm': False})
+                    
+                    if not use_llm or record['title_quality_score'] >= confidence_threshold:
+                        metrics.incr('hybrid.rows_speculative')
+                        yield finalize_record(record, columns)
+                    else:
+                        # Backpressure: wait for a slot rather than queueing without bound
+                        while len(pending) >= max_pending:
+                            for done in drain(pending, block=True):
+                                yield finalize_record(done, columns)
+                        pending.add(executor.submit(classify, record))
+            else:
+                discard(record)
+            
+            for done in drain(pending, block=False):
+                yield finalize_record(done, columns)
+        
+        while pending:
+            for done in drain(pending, block=True):
+                yield finalize_record(done, columns)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def stream_hybrid_extract_to_file(input_file: str, output_file: str = None,
+                                  use_llm: bool = True, confidence_threshold: int = 5,
+                                  model: str = "mistral", chunksize: int = 1000,
+                                  max_pending: int = 32, llm_workers: int = MAX_CONCURRENCY) -> str:
+    """Run the streaming pipeline over a raw CSV, appending rows (and their provenance) as they finish"""
     
-    # Check for custom confidence threshold
-    for i, arg in enumerate(sys.argv):
-        if arg == '--confidence' and i + 1 < len(sys.argv):
-            try:
-                confidence_threshold = int(sys.argv[i + 1])
-            except ValueError:
-                print("Invalid confidence threshold. Using default (5)")
-        elif arg == '--model' and i + 1 < len(sys.argv):
-            model = sys.argv[i + 1]
-    
-    # Find the most recent raw data file
-    raw_files = [f for f in os.listdir('data/raw') if f.endswith('.csv')]
-    if not raw_files:
-        print("No raw data files found in data/raw/")
-        return
-    
-    # Use the most recent file
-    latest_file = sorted(raw_files)[-1]
-    input_file = f'data/raw/{latest_file}'
+    print("Starting streaming hybrid extraction...")
+    
+    if output_file is None:
+        method = 'hybrid_llm' if use_llm else 'hybrid_rules'
+        output_file = f'data/processed/{method}_dataset.csv'
+    os.makedirs('data/processed', exist_ok=True)
+    
+    start = time.perf_counter()
+    rows_out = 0
+    breakdown = {}
+    provenance = ProvenanceLog()
+    
+    with open(output_file, 'w', newline='', encoding='utf-8') as f, \
+            open(provenance_path(output_file), 'w', newline='', encoding='utf-8') as provenance_file:
+        writer = None
+        provenance_rows = provenance_writer(provenance_file)
+        for row in stream_hybrid_extract(iter_records(input_file, chunksize), use_llm,
+                                         confidence_threshold, model, max_pending, llm_workers,
+                                         provenance=provenance):
+            if writer is None:
+                metrics.set_gauge('hybrid.time_to_first_result_seconds', time.perf_counter() - start)
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            provenance_rows.writerows(provenance.pop(row_key(row)))
+            rows_out += 1
+            breakdown[row['approval_status']] = breakdown.get(row['approval_status'], 0) + 1
+        
+        if writer is None:
+            csv.writer(f).writerow(COMPREHENSIVE_COLUMNS)
+    
+    metrics.observe('hybrid.stream_seconds', time.perf_counter() - start)
+    metrics.incr('hybrid.rows_out', rows_out)
+    
+    print(f"Streaming hybrid extraction completed:")
+    print(f"- Total posts processed: {int(metrics.counters.get('hybrid.rows_in', 0))}")
+    print(f"- High-quality posts found: {rows_out}")
+    print(f"- Approval status breakdown: {breakdown}")
+    if use_llm:
+        print(f"- LLM validation used for {int(metrics.counters.get('hybrid.llm_rows', 0))} posts")
+        get_cascade(model).print_report()
+        print_token_savings()
+    print(f"- Saved to: {output_file}")
+    
+    return output_file
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Hybrid extraction: rules first, LLM validation for uncertain posts")
+    parser.add_argument('--input', default=None, help="Raw CSV to process (default: most recent file in data/raw/)")
+    parser.add_argument('--output', default=None, help="Output CSV (default: data/processed/hybrid_<method>_dataset.csv)")
+    parser.add_argument('--no-llm', dest='use_llm', action='store_false', help="Rule-based filtering only")
+    parser.add_argument('--confidence', type=int, default=5, help="Title quality score at which rule results are trusted")
+    # A comma-separated list runs as a small-to-large cascade
+    parser.add_argument('--model', default="mistral", help="Ollama model, or a cascade such as phi3:mini,mistral")
+    parser.add_argument('--cascade', dest='model', action='store_const', const=DEFAULT_CASCADE, help=f"Use the default cascade ({DEFAULT_CASCADE})")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream posts through the pipeline one at a time (no --resume or --display)")
+    parser.add_argument('--display', action='store_true', help="Export 'Not extracted' and Yes/No display values")
+    parser.add_argument('--resume', action='store_true', help="Skip posts an interrupted LLM pass already finished")
+    parser.add_argument('--log-level', default='INFO', help="Logging level")
+    parser.add_argument('--metrics-out', default=None, help="Path for the JSON run summary")
+    return parser
+
+def main(argv=None):
+    """Main function to run the hybrid extractor"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # The streaming writer has no checkpoint and always writes the typed schema
+    if args.stream and (args.resume or args.display):
+        parser.error("--stream can't be combined with --resume or --display")
+    use_llm = args.use_llm
+    confidence_threshold = args.confidence
+    model = args.model
+    metrics_out = args.metrics_out
+    
+    configure_logging(args.log_level)
+    
+    input_file = args.input
+    if input_file is None:
+        # Find the most recent raw data file
+        raw_files = [f for f in os.listdir('data/raw') if f.endswith('.csv')]
+        if not raw_files:
+            print("No raw data files found in data/raw/")
+            return
+        
+        # Use the most recent file
+        latest_file = sorted(raw_files)[-1]
+        input_file = f'data/raw/{latest_file}'
     
     if use_llm:
         print(f"Running hybrid extraction with Ollama LLM validation (model: {model}, confidence threshold: {confidence_threshold})...")
     else:
         print("Running hybrid extraction with rule-based filtering only...")
     
-    output_file = hybrid_extract_fields(
-        input_file, 
-        use_llm=use_llm, 
-        confidence_threshold=confidence_threshold,
-        model=model
-    )
+    if args.stream:
+        output_file = stream_hybrid_extract_to_file(
+            input_file,
+            output_file=args.output,
+            use_llm=use_llm,
+            confidence_threshold=confidence_threshold,
+            model=model
+        )
+    else:
+        try:
+            output_file = hybrid_extract_fields(
+                input_file, 
+                output_file=args.output,
+                use_llm=use_llm, 
+                confidence_threshold=confidence_threshold,
+                model=model,
+                display=args.display,
+                resume=args.resume
+            )
+        except RunInterrupted as e:
+            print(e)
+            metrics.write_summary('hybrid', metrics_out)
+            sys.exit(130)
     print(f"Hybrid extraction completed: {output_file}")
+    print(f"Run summary saved to: {metrics.write_summary('hybrid', metrics_out)}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
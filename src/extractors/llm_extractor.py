@@ -1,48 +1,68 @@
+import argparse
 import pandas as pd
-import requests
 import re
-import time
 import os
+import sys
+import logging
 from datetime import datetime
 
-def extract_with_llm(input_file, output_file=None):
-    """Extract structured data from Reddit posts using LLM"""
-    
-    df = pd.read_csv(input_file)
-
-    # Track how many were filled by LLM
-    llm_income_fills = 0
-    llm_score_fills = 0
-    llm_age_fills = 0
-    llm_history_fills = 0
-    llm_pulls_fills = 0
-
-    # Add new columns if missing
-    for col in ['Extracted Age', 'Extracted Credit History Length', 'Extracted Hard Pulls']:
-        if col not in df.columns:
-            df[col] = ''
-
-    for idx, row in df.iterrows():
-        missing_fields = []
-
-        if pd.isna(row['Extracted Income']):
-            missing_fields.append('income')
-        if pd.isna(row['Extracted Credit Score']):
-            missing_fields.append('credit score')
-        if pd.isna(row['Extracted Age']):
-            missing_fields.append('age')
-        if pd.isna(row['Extracted Credit History Length']):
-            missing_fields.append('credit history length')
-        if pd.isna(row['Extracted Hard Pulls']):
-            missing_fields.append('hard pulls count')
-
-        if not missing_fields:
-            continue  # Skip if nothing is missing
-
-        prompt = f"""You are extracting structured data from Reddit posts.
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics, configure_logging
+from utils.prompt_context import context_for_prompt, print_token_savings, EXTRACTION_BODY_BUDGET
+from utils.llm_client import OllamaClient, ModelCascade, parse_model_list, adaptive_map, DEFAULT_CASCADE
+from utils.checkpoint import Checkpoint, RunInterrupted, checkpoint_path, interruptible, row_key
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_FIELDS = {
+    'income': r'income:\s*(\d+)',
+    'credit_score': r'credit score:\s*(\d+)',
+    'age': r'age:\s*(\d+)',
+    'history': r'credit history length:\s*(\d+)',
+    'pulls': r'hard pulls count:\s*(\d+)'
+}
+
+def parse_extraction_response(output):
+    """Pull the numeric fields out of the model's 'Field: value' answer"""
+    output = output.strip().lower()
+    parsed = {'labels_found': sum(label in output for label in
+                                  ['income:', 'credit score:', 'age:', 'credit history length:', 'hard pulls count:'])}
+    for field, pattern in EXTRACTION_FIELDS.items():
+        match = re.search(pattern, output)
+        parsed[field] = match.group(1) if match else None
+    return parsed
+
+def is_plausible_extraction(parsed):
+    """Small-model answers are kept when well-formed and in range; otherwise escalate"""
+    if parsed['labels_found'] < len(EXTRACTION_FIELDS):
+        return False
+    if parsed['credit_score'] and not 300 <= int(parsed['credit_score']) <= 850:
+        return False
+    if parsed['age'] and not 16 <= int(parsed['age']) <= 100:
+        return False
+    return True
+
+# Parsed field -> (dataset column, fill counter name)
+FILL_COLUMNS = {
+    'income': ('Extracted Income', 'income'),
+    'credit_score': ('Extracted Credit Score', 'credit_score'),
+    'age': ('Extracted Age', 'age'),
+    'history': ('Extracted Credit History Length', 'credit_history'),
+    'pulls': ('Extracted Hard Pulls', 'hard_pulls')
+}
+
+def fill_missing_fields(df, idx, row, parsed, fills):
+    """Write LLM values into the row's empty columns, counting each fill"""
+    for field, (column, counter) in FILL_COLUMNS.items():
+        if parsed.get(field) and pd.isna(row[column]):
+            df.at[idx, column] = parsed[field]
+            fills[counter] += 1
+
+def build_extraction_prompt(row):
+    return f"""You are extracting structured data from Reddit posts.
 
 Post Title: "{row['Title']}"
-Post Body: "{row['Body']}"
+Post Body: "{context_for_prompt(row['Body'], EXTRACTION_BODY_BUDGET)}"
 
 Extract the following fields if present:
 - Income (numeric, no symbols)
@@ -61,38 +81,71 @@ Credit History Length: [length or blank]
 Hard Pulls Count: [count or blank]
 """
 
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "mistral", "prompt": prompt}
-        )
-
-        output = response.text.strip().lower()
-        print(f"[{idx + 1}/{len(df)}] Model output:\n{output}\n")
-
-        # Extract numbers using regex from LLM output
-        income_match = re.search(r'income:\s*(\d+)', output)
-        score_match = re.search(r'credit score:\s*(\d+)', output)
-        age_match = re.search(r'age:\s*(\d+)', output)
-        history_match = re.search(r'credit history length:\s*(\d+)', output)
-        pulls_match = re.search(r'hard pulls count:\s*(\d+)', output)
-
-        if income_match and pd.isna(row['Extracted Income']):
-            df.at[idx, 'Extracted Income'] = income_match.group(1)
-            llm_income_fills += 1
-        if score_match and pd.isna(row['Extracted Credit Score']):
-            df.at[idx, 'Extracted Credit Score'] = score_match.group(1)
-            llm_score_fills += 1
-        if age_match and pd.isna(row['Extracted Age']):
-            df.at[idx, 'Extracted Age'] = age_match.group(1)
-            llm_age_fills += 1
-        if history_match and pd.isna(row['Extracted Credit History Length']):
-            df.at[idx, 'Extracted Credit History Length'] = history_match.group(1)
-            llm_history_fills += 1
-        if pulls_match and pd.isna(row['Extracted Hard Pulls']):
-            df.at[idx, 'Extracted Hard Pulls'] = pulls_match.group(1)
-            llm_pulls_fills += 1
-
-        time.sleep(0.2)  # Avoid hammering Ollama
+def extract_with_llm(input_file, output_file=None, models="mistral", resume=False):
+    """Extract structured data from Reddit posts using LLM
+    
+    `models` may be a comma-separated cascade (smallest first), e.g. 'phi3:mini,mistral'.
+    Parsed answers are checkpointed per post; resume=True restores the posts an
+    interrupted run already finished instead of asking the LLM again.
+    """
+    
+    cascade = ModelCascade(parse_model_list(models), OllamaClient())
+    checkpoint = Checkpoint(checkpoint_path('llm_extract', input_file), resume=resume)
+    df = pd.read_csv(input_file)
+    metrics.incr('llm_extract.rows_in', len(df))
+
+    # Track how many were filled by LLM
+    fills = {counter: 0 for _, counter in FILL_COLUMNS.values()}
+
+    # Add new columns if missing
+    for col in ['Extracted Age', 'Extracted Credit History Length', 'Extracted Hard Pulls']:
+        if col not in df.columns:
+            df[col] = ''
+
+    def rows_to_extract():
+        for idx, row in df.iterrows():
+            missing_fields = []
+
+            if pd.isna(row['Extracted Income']):
+                missing_fields.append('income')
+            if pd.isna(row['Extracted Credit Score']):
+                missing_fields.append('credit score')
+            if pd.isna(row['Extracted Age']):
+                missing_fields.append('age')
+            if pd.isna(row['Extracted Credit History Length']):
+                missing_fields.append('credit history length')
+            if pd.isna(row['Extracted Hard Pulls']):
+                missing_fields.append('hard pulls count')
+
+            if not missing_fields:
+                metrics.incr('llm_extract.rows_complete')
+                continue  # Skip if nothing is missing
+
+            key = row_key(row)
+            if key in checkpoint:
+                fill_missing_fields(df, idx, row, checkpoint.get(key), fills)
+                metrics.incr('llm_extract.rows_resumed')
+                continue
+            yield idx, row, key
+
+    def extract(item):
+        idx, row, _ = item
+        with metrics.timer('llm.latency'):
+            try:
+                return cascade.run(build_extraction_prompt(row), parse=parse_extraction_response,
+                                   accept=is_plausible_extraction)
+            except Exception as e:
+                logger.warning(f"[{idx + 1}/{len(df)}] LLM extraction failed: {e}")
+                return None, None
+
+    # Calls overlap as far as the shared concurrency limiter allows; results arrive in row order
+    with interruptible(checkpoint) as stop:
+        for (idx, row, key), (parsed, used_model) in adaptive_map(extract, rows_to_extract(), should_stop=lambda: stop.requested):
+            if parsed is not None:
+                logger.debug(f"[{idx + 1}/{len(df)}] {used_model} output: {parsed}")
+                checkpoint.record(key, {field: parsed[field] for field in FILL_COLUMNS})
+                fill_missing_fields(df, idx, row, parsed, fills)
+        stop.check()
 
     # Generate output filename if not provided
     if output_file is None:
@@ -104,13 +157,25 @@ Hard Pulls Count: [count or blank]
     
     # Save updated dataset
     df.to_csv(output_file, index=False)
+    checkpoint.complete()
 
-    print(f"LLM filled: {llm_income_fills} income, {llm_score_fills} scores, {llm_age_fills} ages, {llm_history_fills} histories, {llm_pulls_fills} hard pulls")
+    for counter, count in fills.items():
+        metrics.incr(f'llm_extract.fills.{counter}', count)
+
+    cascade.print_report()
+    print_token_savings()
+    print(f"LLM filled: {fills['income']} income, {fills['credit_score']} scores, {fills['age']} ages, {fills['credit_history']} histories, {fills['hard_pulls']} hard pulls")
     print(f"Updated dataset saved to {output_file}")
     return output_file
 
-def main():
+def main(argv=None):
     """Main function to run the LLM extractor"""
+    parser = argparse.ArgumentParser(description="Fill fields the rule extractor missed using the LLM")
+    # Easy extractions go to a small model first with --cascade
+    parser.add_argument('--cascade', action='store_true', help="Small model first, escalating uncertain posts")
+    parser.add_argument('--resume', action='store_true', help="Skip posts an interrupted run already finished")
+    args = parser.parse_args(argv)
+
     # Find the most recent processed data file
     processed_files = [f for f in os.listdir('data/processed') if f.endswith('.csv')]
     if not processed_files:
@@ -122,9 +187,19 @@ def main():
     latest_file = sorted(processed_files)[-1]
     input_file = f'data/processed/{latest_file}'
     
-    print(f"Processing {input_file} with LLM...")
-    output_file = extract_with_llm(input_file)
+    models = DEFAULT_CASCADE if args.cascade else "mistral"
+    
+    configure_logging()
+    print(f"Processing {input_file} with LLM ({models})...")
+    with metrics.timer('llm_extract.total'):
+        try:
+            output_file = extract_with_llm(input_file, models=models, resume=args.resume)
+        except RunInterrupted as e:
+            print(e)
+            metrics.write_summary('llm_extract')
+            sys.exit(130)
     print(f"LLM extraction completed: {output_file}")
+    print(f"Run summary saved to: {metrics.write_summary('llm_extract')}")
 
 if __name__ == "__main__":
     main()
@@ -1,35 +1,130 @@
-import requests
+import argparse
 import pandas as pd
-import time
+import math
+import re
+import os
+import sys
 
-df = pd.read_csv('freedom_unlimited_approval_data.csv')
-filtered_rows = []
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics
+from utils.prompt_context import context_for_prompt, print_token_savings, CLASSIFICATION_BODY_BUDGET
+from utils.llm_client import OllamaClient, ModelCascade, parse_model_list, adaptive_map, DEFAULT_CASCADE
+from extractors.embedding_prefilter import (
+    prefilter_posts, get_embedder, EmbeddingCache, EMBEDDING_CACHE_FILE,
+    calibrate_margins, save_calibration, load_calibration, CALIBRATION_FILE
+)
 
-for idx, row in df.iterrows():
-    title = row['Title']
-    body = row['Body']
+def parse_relevance_answer(output):
+    """'yes' / 'no' from the model's answer, None when it didn't commit to either"""
+    answers = set(re.findall(r'\b(yes|no)\b', output.lower()))
+    return answers.pop() if len(answers) == 1 else None
+
+def is_relevant(title, body, cascade):
+    """Ask the cascade whether a post describes a CFU approval or denial"""
     prompt = f"""You are classifying Reddit posts.
 
 Post Title: "{title}"
-Post Body: "{body}"
+Post Body: "{context_for_prompt(body, CLASSIFICATION_BODY_BUDGET)}"
 
 Does this post clearly describe a Chase Freedom Unlimited (CFU) approval or denial experience? Answer only YES or NO."""
 
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={"model": "mistral", "prompt": prompt}
-    )
+    # Ambiguous answers from the small model escalate to the larger one
+    answer, model = cascade.run(prompt, parse=parse_relevance_answer,
+                                accept=lambda answer: answer is not None)
+    return answer == 'yes', model
+
+def print_calibration(calibration):
+    for band, label in (('accept', 'accepted'), ('reject', 'rejected')):
+        if calibration[f'{band}_margin'] is None:
+            print(f"- No {band} band reaches {calibration['target_precision']:.0%} agreement with the LLM")
+        else:
+            print(f"- {band.capitalize()} at margin {calibration[f'{band}_margin']:+.3f}: "
+                  f"{calibration[label]} of {calibration['posts']} calibration posts, "
+                  f"{calibration[f'{band}_precision']:.1%} agree with the LLM")
+
+def filter_relevant_posts(input_file='freedom_unlimited_approval_data.csv',
+                          output_file='filtered_data.csv', models="mistral",
+                          prefilter=False, embedder_kind='auto', calibrate=False):
+    """Keep only posts the LLM judges to be CFU approval/denial experiences
+    
+    With `prefilter`, an embedding pre-filter accepts or rejects the cases it
+    is confident about and only the ambiguous ones are sent to the LLM. Its
+    margins come from a `calibrate` run, which sends every post to the LLM
+    and fits the margins to its answers; uncalibrated, nothing is skipped.
+    """
+    cascade = ModelCascade(parse_model_list(models), OllamaClient())
+    df = pd.read_csv(input_file)
+    filtered_rows = []
+
+    if prefilter or calibrate:
+        embedder = get_embedder(embedder_kind)
+        calibration = None if calibrate else load_calibration(embedder.name)
+        if calibration is None and not calibrate:
+            print(f"Pre-filter has no calibration for {embedder.name}; run with --calibrate-prefilter first. "
+                  f"Sending every post to the LLM.")
+        else:
+            cache = EmbeddingCache(EMBEDDING_CACHE_FILE, embedder.name)
+            # Calibration runs only score posts; every post still goes to the LLM
+            calibration_margins = calibration or {}
+            accept_margin = calibration_margins.get('accept_margin')
+            reject_margin = calibration_margins.get('reject_margin')
+            accept_margin = math.inf if accept_margin is None else accept_margin
+            reject_margin = -math.inf if reject_margin is None else reject_margin
+            df = prefilter_posts(df, embedder, cache, accept_margin=accept_margin, reject_margin=reject_margin)
+            cache.save()
+            if calibration is not None:
+                decisions = df['prefilter_decision'].value_counts()
+                print(f"Pre-filter: {decisions.get('accept', 0)} accepted, {decisions.get('reject', 0)} rejected, "
+                      f"{decisions.get('llm', 0)} sent to the LLM")
+                print_calibration(calibration)
+                filtered_rows.extend(row for _, row in df[df['prefilter_decision'] == 'accept'].iterrows())
+                df = df[df['prefilter_decision'] == 'llm']
+
+    def classify(item):
+        _, row = item
+        return is_relevant(row['Title'], row['Body'], cascade)
+
+    answers = []
+    # Questions overlap as far as the shared concurrency limiter allows
+    for position, ((idx, row), (relevant, model)) in enumerate(adaptive_map(classify, df.iterrows())):
+        print(f"[{position + 1}/{len(df)}] {model}: {'YES' if relevant else 'NO'}")
+        answers.append(relevant)
+
+        if relevant:
+            filtered_rows.append(row)
 
-    output = response.text.strip().lower()
+    if calibrate:
+        calibration = calibrate_margins(df['prefilter_margin'].to_numpy(), answers, embedder.name)
+        save_calibration(calibration)
+        print(f"Pre-filter calibration saved to {CALIBRATION_FILE}:")
+        print_calibration(calibration)
 
-    print(f"[{idx + 1}/{len(df)}] Model output: {output}")
+    filtered_df = pd.DataFrame(filtered_rows)
+    filtered_df.to_csv(output_file, index=False)
 
-    if "yes" in output:
-        filtered_rows.append(row)
+    print(f"Saved {len(filtered_rows)} relevant posts to {output_file}")
+    cascade.print_report()
+    print_token_savings()
+    return output_file
 
-    time.sleep(0.2)  # Optional: avoid hammering the API
+def main(argv=None):
+    """Main function to run the LLM relevance filter"""
+    parser = argparse.ArgumentParser(description="Keep only posts the LLM judges to be CFU approval/denial reports")
+    parser.add_argument('--input', default='freedom_unlimited_approval_data.csv', help="CSV of scraped posts")
+    parser.add_argument('--output', default='filtered_data.csv', help="Where to write the relevant posts")
+    # The yes/no question is easy; --cascade lets a small model answer it first
+    parser.add_argument('--cascade', action='store_true', help="Small model first, escalating ambiguous answers")
+    # The embedding pre-filter is opt-in and needs a --calibrate-prefilter run first
+    parser.add_argument('--prefilter', action='store_true',
+                        help="Settle clear-cut posts by embedding similarity before asking the LLM")
+    parser.add_argument('--calibrate-prefilter', action='store_true',
+                        help="Fit the pre-filter margins against LLM labels for this input")
+    args = parser.parse_args(argv)
 
-filtered_df = pd.DataFrame(filtered_rows)
-filtered_df.to_csv('filtered_data.csv', index=False)
+    models = DEFAULT_CASCADE if args.cascade else "mistral"
+    filter_relevant_posts(args.input, args.output, models=models, prefilter=args.prefilter,
+                          calibrate=args.calibrate_prefilter)
+    print(f"Run summary saved to: {metrics.write_summary('llm_filter')}")
 
-print(f"Saved {len(filtered_rows)} relevant posts to filtered_data.csv")
+if __name__ == "__main__":
+    main()
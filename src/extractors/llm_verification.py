@@ -1,185 +1,355 @@
 """
 LLM-Powered Data Verification & Quality Control
 
-This module contains future functionality for using LLMs to verify and improve
-extracted data quality. This is currently a placeholder for future implementation.
-
-In a production environment, this would include:
-- LLM client integration (Ollama, OpenAI, etc.)
-- Proper error handling and logging
-- Configuration management
-- Unit tests
-- Monitoring and alerting
-
-TODO: Implement when LLM infrastructure is production-ready
-TODO: Add unit tests for verification functions
-TODO: Create configuration file for verification parameters
-TODO: Add monitoring and alerting for verification failures
+Uses the local LLM to review extracted fields for the rows we are least sure
+about and attach per-field confidence scores, corrections and missing-data
+suggestions.
+
+Rows are ranked by their existing confidence (title quality score, LLM
+confidence and out-of-range extractions); only those below
+VERIFICATION_CONFIG['confidence_threshold'] are sent, packed
+VERIFICATION_CONFIG['batch_size'] rows per prompt and verified concurrently.
+Results are joined back on the DataFrame index. Failures are counted as
+verification.parse_failures and verification.failed_batches in the run summary.
 """
 
+import os
+import sys
+import json
+import re
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import logging
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from extractors.schema import parse_int_column
+from extractors.quality_metrics import (
+    compute_batch_metrics, summarize_metrics, confidence_distribution, recommendations,
+    QualityMetricsStore, QUALITY_STORE_FILE, EXTRACTED_FIELDS, CONFIDENCE_COLUMNS
+)
+from utils.llm_client import OllamaClient, OLLAMA_URL
+from utils.metrics import metrics
+from utils.prompt_context import context_for_prompt, token_savings, VERIFICATION_BODY_BUDGET
+
 # Configure logging for production use
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Verification parameters
+VERIFICATION_CONFIG = {
+    'model': 'mistral',
+    'base_url': OLLAMA_URL,
+    # Transport retries, done by the client
+    'max_retries': 3,
+    # Extra calls for a response that isn't the expected JSON
+    'parse_retries': 1,
+    'timeout_seconds': 30,
+    'batch_size': 10,
+    'max_concurrent_batches': 4,
+    'confidence_threshold': 70,
+    'enable_logging': True
+}
+
+VERIFICATION_COLUMNS = [
+    'income_confidence', 'credit_score_confidence', 'approval_amount_confidence',
+    'suggested_corrections', 'missing_data_suggestions', 'overall_quality_score',
+    'verification_timestamp'
+]
+
+# Valid ranges used to flag suspicious raw extractions
+FIELD_RANGES = {
+    'Extracted Income': (10000, 500000),
+    'Extracted Credit Score': (300, 850),
+    'Extracted Approval Amount': (500, 50000)
+}
+
+
 class LLMVerificationError(Exception):
     """Custom exception for LLM verification failures"""
     pass
 
 
-def verify_extractions_with_llm(df: pd.DataFrame, llm_client=None) -> pd.DataFrame:
+def _resolve_config(config: Optional[Dict] = None) -> Dict:
+    return {**VERIFICATION_CONFIG, **(config or {})}
+
+
+def estimate_row_confidence(df: pd.DataFrame) -> pd.Series:
+    """
+    Estimate a 0-100 confidence for each row's extractions before verification.
+    
+    Uses the best of the rule title quality score (0-11) and any LLM
+    confidence (0-10), and drops to 0 when a raw extraction is present but
+    outside its valid range.
+    
+    Args:
+        df (pd.DataFrame): Dataset with extracted fields
+    
+    Returns:
+        pd.Series: Confidence per row, aligned to df.index
+    """
+    confidence = pd.Series(0.0, index=df.index)
+    if 'title_quality_score' in df.columns:
+        confidence = confidence.combine(pd.to_numeric(df['title_quality_score'], errors='coerce').fillna(0) / 11 * 100, max)
+    if 'llm_confidence' in df.columns:
+        confidence = confidence.combine(pd.to_numeric(df['llm_confidence'], errors='coerce').fillna(0) * 10, max)
+    
+    for col, (low, high) in FIELD_RANGES.items():
+        if col in df.columns:
+            values = parse_int_column(df[col])
+            suspicious = (values.notna() & ~values.between(low, high)).fillna(False).astype(bool)
+            confidence = confidence.mask(suspicious, 0)
+    
+    return confidence.clip(0, 100)
+
+
+def select_rows_for_verification(df: pd.DataFrame, confidence_threshold: float) -> pd.Index:
+    """Index of rows below the confidence threshold, least confident first"""
+    confidence = estimate_row_confidence(df)
+    return confidence[confidence < confidence_threshold].sort_values(kind='stable').index
+
+
+def verify_extractions_with_llm(df: pd.DataFrame, llm_client=None, config: Optional[Dict] = None) -> pd.DataFrame:
     """
     Use LLM to verify and improve extracted data quality.
     
-    This function would:
-    1. Review each row's extracted fields for accuracy
-    2. Suggest missing data points that could be extracted
-    3. Provide confidence scores for each extraction
-    4. Flag potential errors or inconsistencies
-    5. Generate quality metrics for the dataset
+    This function:
+    1. Selects the rows whose extractions have the lowest confidence
+    2. Sends them to the LLM in batches, several batches concurrently
+    3. Collects confidence scores for each extracted field
+    4. Collects suggested corrections and missing data points
+    5. Joins the results back onto the original rows by index
     
     Args:
         df (pd.DataFrame): Comprehensive dataset with extracted fields
-        llm_client: LLM client (Ollama, OpenAI, etc.)
+        llm_client: LLM client with a generate(prompt) method (see initialize_llm_client)
+        config (Optional[Dict]): Overrides for VERIFICATION_CONFIG
     
     Returns:
-        pd.DataFrame: Enhanced dataset with verification results
+        pd.DataFrame: Same rows as df, with verification columns added
+            (empty for rows that weren't verified)
     
     Raises:
-        LLMVerificationError: If verification fails for critical reasons
+        LLMVerificationError: If every batch fails
     """
     
     if llm_client is None:
         logger.warning("No LLM client provided. Skipping verification.")
         return df
     
+    config = _resolve_config(config)
+    row_ids = list(select_rows_for_verification(df, config['confidence_threshold']))
+    batch_size = max(1, int(config['batch_size']))
+    batches = [row_ids[i:i + batch_size] for i in range(0, len(row_ids), batch_size)]
+    
+    if config['enable_logging']:
+        logger.info(f"Verifying {len(row_ids)} of {len(df)} rows in {len(batches)} batches")
+    
     verification_results = []
+    failed_batches = 0
+    max_concurrent = max(1, int(config['max_concurrent_batches']))
+    
+    # The shared limiter would otherwise hold the batches to one call in flight at first
+    limiter = getattr(llm_client, 'limiter', None)
+    if limiter is not None:
+        limiter.reset(initial=max_concurrent)
+    
+    with ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+        futures = {executor.submit(_verify_batch, df.loc[batch], llm_client, config): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                verification_results.extend(future.result())
+            except Exception as e:
+                failed_batches += 1
+                metrics.incr('verification.failed_batches')
+                logger.error(f"Verification failed for rows {futures[future][:3]}...: {str(e)}")
+    
+    if batches and failed_batches == len(batches):
+        raise LLMVerificationError(f"All {failed_batches} verification batches failed")
+    
+    metrics.incr('verification.rows_verified', len(verification_results))
+    if config['enable_logging']:
+        logger.info(f"Prompt body tokens: {token_savings()}")
+    
+    # Join on the index so every original row appears exactly once
+    verification_df = pd.DataFrame(verification_results, columns=['row_id'] + VERIFICATION_COLUMNS)
+    verification_df = verification_df.drop_duplicates('row_id').set_index('row_id')
+    return df.join(verification_df, how='left')
+
+
+def _verify_batch(batch_df: pd.DataFrame, llm_client, config: Dict) -> List[Dict[str, Any]]:
+    """
+    Verify one batch of rows with a single LLM call, retrying unparseable responses.
     
-    for idx, row in df.iterrows():
-        try:
-            # Create verification prompt
-            prompt = _create_verification_prompt(row)
-            
-            # Get LLM response (placeholder)
-            # response = llm_client.generate(prompt)
-            
-            # Parse verification results (placeholder)
-            verification_result = _parse_verification_response(idx, row, response=None)
-            verification_results.append(verification_result)
-            
-        except Exception as e:
-            logger.error(f"Verification failed for row {idx}: {str(e)}")
-            continue
+    Transport failures were already retried by the client and propagate as
+    they are; only a response that can't be parsed is asked for again.
+    """
+    prompt = _create_verification_prompt(batch_df)
+    row_ids = list(batch_df.index)
     
-    # Add verification results to dataframe
-    verification_df = pd.DataFrame(verification_results)
-    df_with_verification = df.merge(verification_df, left_index=True, right_on='row_id', how='left')
+    last_error = None
+    for _ in range(1 + max(0, int(config['parse_retries']))):
+        with metrics.timer('verification.batch'):
+            response = llm_client.generate(prompt)
+        try:
+            return _parse_verification_response(row_ids, response)
+        except ValueError as e:
+            last_error = e
+            metrics.incr('verification.parse_failures')
     
-    return df_with_verification
+    raise LLMVerificationError(f"Could not parse verification response: {last_error}")
 
 
-def _create_verification_prompt(row: pd.Series) -> str:
+def _create_verification_prompt(batch_df: pd.DataFrame) -> str:
     """
-    Create a verification prompt for the LLM.
+    Create a verification prompt for a batch of rows.
     
     Args:
-        row (pd.Series): DataFrame row with post data
+        batch_df (pd.DataFrame): Rows to verify, keyed by their index
     
     Returns:
         str: Formatted prompt for LLM verification
     """
+    posts = []
+    for row_id, row in batch_df.iterrows():
+        posts.append(f"""
+POST {row_id}
+TITLE: {row['Title']}
+BODY: {context_for_prompt(row['Body'], VERIFICATION_BODY_BUDGET)}
+EXTRACTED DATA:
+- Income: {row.get('Extracted Income')}
+- Credit Score: {row.get('Extracted Credit Score')}
+- Approval Amount: {row.get('Extracted Approval Amount')}
+- Approval Status: {row.get('approval_status')}""")
+    
     return f"""
-    Review this credit card application post and verify the extracted data:
-    
-    TITLE: {row['Title']}
-    BODY: {row['Body'][:500]}...
-    
-    EXTRACTED DATA:
-    - Income: {row['Extracted Income']}
-    - Credit Score: {row['Extracted Credit Score']}
-    - Approval Amount: {row['Extracted Approval Amount']}
-    - Approval Status: {row['approval_status']}
-    
-    Please provide:
-    1. Confidence score (0-100) for each extraction
-    2. Any missing data that could be extracted
-    3. Potential errors or corrections
-    4. Overall data quality assessment
-    """
+Review these credit card application posts and verify the extracted data for each one.
+{''.join(posts)}
 
+For every POST, provide:
+1. Confidence score (0-100) for each extraction
+2. Any missing data that could be extracted
+3. Potential errors or corrections
+4. Overall data quality assessment (0-100)
 
-def _parse_verification_response(row_id: int, row: pd.Series, response: Optional[str] = None) -> Dict[str, Any]:
+Respond only with a JSON array containing one object per post:
+[
+    {{
+        "row_id": <POST number>,
+        "income_confidence": 0-100,
+        "credit_score_confidence": 0-100,
+        "approval_amount_confidence": 0-100,
+        "suggested_corrections": ["..."],
+        "missing_data_suggestions": ["..."],
+        "overall_quality_score": 0-100
+    }}
+]
+"""
+
+
+def _parse_verification_response(row_ids: List[Any], response: str) -> List[Dict[str, Any]]:
     """
     Parse LLM verification response into structured data.
     
     Args:
-        row_id (int): Index of the row being verified
-        row (pd.Series): Original row data
-        response (Optional[str]): LLM response (None for placeholder)
+        row_ids (List[Any]): Index labels of the rows in the batch
+        response (str): Raw LLM response text
     
     Returns:
-        Dict[str, Any]: Structured verification results
+        List[Dict[str, Any]]: One verification result per row found in the response
+    
+    Raises:
+        ValueError: If no JSON array can be recovered from the response
     """
-    # Placeholder implementation - would parse actual LLM response
-    return {
-        'row_id': row_id,
-        'income_confidence': 85,  # Placeholder
-        'credit_score_confidence': 90,  # Placeholder
-        'approval_amount_confidence': 75,  # Placeholder
-        'suggested_corrections': [],  # Placeholder
-        'missing_data_suggestions': [],  # Placeholder
-        'overall_quality_score': 83,  # Placeholder
-        'verification_timestamp': datetime.now().isoformat()
-    }
+    text = response.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError:
+        match = re.search(r'\[.*\]', text, re.DOTALL)
+        if not match:
+            raise ValueError(f"No JSON array in response: {text[:100]}")
+        items = json.loads(match.group())
+    
+    if isinstance(items, dict):
+        items = [items]
+    
+    # Row ids come back as JSON numbers or strings; map them onto the real index labels
+    labels = {str(row_id): row_id for row_id in row_ids}
+    timestamp = datetime.now().isoformat()
+    results = []
+    for item in items:
+        key = str(item.get('row_id'))
+        if key not in labels:
+            continue
+        results.append({
+            'row_id': labels[key],
+            'income_confidence': _as_score(item.get('income_confidence')),
+            'credit_score_confidence': _as_score(item.get('credit_score_confidence')),
+            'approval_amount_confidence': _as_score(item.get('approval_amount_confidence')),
+            'suggested_corrections': item.get('suggested_corrections') or [],
+            'missing_data_suggestions': item.get('missing_data_suggestions') or [],
+            'overall_quality_score': _as_score(item.get('overall_quality_score')),
+            'verification_timestamp': timestamp
+        })
+    return results
+
 
+def _as_score(value) -> Optional[float]:
+    try:
+        return max(0.0, min(100.0, float(value)))
+    except (TypeError, ValueError):
+        return None
 
-def generate_quality_report(df: pd.DataFrame) -> Dict[str, Any]:
+
+def generate_quality_report(df: pd.DataFrame, source: Optional[str] = None,
+                            store_file: Optional[str] = QUALITY_STORE_FILE) -> Dict[str, Any]:
     """
     Generate comprehensive quality report for the dataset.
     
-    This would include:
+    Metrics are computed per scrape batch (Scraped_At day) in one grouped
+    pass and, when a source name is given, appended to the quality metrics
+    store. The report includes:
     - Extraction success rates
     - Confidence score distributions
     - Data completeness metrics
-    - Quality trends over time
-    - Recommendations for improvement
+    - Quality trends over time (per batch)
+    - Recommendations for improvement based on those metrics
     
     Args:
         df (pd.DataFrame): Dataset with verification results
+        source (Optional[str]): Input batch (raw file name) to record this dataset under in the store
+        store_file (Optional[str]): Quality metrics store path
     
     Returns:
         dict: Quality metrics and recommendations
     """
+    batch_metrics = compute_batch_metrics(df)
+    if source and store_file:
+        QualityMetricsStore(store_file).append(batch_metrics, source)
+    
+    totals = batch_metrics.sum().to_frame().T
+    overall = summarize_metrics(totals).iloc[0]
+    trends = summarize_metrics(batch_metrics).reset_index()
     
     quality_metrics = {
         'total_rows': len(df),
-        'extraction_success_rate': {
-            'income': len(df[df['income_clean'] != 'Not extracted']) / len(df),
-            'credit_score': len(df[df['credit_score_clean'] != 'Not extracted']) / len(df),
-            'approval_amount': len(df[df['approval_amount_clean'] != 'Not extracted']) / len(df)
-        },
-        'average_confidence_scores': {
-            'income': df.get('income_confidence', pd.Series([0])).mean(),
-            'credit_score': df.get('credit_score_confidence', pd.Series([0])).mean(),
-            'approval_amount': df.get('approval_amount_confidence', pd.Series([0])).mean()
-        },
-        'data_quality_recommendations': [
-            "Consider expanding regex patterns for better income extraction",
-            "Add more denial keywords to improve approval status classification",
-            "Implement source-specific extraction rules"
-        ]
+        'extraction_success_rate': {field: overall[f'{field}_completeness'] for field in EXTRACTED_FIELDS},
+        'approval_share': overall['approval_share'],
+        'average_confidence_scores': {column: overall[f'{column}_mean'] for column in CONFIDENCE_COLUMNS},
+        'confidence_distributions': {column: confidence_distribution(totals, column) for column in CONFIDENCE_COLUMNS
+                                     if f'{column}_count' in totals.columns},
+        'quality_trends': trends.to_dict('records'),
+        'data_quality_recommendations': recommendations(overall)
     }
     
     return quality_metrics
 
 
 def create_verified_dataset(input_file: str, output_file: Optional[str] = None, 
-                          enable_llm_verification: bool = False) -> pd.DataFrame:
+                          enable_llm_verification: bool = False,
+                          config: Optional[Dict] = None) -> pd.DataFrame:
     """
     Create dataset with optional LLM verification.
     
@@ -190,6 +360,7 @@ def create_verified_dataset(input_file: str, output_file: Optional[str] = None,
         input_file (str): Path to input CSV file
         output_file (Optional[str]): Path to output CSV file
         enable_llm_verification (bool): Whether to run LLM verification
+        config (Optional[Dict]): Overrides for VERIFICATION_CONFIG
     
     Returns:
         pd.DataFrame: Processed dataset with optional verification results
@@ -207,11 +378,11 @@ def create_verified_dataset(input_file: str, output_file: Optional[str] = None,
     if enable_llm_verification:
         logger.info("Running LLM verification...")
         try:
-            # llm_client = initialize_llm_client()  # Would be implemented
-            df = verify_extractions_with_llm(df, llm_client=None)
+            llm_client = initialize_llm_client(config)
+            df = verify_extractions_with_llm(df, llm_client=llm_client, config=config)
             
-            # Step 3: Generate quality report
-            quality_report = generate_quality_report(df)
+            # Step 3: Generate quality report and record it in the metrics store
+            quality_report = generate_quality_report(df, source=os.path.basename(input_file))
             logger.info(f"Quality Report: {quality_report}")
             
         except Exception as e:
@@ -226,41 +397,40 @@ def create_verified_dataset(input_file: str, output_file: Optional[str] = None,
     return df
 
 
-# Configuration for future implementation
-VERIFICATION_CONFIG = {
-    'max_retries': 3,
-    'timeout_seconds': 30,
-    'batch_size': 10,
-    'confidence_threshold': 70,
-    'enable_logging': True
-}
-
-
-def initialize_llm_client(config: Optional[Dict] = None) -> Any:
+def initialize_llm_client(config: Optional[Dict] = None) -> OllamaClient:
     """
     Initialize LLM client with configuration.
     
     Args:
-        config (Optional[Dict]): Configuration dictionary
+        config (Optional[Dict]): Overrides for VERIFICATION_CONFIG
     
     Returns:
-        Any: Initialized LLM client
+        OllamaClient: Client for the configured model and server
     
     Raises:
-        NotImplementedError: Currently not implemented
+        LLMVerificationError: If the LLM server is not reachable
     """
-    raise NotImplementedError("LLM client initialization not yet implemented")
+    config = _resolve_config(config)
+    client = OllamaClient(
+        model=config['model'],
+        base_url=config['base_url'],
+        timeout_seconds=config['timeout_seconds'],
+        max_retries=config['max_retries']
+    )
+    if not client.is_available():
+        raise LLMVerificationError(f"LLM server not reachable at {config['base_url']}")
+    return client
 
 
-# Example usage (commented out for future reference)
+# Example usage
 """
 # Example 1: Basic verification
 df = create_verified_dataset('input.csv', enable_llm_verification=True)
 
 # Example 2: With custom configuration
-config = {'max_retries': 5, 'timeout_seconds': 60}
+config = {'max_retries': 5, 'timeout_seconds': 60, 'batch_size': 20}
 llm_client = initialize_llm_client(config)
-df = verify_extractions_with_llm(df, llm_client)
+df = verify_extractions_with_llm(df, llm_client, config)
 
 # Example 3: Quality report only
 quality_report = generate_quality_report(df)
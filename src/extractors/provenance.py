@@ -0,0 +1,389 @@
+"""
+Field-level provenance for extracted values, and a recompute planner.
+
+Every extracted field of every output post (`approval_status`,
+`Extracted Income`, `Extracted Credit Score`, `Extracted Approval Amount`)
+gets a record saying which extractor produced it:
+
+- source: `rules`, `decision` (the scraper's Decision label) or `llm`
+- extractor: name and version, e.g. `extract_income_from_title_and_body@3f9c01ab`
+- confidence and a timestamp
+
+Rule versions are hashes of the extractor function's source (plus the
+helpers and constants it uses), so tweaking a regex changes the version of
+that one field. Decision labels carry the master dataset's rule version, and
+LLM values the model and a hash of the prompt. The hybrid extractor writes
+the records to `<output>.provenance.csv` next to its dataset; the planner
+compares them with the current versions and re-runs only the rule fields
+whose extractor changed, instead of the whole rules + LLM pipeline. Posts a
+recomputed status no longer qualifies for (e.g. now a question) are dropped,
+as the hybrid quality filter would have.
+
+Decision labels from master rows written before rule versioning are
+reported separately and only re-derived with `--relabel-unversioned`:
+
+    python src/extractors/provenance.py data/processed/hybrid_llm_dataset.csv --plan-only
+    python src/extractors/provenance.py data/processed/hybrid_llm_dataset.csv
+"""
+
+import argparse
+import csv
+import hashlib
+import inspect
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics
+from utils.checkpoint import row_key
+from utils.proximity_index import attribute_decisions, rule_version
+from extractors.schema import read_processed, clean_int_range, parse_int_column
+from extractors.title_focused_extractor import (
+    classify_approval_status_from_title,
+    extract_income_from_title_and_body,
+    extract_credit_score_from_title_and_body,
+    extract_approval_amount_from_title_and_body
+)
+
+PROVENANCE_COLUMNS = ['key', 'field', 'source', 'extractor', 'confidence', 'recorded_at']
+
+# Field -> rule extractor (approval status is classified from the title alone)
+RULE_EXTRACTORS: Dict[str, Callable] = {
+    'approval_status': classify_approval_status_from_title,
+    'Extracted Income': extract_income_from_title_and_body,
+    'Extracted Credit Score': extract_credit_score_from_title_and_body,
+    'Extracted Approval Amount': extract_approval_amount_from_title_and_body
+}
+PROVENANCE_FIELDS = list(RULE_EXTRACTORS)
+
+# Derived columns refreshed when their field is recomputed: column -> (field, low, high)
+CLEAN_COLUMNS = {
+    'income_clean': ('Extracted Income', 10000, 500000),
+    'credit_score_clean': ('Extracted Credit Score', 300, 850),
+    'approval_amount_clean': ('Extracted Approval Amount', 500, 50000)
+}
+
+# Rule_Version of master rows written before versioning
+UNVERSIONED = 'unversioned'
+
+DECISION_STATUS = {'approved': 'approved', 'pre-approved': 'approved', 'denied': 'denied', 'rejected': 'denied'}
+
+
+@lru_cache(maxsize=None)
+def code_version(func: Callable) -> str:
+    """Hash of a function's source plus the same-module helpers and constants it refers to"""
+    digest = hashlib.sha1()
+    seen = set()
+
+    def add(function):
+        if function in seen:
+            return
+        seen.add(function)
+        digest.update(inspect.getsource(function).encode('utf-8'))
+        for name in sorted(function.__code__.co_names):
+            value = function.__globals__.get(name)
+            if inspect.isfunction(value) and value.__module__ == function.__module__:
+                add(value)
+            elif isinstance(value, re.Pattern):
+                digest.update(f"{name}={value.pattern!r}".encode('utf-8'))
+            elif isinstance(value, (str, int, float, tuple, list, dict, frozenset)) and name.isupper():
+                digest.update(f"{name}={value!r}".encode('utf-8'))
+
+    add(func)
+    return digest.hexdigest()[:8]
+
+
+def rule_extractor_id(field: str) -> str:
+    function = RULE_EXTRACTORS[field]
+    return f"{function.__name__}@{code_version(function)}"
+
+
+def decision_extractor_id(version: Optional[str] = None) -> str:
+    return f"Decision@{version or rule_version()}"
+
+
+def record_rule_version(record: Dict[str, Any]) -> str:
+    """Rule_Version a raw row was labeled under; rows from before versioning never match the current one"""
+    version = record.get('Rule_Version')
+    return str(version) if version is not None and version == version and str(version) else UNVERSIONED
+
+
+def llm_extractor_id(model: str) -> str:
+    # The prompt lives in llm_classify_post, so its hash versions the prompt
+    from extractors.hybrid_extractor import llm_classify_post
+    return f"{model}@{code_version(llm_classify_post)}"
+
+
+def split_extractor(extractor: str):
+    name, _, version = str(extractor).rpartition('@')
+    return name, version
+
+
+def decision_status(decision) -> Optional[str]:
+    """approval_status for a scraper Decision label, or None when it doesn't settle one"""
+    return DECISION_STATUS.get(str(decision).lower())
+
+
+class ProvenanceLog:
+    """Provenance records of one extraction run, keyed by post (URL|card) and field"""
+
+    def __init__(self, records: Optional[Dict[tuple, Dict[str, Any]]] = None):
+        self.records: Dict[tuple, Dict[str, Any]] = records or {}
+        self.recorded_at = datetime.now().isoformat()
+        self._lock = Lock()
+
+    def record(self, key: str, field: str, source: str, extractor: str, confidence=None):
+        with self._lock:
+            self.records[(key, field)] = {'source': source, 'extractor': extractor,
+                                          'confidence': confidence, 'recorded_at': self.recorded_at}
+
+    def record_rules(self, record: Dict[str, Any], decision_used: bool = False):
+        """Rule results for one post (every field, found or not, so later rule changes can fill gaps)"""
+        key = row_key(record)
+        confidence = record.get('title_quality_score')
+        for field in PROVENANCE_FIELDS:
+            if field == 'approval_status' and decision_used:
+                self.record(key, field, 'decision', decision_extractor_id(record_rule_version(record)))
+            else:
+                self.record(key, field, 'rules', rule_extractor_id(field), confidence)
+
+    def record_llm(self, key: str, updates: Dict[str, Any], model: str):
+        """Fields an LLM classification overwrote"""
+        extractor = llm_extractor_id(model)
+        for field in PROVENANCE_FIELDS:
+            if field in updates:
+                self.record(key, field, 'llm', extractor, updates.get('llm_confidence'))
+
+    def pop(self, key: str) -> List[Dict[str, Any]]:
+        """Records of one post as rows, removed from the log (for writing them out as the post is)"""
+        with self._lock:
+            found = [(field, self.records.pop((key, field), None)) for field in PROVENANCE_FIELDS]
+        return [{'key': key, 'field': field, **values} for field, values in found if values is not None]
+
+    def discard(self, key: str):
+        """Forget a post that won't be in the output"""
+        self.pop(key)
+
+    def to_frame(self, keys=None) -> pd.DataFrame:
+        keys = set(keys) if keys is not None else None
+        rows = [{'key': key, 'field': field, **values} for (key, field), values in self.records.items()
+                if keys is None or key in keys]
+        return pd.DataFrame(rows, columns=PROVENANCE_COLUMNS)
+
+    def save(self, path: str, keys=None) -> str:
+        self.to_frame(keys).to_csv(path, index=False)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'ProvenanceLog':
+        df = pd.read_csv(path, dtype={'key': str, 'field': str, 'source': str, 'extractor': str})
+        records = {(row['key'], row['field']): {column: row[column] for column in PROVENANCE_COLUMNS[2:]}
+                   for row in df.to_dict('records')}
+        return cls(records)
+
+
+def provenance_path(output_file: str) -> str:
+    return f"{os.path.splitext(output_file)[0]}.provenance.csv"
+
+
+def provenance_writer(f) -> csv.DictWriter:
+    """CSV writer for provenance rows, header written"""
+    writer = csv.DictWriter(f, fieldnames=PROVENANCE_COLUMNS)
+    writer.writeheader()
+    return writer
+
+
+def plan_recompute(provenance: pd.DataFrame) -> pd.DataFrame:
+    """
+    Provenance records whose producing extractor has changed since they were written.
+
+    Adds `current` (the extractor that would produce the field now) and
+    `action`: 'rules' for fields the planner can recompute locally,
+    'unversioned' for Decision labels older than rule versioning (recomputed
+    only on request), and 'llm' for LLM values whose prompt changed (those
+    need a hybrid run with the LLM).
+    """
+    if provenance.empty:
+        return provenance.assign(current=[], action=[])
+
+    current_rules = {field: rule_extractor_id(field) for field in PROVENANCE_FIELDS}
+    current_decision = decision_extractor_id()
+    llm_prompt = split_extractor(llm_extractor_id('model'))[1]
+
+    def current(row):
+        if row['source'] == 'rules':
+            return current_rules[row['field']]
+        if row['source'] == 'decision':
+            return current_decision
+        name, _ = split_extractor(row['extractor'])
+        return f"{name}@{llm_prompt}"
+
+    def action(row):
+        if row['source'] == 'llm':
+            return 'llm'
+        if row['source'] == 'decision' and row['extractor'] == decision_extractor_id(UNVERSIONED):
+            return 'unversioned'
+        return 'rules'
+
+    plan = provenance.assign(current=provenance.apply(current, axis=1))
+    plan = plan[plan['current'] != plan['extractor']]
+    if plan.empty:
+        return plan.assign(action=[])
+    return plan.assign(action=plan.apply(action, axis=1))
+
+
+def summarize_plan(plan: pd.DataFrame) -> pd.DataFrame:
+    if plan.empty:
+        return pd.DataFrame(columns=['field', 'source', 'extractor', 'current', 'action', 'posts'])
+    return (plan.groupby(['field', 'source', 'extractor', 'current', 'action']).size()
+            .rename('posts').reset_index().sort_values('posts', ascending=False))
+
+
+def recompute_value(field: str, source: str, title: str, body: str, card_name: str):
+    """
+    A field's value under the current rules.
+
+    Returns:
+        tuple: (value, source, extractor) of the recomputed field
+    """
+    if source == 'decision':
+        # Re-derive the card's decision the way the scraper labels posts now
+        status = decision_status(dict(attribute_decisions(f"{title} {body}".lower())).get(card_name))
+        if status:
+            return status, 'decision', decision_extractor_id()
+        return classify_approval_status_from_title(title), 'rules', rule_extractor_id(field)
+    if field == 'approval_status':
+        return classify_approval_status_from_title(title), 'rules', rule_extractor_id(field)
+    return RULE_EXTRACTORS[field](title, body) or None, 'rules', rule_extractor_id(field)
+
+
+def recompute_stale_fields(dataset_file: str, provenance_file: Optional[str] = None,
+                           output_file: Optional[str] = None, relabel_unversioned: bool = False) -> Dict[str, Any]:
+    """
+    Re-run only the rule extractors whose version changed, for the posts they produced.
+
+    Updates the field, its cleaned column and `target`, and the provenance
+    records of recomputed fields. Posts that no longer pass the hybrid
+    quality filter are dropped. LLM-produced fields, and unless
+    `relabel_unversioned` Decision labels older than rule versioning, are
+    only reported.
+
+    Returns:
+        dict: Per-field counts of recomputed and changed values, posts dropped, and fields left stale
+    """
+    from extractors.hybrid_extractor import passes_quality_filter
+
+    start = time.perf_counter()
+    provenance_file = provenance_file or provenance_path(dataset_file)
+    log = ProvenanceLog.load(provenance_file)
+    plan = plan_recompute(log.to_frame())
+    actions = ['rules', 'unversioned'] if relabel_unversioned else ['rules']
+    rule_plan = plan[plan['action'].isin(actions)]
+
+    df = read_processed(dataset_file)
+    positions = {row_key(row): position for position, row in enumerate(df[['URL', 'Card_Name']].to_dict('records'))}
+
+    report = {'fields': {}, 'llm_stale': int((plan['action'] == 'llm').sum()),
+              'unversioned': 0 if relabel_unversioned else int((plan['action'] == 'unversioned').sum()),
+              'missing_posts': 0, 'dropped': 0}
+    updates: Dict[str, Dict[int, Any]] = {}
+    for item in rule_plan.itertuples(index=False):
+        position = positions.get(item.key)
+        if position is None:
+            report['missing_posts'] += 1
+            continue
+        row = df.iloc[position]
+        value, source, extractor = recompute_value(item.field, item.source, str(row['Title']), str(row['Body']),
+                                                   row['Card_Name'])
+        updates.setdefault(item.field, {})[position] = value
+
+        counts = report['fields'].setdefault(item.field, {'recomputed': 0, 'changed': 0})
+        counts['recomputed'] += 1
+        old = row[item.field]
+        if not (pd.isna(old) and value is None) and str(old) != str(value):
+            counts['changed'] += 1
+        log.record(item.key, item.field, source, extractor,
+                   row.get('title_quality_score') if source == 'rules' else None)
+
+    for field, values in updates.items():
+        index = df.index[list(values)]
+        if field == 'approval_status':
+            df['approval_status'] = df['approval_status'].astype(object)
+            df.loc[index, field] = list(values.values())
+            df['target'] = df['approval_status'].map({'approved': 1, 'denied': 0}).astype('Int32')
+            df['approval_status'] = df['approval_status'].astype('category')
+        else:
+            df.loc[index, field] = parse_int_column(pd.Series(list(values.values()), index=index, dtype=object))
+    for column, (field, low, high) in CLEAN_COLUMNS.items():
+        if field in updates and column in df.columns:
+            df[column] = clean_int_range(df[field], low, high)
+
+    # The hybrid quality filter only let through posts it could label; re-apply it to changed posts
+    touched = sorted({position for values in updates.values() for position in values})
+    failing = [position for position in touched if not passes_quality_filter(df.iloc[position].to_dict())]
+    if failing:
+        df = df.drop(df.index[failing])
+        report['dropped'] = len(failing)
+        metrics.incr('provenance.posts_dropped', len(failing))
+
+    output_file = output_file or dataset_file
+    if updates:
+        df.to_csv(output_file, index=False)
+        log.save(provenance_path(output_file), keys=map(row_key, df[['URL', 'Card_Name']].to_dict('records')))
+
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    for field, counts in report['fields'].items():
+        metrics.incr(f'provenance.recomputed.{field}', counts['recomputed'])
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute only the extracted fields whose extractor changed")
+    parser.add_argument('dataset', help="Processed dataset written by hybrid_extractor")
+    parser.add_argument('--provenance', default=None, help="Provenance sidecar (default: <dataset>.provenance.csv)")
+    parser.add_argument('--output', default=None, help="Write the updated dataset here instead of in place")
+    parser.add_argument('--plan-only', action='store_true', help="Show what would be recomputed and stop")
+    parser.add_argument('--relabel-unversioned', action='store_true',
+                        help="Also re-derive Decision labels from master rows written before rule versioning")
+    args = parser.parse_args(argv)
+
+    provenance_file = args.provenance or provenance_path(args.dataset)
+    if not os.path.exists(provenance_file):
+        parser.error(f"No provenance sidecar at {provenance_file}; rerun hybrid_extractor to create one")
+
+    plan = plan_recompute(ProvenanceLog.load(provenance_file).to_frame())
+    unversioned = int((plan['action'] == 'unversioned').sum())
+    if not args.relabel_unversioned:
+        plan = plan[plan['action'] != 'unversioned']
+        if unversioned:
+            print(f"{unversioned} approval statuses come from Decision labels that predate rule versioning; "
+                  f"--relabel-unversioned re-derives them")
+    summary = summarize_plan(plan)
+    if summary.empty:
+        print("Every versioned field is up to date with the current extractors.")
+        return
+    print("Stale fields:")
+    print(summary.to_string(index=False))
+    if args.plan_only:
+        return
+
+    report = recompute_stale_fields(args.dataset, provenance_file, args.output, args.relabel_unversioned)
+    for field, counts in report['fields'].items():
+        print(f"- {field}: {counts['recomputed']} recomputed, {counts['changed']} changed")
+    if report['dropped']:
+        print(f"- {report['dropped']} posts no longer pass the quality filter and were dropped")
+    if report['llm_stale']:
+        print(f"- {report['llm_stale']} LLM-produced fields use an older prompt; rerun hybrid_extractor with the LLM to refresh them")
+    print(f"Updated {args.output or args.dataset} in {report['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Incremental extraction-quality metrics per scrape batch.
+
+Each processed dataset is reduced, in one grouped pass over its rows, to
+additive counts and sums per scrape day (`Scraped_At` date): extraction
+completeness, approval/denial balance and confidence distributions. Those
+are appended to a small long-format time-series store, so reports over
+months of data read the store instead of rescanning every dataset.
+
+Metrics are keyed by input batch (the raw file the rows came from), so
+extracting the same batch again, or to another output, replaces its
+earlier metrics instead of counting it twice.
+"""
+
+import os
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from extractors.schema import parse_int_column
+
+QUALITY_STORE_FILE = 'data/processed/quality_metrics.csv'
+
+STORE_COLUMNS = ['batch_date', 'source', 'metric', 'value', 'recorded_at']
+
+# Extracted field -> candidate columns, cleaned values preferred
+EXTRACTED_FIELDS = {
+    'income': ['income_clean', 'Extracted Income'],
+    'credit_score': ['credit_score_clean', 'Extracted Credit Score'],
+    'approval_amount': ['approval_amount_clean', 'Extracted Approval Amount']
+}
+
+# Confidence column -> multiplier onto a 0-100 scale
+CONFIDENCE_COLUMNS = {
+    'income_confidence': 1,
+    'credit_score_confidence': 1,
+    'approval_amount_confidence': 1,
+    'overall_quality_score': 1,
+    'llm_confidence': 10
+}
+
+CONFIDENCE_BINS = 10
+
+
+def _batch_dates(df: pd.DataFrame) -> pd.Series:
+    if 'Scraped_At' not in df.columns:
+        return pd.Series('unknown', index=df.index)
+    dates = pd.to_datetime(df['Scraped_At'], errors='coerce', format='ISO8601')
+    return dates.dt.strftime('%Y-%m-%d').fillna('unknown')
+
+
+def compute_batch_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Additive quality metrics per scrape day, computed in a single groupby.
+
+    Args:
+        df (pd.DataFrame): Processed dataset
+
+    Returns:
+        pd.DataFrame: One row per batch_date, one column per metric
+    """
+    parts = {'rows': pd.Series(1, index=df.index)}
+
+    for field, candidates in EXTRACTED_FIELDS.items():
+        column = next((c for c in candidates if c in df.columns), None)
+        if column is not None:
+            parts[f'{field}_extracted'] = parse_int_column(df[column]).notna()
+
+    if 'approval_status' in df.columns:
+        status = df['approval_status'].astype(str).str.lower()
+        parts['approved'] = status == 'approved'
+        parts['denied'] = status == 'denied'
+
+    for column, scale in CONFIDENCE_COLUMNS.items():
+        if column not in df.columns:
+            continue
+        values = (pd.to_numeric(df[column], errors='coerce') * scale).clip(0, 100)
+        parts[f'{column}_sum'] = values.fillna(0)
+        parts[f'{column}_count'] = values.notna()
+        bins = (values // (100 / CONFIDENCE_BINS)).clip(0, CONFIDENCE_BINS - 1)
+        for b in range(CONFIDENCE_BINS):
+            parts[f'{column}_bin_{b}'] = bins == b
+
+    frame = pd.DataFrame(parts).astype(float)
+    return frame.groupby(_batch_dates(df)).sum().rename_axis('batch_date')
+
+
+class QualityMetricsStore:
+    """
+    Append-only long-format CSV store of per-batch metrics (batch_date, source, metric, value).
+
+    `source` is the input batch. Re-recording a batch appends a newer
+    version of its rows; reads keep only the latest recording of each batch,
+    so days that dropped out of a re-run batch no longer count.
+    """
+
+    def __init__(self, path: str = QUALITY_STORE_FILE):
+        self.path = path
+
+    def load(self) -> pd.DataFrame:
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        data = pd.read_csv(self.path, dtype={'batch_date': str, 'source': str, 'recorded_at': str})
+        latest = data.groupby('source')['recorded_at'].transform('max')
+        return data[data['recorded_at'] == latest].reset_index(drop=True)
+
+    def append(self, batch_metrics: pd.DataFrame, source: str) -> int:
+        """
+        Record metrics for one input batch; re-recording the same batch supersedes all its rows.
+
+        Returns:
+            int: Number of metric rows written for this batch
+        """
+        new_rows = batch_metrics.stack().rename('value').reset_index()
+        new_rows.columns = ['batch_date', 'metric', 'value']
+        new_rows['source'] = source
+        new_rows['recorded_at'] = datetime.now().isoformat()
+        new_rows = new_rows[STORE_COLUMNS]
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        new_rows.to_csv(self.path, mode='a', header=not os.path.exists(self.path), index=False)
+        return len(new_rows)
+
+    def totals(self, start: Optional[str] = None, end: Optional[str] = None, by_day: bool = False) -> pd.DataFrame:
+        """Summed metrics over a date range, overall or per day"""
+        data = self.load()
+        if start:
+            data = data[data['batch_date'] >= start]
+        if end:
+            data = data[data['batch_date'] <= end]
+        keys = ['batch_date', 'metric'] if by_day else ['metric']
+        summed = data.groupby(keys)['value'].sum()
+        return summed.unstack('metric').fillna(0) if by_day else summed.to_frame().T.reset_index(drop=True)
+
+
+def summarize_metrics(totals: pd.DataFrame) -> pd.DataFrame:
+    """Turn summed counts into rates, averages and balance (one row per input row)"""
+    def col(name):
+        return totals[name] if name in totals.columns else pd.Series(0.0, index=totals.index)
+
+    rows = col('rows').replace(0, float('nan'))
+    summary = pd.DataFrame(index=totals.index)
+    summary['rows'] = col('rows')
+    for field in EXTRACTED_FIELDS:
+        summary[f'{field}_completeness'] = col(f'{field}_extracted') / rows
+    decided = (col('approved') + col('denied')).replace(0, float('nan'))
+    summary['approval_share'] = col('approved') / decided
+    for column in CONFIDENCE_COLUMNS:
+        summary[f'{column}_mean'] = col(f'{column}_sum') / col(f'{column}_count').replace(0, float('nan'))
+    return summary
+
+
+def confidence_distribution(totals: pd.DataFrame, column: str) -> Dict[str, float]:
+    """Histogram of a confidence column from summed bin counts (first row of totals)"""
+    width = 100 // CONFIDENCE_BINS
+    return {
+        f'{b * width}-{(b + 1) * width}': float(totals[f'{column}_bin_{b}'].iloc[0])
+        for b in range(CONFIDENCE_BINS) if f'{column}_bin_{b}' in totals.columns
+    }
+
+
+def recommendations(summary: pd.Series) -> List[str]:
+    """Recommendations driven by the measured metrics"""
+    tips = []
+    if summary.get('income_completeness', 1) < 0.3:
+        tips.append("Income extracted for under 30% of posts - consider expanding income regex patterns")
+    if summary.get('credit_score_completeness', 1) < 0.3:
+        tips.append("Credit score extracted for under 30% of posts - consider more score/FICO patterns")
+    if summary.get('approval_amount_completeness', 1) < 0.2:
+        tips.append("Approval amount rarely extracted - consider patterns like '5k SL' or 'starting limit'")
+    share = summary.get('approval_share')
+    if pd.notna(share) and (share > 0.85 or share < 0.15):
+        tips.append(f"Approval/denial balance is skewed ({share:.0%} approved) - review decision keywords")
+    for column in ['income_confidence', 'credit_score_confidence', 'approval_amount_confidence']:
+        mean = summary.get(f'{column}_mean')
+        if pd.notna(mean) and mean < 60:
+            tips.append(f"Average {column.replace('_', ' ')} is {mean:.0f} - review that extractor")
+    return tips
+
+
+def record_quality_metrics(df: pd.DataFrame, source: str, store_file: str = QUALITY_STORE_FILE) -> pd.DataFrame:
+    """Compute per-batch metrics for a processed dataset and add them to the store under its input batch"""
+    batch_metrics = compute_batch_metrics(df)
+    QualityMetricsStore(store_file).append(batch_metrics, source)
+    return batch_metrics
+
+
+def quality_report_from_store(start: Optional[str] = None, end: Optional[str] = None,
+                              store_file: str = QUALITY_STORE_FILE) -> Dict[str, Any]:
+    """
+    Quality report over a date range, built from the store without rescanning datasets.
+
+    Args:
+        start (Optional[str]): First batch date (YYYY-MM-DD), inclusive
+        end (Optional[str]): Last batch date (YYYY-MM-DD), inclusive
+        store_file (str): Path to the metrics store
+
+    Returns:
+        dict: Totals, per-day trends, confidence distributions and recommendations
+    """
+    store = QualityMetricsStore(store_file)
+    totals = store.totals(start, end)
+    if totals.empty:
+        return {'total_rows': 0, 'quality_trends': [], 'data_quality_recommendations': []}
+
+    overall = summarize_metrics(totals).iloc[0]
+    trends = summarize_metrics(store.totals(start, end, by_day=True)).reset_index()
+
+    return {
+        'total_rows': int(overall['rows']),
+        'extraction_success_rate': {field: overall[f'{field}_completeness'] for field in EXTRACTED_FIELDS},
+        'approval_share': overall['approval_share'],
+        'average_confidence_scores': {column: overall[f'{column}_mean'] for column in CONFIDENCE_COLUMNS},
+        'confidence_distributions': {column: confidence_distribution(totals, column) for column in CONFIDENCE_COLUMNS
+                                     if f'{column}_count' in totals.columns},
+        'quality_trends': trends.to_dict('records'),
+        'data_quality_recommendations': recommendations(overall)
+    }
@@ -0,0 +1,124 @@
+"""
+Typed schema for processed datasets.
+
+Processed frames used to carry numbers as strings ('' and 'Not extracted'
+sentinels) and booleans as 'Yes'/'No', which forces object dtype and makes
+every consumer re-parse. Extractors now keep typed columns (nullable Int32,
+category, bool) and only turn them into display strings at the
+presentation/export layer via `format_for_display`.
+"""
+
+import pandas as pd
+
+MISSING_DISPLAY = 'Not extracted'
+
+INT_COLUMNS = [
+    'Extracted Income', 'Extracted Credit Score', 'Extracted Approval Amount',
+    'Extracted Age', 'Extracted Credit History Length', 'Extracted Hard Pulls',
+    'income_clean', 'credit_score_clean', 'approval_amount_clean',
+    'title_quality_score', 'text_length', 'target',
+    'llm_confidence', 'llm_income', 'llm_credit_score', 'llm_approval_amount'
+]
+
+CATEGORY_COLUMNS = ['Source', 'Card_Name', 'Decision', 'approval_status', 'llm_approval_status']
+
+BOOL_COLUMNS = [
+    'is_student', 'is_first_card', 'has_chase_account',
+    'mentions_income', 'mentions_credit_score', 'used_llm'
+]
+
+# Values outside Int32 are nulled rather than wrapped (an LLM can answer with anything)
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+
+# Columns rendered with the 'Not extracted' sentinel in display exports
+DISPLAY_MISSING_COLUMNS = ['income_clean', 'credit_score_clean', 'approval_amount_clean']
+
+_BOOL_VALUES = {
+    True: True, False: False, 'True': True, 'False': False,
+    'Yes': True, 'No': False, 'true': True, 'false': False, '1': True, '0': False, 1: True, 0: False
+}
+
+
+def parse_int_column(series: pd.Series) -> pd.Series:
+    """Parse a column of numbers, '$'/',' formatted strings or sentinels into nullable Int32"""
+    if not pd.api.types.is_numeric_dtype(series):
+        series = series.astype('string').str.replace(r'[$,]', '', regex=True)
+    numeric = pd.to_numeric(series, errors='coerce')
+    # Values like 720.0 round-trip through CSV as floats; fractional values aren't valid here
+    numeric = numeric.where(numeric.isna() | (numeric == numeric.round()))
+    numeric = numeric.where(numeric.between(INT32_MIN, INT32_MAX))
+    return numeric.astype('Int32')
+
+
+def parse_int_value(value):
+    """Scalar counterpart of `parse_int_column` for row-at-a-time pipelines"""
+    if value is None or value is pd.NA:
+        return None
+    if isinstance(value, str):
+        value = value.replace('$', '').replace(',', '')
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number or number != round(number) or not INT32_MIN <= number <= INT32_MAX:
+        return None
+    return int(number)
+
+
+def clean_int_value(value, low: int, high: int):
+    """Scalar counterpart of `clean_int_range`"""
+    number = parse_int_value(value)
+    return number if number is not None and low <= number <= high else None
+
+
+def clean_int_range(series: pd.Series, low: int, high: int) -> pd.Series:
+    """Parse to Int32 and null out values outside [low, high]"""
+    values = parse_int_column(series)
+    return values.where(values.between(low, high))
+
+
+def parse_bool_column(series: pd.Series) -> pd.Series:
+    """Map True/False, 'Yes'/'No' and 0/1 style values to bool (missing -> False)"""
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype(bool)
+    return series.map(_BOOL_VALUES).fillna(False).astype(bool)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast known columns to their compact dtypes; unknown columns are left alone"""
+    df = df.copy()
+    for col in INT_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_int_column(df[col])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in BOOL_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_bool_column(df[col])
+    return df
+
+
+def format_for_display(df: pd.DataFrame) -> pd.DataFrame:
+    """Render typed columns for humans: 'Not extracted' for missing values, Yes/No flags"""
+    df = df.copy()
+    for col in DISPLAY_MISSING_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(object).where(df[col].notna(), MISSING_DISPLAY)
+    for col in BOOL_COLUMNS:
+        if col in df.columns and pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].map({True: 'Yes', False: 'No'})
+    return df
+
+
+def read_processed(path: str, **kwargs) -> pd.DataFrame:
+    """Read a processed CSV (typed or legacy display format) back into the typed schema"""
+    return apply_schema(pd.read_csv(path, **kwargs))
+
+
+def memory_per_row(df: pd.DataFrame) -> float:
+    """Deep memory usage in bytes per row"""
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(deep=True).sum() / len(df)
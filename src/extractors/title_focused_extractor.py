@@ -1,8 +1,14 @@
 import pandas as pd
 import re
 import os
+import sys
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from extractors.schema import apply_schema, format_for_display, clean_int_range
+from utils.card_registry import get_registry
+from utils.proximity_index import outcome_attributed_to_card
+
 def classify_approval_status_from_title(title):
     """Classify approval status primarily from title"""
     title_lower = title.lower()
@@ -190,25 +196,14 @@ def calculate_title_quality_score(title):
 
 def verify_freedom_card_mention(title, body, card_name):
     """Verify that the specific Freedom card is mentioned in the content"""
-    combined_text = f"{title} {body}".lower()
+    registry = get_registry()
+    card = registry.cards.get(card_name)
     
-    if card_name == 'Freedom Unlimited':
-        # Check for Freedom Unlimited specific mentions
-        unlimited_indicators = [
-            'freedom unlimited', 'cfu', 'chase freedom unlimited',
-            'freedom unlimited card', 'cfu card', 'chase cfu'
-        ]
-        return any(indicator in combined_text for indicator in unlimited_indicators)
+    # Generic entries can't be verified against a specific card
+    if card is None or card.generic:
+        return False
     
-    elif card_name == 'Freedom Flex':
-        # Check for Freedom Flex specific mentions
-        flex_indicators = [
-            'freedom flex', 'cff', 'chase freedom flex',
-            'freedom flex card', 'cff card', 'chase cff'
-        ]
-        return any(indicator in combined_text for indicator in flex_indicators)
-    
-    return False
+    return registry.mentions_card(f"{title} {body}", card_name)
 
 def extract_features_from_text(text):
     """Extract binary features from text"""
@@ -225,8 +220,12 @@ def extract_features_from_text(text):
     
     return features
 
-def extract_fields_title_focused(input_file, output_file=None, comprehensive=False):
-    """Extract structured fields using title-focused approach"""
+def extract_fields_title_focused(input_file, output_file=None, comprehensive=False, display=False):
+    """Extract structured fields using title-focused approach
+    
+    Numeric and flag columns are written typed; display=True exports the
+    'Not extracted' and Yes/No rendering for comprehensive output instead.
+    """
     
     # Load dataset
     df = pd.read_csv(input_file)
@@ -234,9 +233,9 @@ def extract_fields_title_focused(input_file, output_file=None, comprehensive=Fal
     # Initialize new columns
     df['approval_status'] = ''
     df['title_quality_score'] = 0
-    df['Extracted Income'] = ''
-    df['Extracted Credit Score'] = ''
-    df['Extracted Approval Amount'] = ''
+    df['Extracted Income'] = None
+    df['Extracted Credit Score'] = None
+    df['Extracted Approval Amount'] = None
     
     # Process each row
     for idx, row in df.iterrows():
@@ -265,33 +264,27 @@ def extract_fields_title_focused(input_file, output_file=None, comprehensive=Fal
             df.at[idx, 'Extracted Approval Amount'] = approval_amount
     
     # Filter for high-quality posts with clear approval/denial status
-    # Only include Freedom Unlimited and Freedom Flex (exclude Sapphire, etc.)
-    # Check both title and body for specific card mentions
+    # Only include Freedom Unlimited and Freedom Flex
     quality_df = df[
         (df['approval_status'].isin(['approved', 'denied'])) &
         (df['title_quality_score'] >= 3) &
-        (df['Card_Name'].isin(['Freedom Unlimited', 'Freedom Flex'])) &
-        (~df['Title'].str.contains('sapphire|preferred|reserve|csr|csp', case=False, na=False)) &
-        (~df['Body'].str.contains('sapphire|preferred|reserve|csr|csp', case=False, na=False))
+        (df['Card_Name'].isin(['Freedom Unlimited', 'Freedom Flex']))
     ]
     
-    # Additional verification: ensure the specific card is actually mentioned in the content
+    # Additional verification: ensure the specific card is actually mentioned in the content,
+    # and in multi-card posts (e.g. Sapphire + CFU) that the outcome belongs to this card
     verified_posts = []
     for idx, row in quality_df.iterrows():
-        if verify_freedom_card_mention(row['Title'], row['Body'], row['Card_Name']):
+        if (verify_freedom_card_mention(row['Title'], row['Body'], row['Card_Name']) and
+                outcome_attributed_to_card(f"{row['Title']} {row['Body']}", row['Card_Name'])):
             verified_posts.append(idx)
     
     quality_df = quality_df.loc[verified_posts]
     
     # Clean and validate extracted data
-    quality_df['income_clean'] = quality_df['Extracted Income'].apply(lambda x: 
-        int(x) if x and str(x).isdigit() and 10000 <= int(x) <= 500000 else None)
-    
-    quality_df['credit_score_clean'] = quality_df['Extracted Credit Score'].apply(lambda x: 
-        int(x) if x and str(x).isdigit() and 300 <= int(x) <= 850 else None)
-    
-    quality_df['approval_amount_clean'] = quality_df['Extracted Approval Amount'].apply(lambda x: 
-        int(x) if x and str(x).isdigit() and 500 <= int(x) <= 50000 else None)
+    quality_df['income_clean'] = clean_int_range(quality_df['Extracted Income'], 10000, 500000)
+    quality_df['credit_score_clean'] = clean_int_range(quality_df['Extracted Credit Score'], 300, 850)
+    quality_df['approval_amount_clean'] = clean_int_range(quality_df['Extracted Approval Amount'], 500, 50000)
     
     # Create target variable (1 for approved, 0 for denied)
     quality_df['target'] = quality_df['approval_status'].map({'approved': 1, 'denied': 0})
@@ -315,18 +308,11 @@ def extract_fields_title_focused(input_file, output_file=None, comprehensive=Fal
             'mentions_income', 'mentions_credit_score', 'text_length'
         ]
         
-        # Fill missing values for display
-        quality_df['income_clean'] = quality_df['income_clean'].fillna('Not extracted')
-        quality_df['credit_score_clean'] = quality_df['credit_score_clean'].fillna('Not extracted')
-        quality_df['approval_amount_clean'] = quality_df['approval_amount_clean'].fillna('Not extracted')
-        
-        # Convert boolean columns to Yes/No for readability
-        boolean_columns = ['is_student', 'is_first_card', 'has_chase_account', 'mentions_income', 'mentions_credit_score']
-        for col in boolean_columns:
-            quality_df[col] = quality_df[col].map({True: 'Yes', False: 'No'})
-        
         quality_df = quality_df[comprehensive_columns]
     
+    # Compact dtypes; display strings are only produced for display exports
+    quality_df = apply_schema(quality_df)
+    
     # Generate output filename if not provided
     if output_file is None:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -339,7 +325,8 @@ def extract_fields_title_focused(input_file, output_file=None, comprehensive=Fal
     os.makedirs('data/processed', exist_ok=True)
     
     # Save results
-    quality_df.to_csv(output_file, index=False)
+    export_df = format_for_display(quality_df) if display else quality_df
+    export_df.to_csv(output_file, index=False)
     
     print(f"Title-focused extraction completed:")
     print(f"- Total posts processed: {len(df)}")
@@ -359,6 +346,7 @@ def main():
     
     # Check if comprehensive mode is requested
     comprehensive = '--comprehensive' in sys.argv
+    display = '--display' in sys.argv
     
     # Find the most recent raw data file
     raw_files = [f for f in os.listdir('data/raw') if f.endswith('.csv')]
@@ -375,7 +363,7 @@ def main():
     else:
         print(f"Processing {input_file} with title-focused extraction...")
     
-    output_file = extract_fields_title_focused(input_file, comprehensive=comprehensive)
+    output_file = extract_fields_title_focused(input_file, comprehensive=comprehensive, display=display)
     print(f"Title-focused extraction completed: {output_file}")
 
 if __name__ == "__main__":
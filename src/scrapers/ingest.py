@@ -0,0 +1,333 @@
+"""
+Concurrent multi-source ingestion into the master dataset.
+
+`IngestScheduler` runs the tasks of every source adapter on one thread
+pool, so adding a source adds tasks rather than another serial loop.
+`MasterSink` applies the same acceptance rules to every `PostRecord`
+regardless of where it came from (seen ids/URLs, age, card and decision
+attribution, near-duplicates) and appends accepted posts to the master CSV.
+
+    python src/scrapers/ingest.py --reddit
+    python src/scrapers/ingest.py --file dumps/forum_export.json --file dumps/reviews/ --max-age-days 0
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone, timedelta
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.near_dedupe import NearDuplicateIndex, post_text, DEFAULT_INDEX_FILE
+from utils.metrics import metrics, configure_logging
+from utils.proximity_index import attribute_decisions
+from scrapers.sources import SourceAdapter, PostRecord, RedditAdapter, FileAdapter, MASTER_COLUMNS
+from scrapers.query_planner import plan_queries
+from scrapers.yield_tracker import YieldTracker, MIN_YIELD
+from database.post_store import PostStore
+from database.compaction import upgrade_master_layout
+
+logger = logging.getLogger(__name__)
+
+MASTER_FILE = 'data/raw/freedom_cards_dataset.csv'
+
+
+def get_master_file(master_file=MASTER_FILE):
+    os.makedirs(os.path.dirname(master_file) or '.', exist_ok=True)
+
+    # Only create header if file doesn't exist
+    if not os.path.exists(master_file):
+        with open(master_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(MASTER_COLUMNS)
+    elif upgrade_master_layout(master_file):
+        # Appended rows must line up with the header
+        print(f"Upgraded {master_file} to the current column layout")
+
+    return master_file
+
+
+def get_existing_urls(master_file):
+    existing_urls = set()
+    if os.path.exists(master_file):
+        try:
+            df = pd.read_csv(master_file)
+            if 'URL' in df.columns:
+                existing_urls.update(df['URL'].tolist())
+        except Exception as e:
+            print(f"Error reading master file: {e}")
+    return existing_urls
+
+
+def load_near_duplicate_index(master_file, threshold):
+    index = NearDuplicateIndex.load(DEFAULT_INDEX_FILE, threshold=threshold)
+
+    # Backfill from the master file the first time the index is built
+    if len(index) == 0 and os.path.exists(master_file):
+        try:
+            df = pd.read_csv(master_file)
+            for url, title, body in zip(df['URL'].astype(str), df['Title'], df['Body']):
+                index.add(url, post_text(title, body))
+        except Exception as e:
+            print(f"Error indexing master file for near-duplicates: {e}")
+    return index
+
+
+class MasterSink:
+    """Thread-safe acceptance of PostRecords into master CSV rows"""
+
+    def __init__(self, master_file: str, existing_urls: set, near_duplicates: NearDuplicateIndex,
+                 max_new_posts: int = 500, max_age_days: Optional[int] = 180, min_body_length: int = 30,
+                 store: Optional[PostStore] = None):
+        self.master_file = master_file
+        self.existing_urls = existing_urls
+        self.near_duplicates = near_duplicates
+        self.max_new_posts = max_new_posts
+        self.max_age_days = max_age_days
+        self.min_body_length = min_body_length
+
+        self.lock = Lock()
+        self.seen_post_ids = set()
+        self.results: List[List[str]] = []
+        # Accepted rows are mirrored into the month-partitioned post store
+        self.store = store
+        self.store_rows: List[list] = []
+        # (record, first card) for follow-ups such as comment harvesting
+        self.accepted: List[tuple] = []
+        self.new_posts = 0
+        self.near_duplicate_count = 0
+
+    def full(self) -> bool:
+        return self.new_posts >= self.max_new_posts
+
+    def accept(self, record: PostRecord) -> bool:
+        """Apply the acceptance rules to one record; True if it was added"""
+        metrics.incr('scraper.posts_seen')
+        key = (record.source, record.post_id)
+        with self.lock:
+            if self.full():
+                return False
+            if key in self.seen_post_ids or record.url in self.existing_urls:
+                metrics.incr('scraper.seen_cache.hits')
+                return False
+            self.seen_post_ids.add(key)
+        metrics.incr('scraper.seen_cache.misses')
+
+        if self.max_age_days and record.created_utc is not None:
+            post_time = datetime.fromtimestamp(record.created_utc, tz=timezone.utc)
+            if post_time < datetime.now(timezone.utc) - timedelta(days=self.max_age_days):
+                metrics.incr('scraper.skipped.too_old')
+                return False
+
+        with metrics.timer('scraper.detect'):
+            # Every tracked card in the post gets its own row with the decision nearest to it
+            card_rows = attribute_decisions(record.text.lower())
+
+        if not card_rows:
+            metrics.incr('scraper.skipped.no_match')
+            logger.debug(f"Skipped: no card match or unclear decision - {record.title[:50]}")
+            return False
+
+        # Less strict filtering - just check for basic relevance
+        if len(record.body) <= self.min_body_length:
+            metrics.incr('scraper.skipped.not_relevant')
+            logger.debug(f"Skipped: not contextually relevant - {record.title[:50]}")
+            return False
+
+        with self.lock:
+            if self.full():
+                return False
+
+            # Cross-posts and lightly edited reposts would count twice
+            duplicate_of = self.near_duplicates.add(record.url, post_text(record.title, record.body))
+            if duplicate_of:
+                self.near_duplicate_count += 1
+                metrics.incr('scraper.skipped.near_duplicate')
+                logger.debug(f"Skipped: near-duplicate of {duplicate_of} - {record.title[:50]}")
+                return False
+
+            for card_name, decision in card_rows:
+                row = record.to_master_row(card_name, decision)
+                self.results.append(row)
+                if self.store is not None:
+                    self.store_rows.append([record.post_id, record.created_utc] + row)
+            if len(card_rows) > 1:
+                metrics.incr('scraper.multi_card_posts')
+            self.existing_urls.add(record.url)
+            self.accepted.append((record, card_rows[0][0]))
+            self.new_posts += 1
+
+        metrics.incr('scraper.posts_added')
+        metrics.incr(f'ingest.{record.source}.added')
+        logger.debug(f"Added ({self.new_posts}): {record.title[:60]}...")
+        return True
+
+    def flush(self) -> int:
+        """Append accepted rows to the master file and persist the near-duplicate index"""
+        with self.lock:
+            rows, self.results = self.results, []
+            store_rows, self.store_rows = self.store_rows, []
+        with open(self.master_file, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+        if store_rows:
+            self.store.append(store_rows)
+        self.near_duplicates.save(DEFAULT_INDEX_FILE)
+        return len(rows)
+
+
+class IngestScheduler:
+    """
+    Runs the tasks of all adapters concurrently and feeds every record to one handler.
+
+    With a yield tracker, search tasks (tuples) are run best-yielding first,
+    unproductive ones are skipped, and each record's acceptance (the
+    handler's return value) is credited to the task that returned it.
+    Tasks cut off by `should_stop` (e.g. a full sink) aren't scored, since
+    their rejections say nothing about the search.
+    """
+
+    def __init__(self, adapters: List[SourceAdapter], max_workers: int = 4,
+                 tracker: Optional[YieldTracker] = None):
+        self.adapters = adapters
+        self.max_workers = max_workers
+        self.tracker = tracker
+
+    def _tracks(self, task) -> bool:
+        return self.tracker is not None and isinstance(task, tuple)
+
+    def _run_task(self, adapter, task, handle, should_stop):
+        count = 0
+        stopped = False
+        tracked = self._tracks(task)
+        try:
+            for record in adapter.fetch(task):
+                if should_stop():
+                    stopped = True
+                    break
+                accepted = handle(record)
+                count += 1
+                if not accepted and should_stop():
+                    # Rejected because the sink filled up, not on its merits
+                    stopped = True
+                    break
+                if tracked:
+                    self.tracker.observe(task, record.url, record.post_id, bool(accepted))
+        except Exception as e:
+            metrics.incr('scraper.errors')
+            logger.error(f"Error in {adapter.name} task {task}: {e}")
+        if tracked:
+            if stopped:
+                self.tracker.abandon_task(task)
+            else:
+                self.tracker.finish_task(task)
+        metrics.incr(f'ingest.{adapter.name}.records', count)
+        return count
+
+    def _tasks(self, adapter):
+        tasks = adapter.tasks()
+        if self.tracker is not None and tasks and all(isinstance(task, tuple) for task in tasks):
+            return self.tracker.plan(tasks)
+        return tasks
+
+    def run(self, handle: Callable[[PostRecord], object],
+            should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+        """
+        Fetch every task of every adapter on a shared thread pool.
+
+        Args:
+            handle: Called with each PostRecord (from worker threads; must be thread-safe)
+            should_stop: Checked between records; True stops all tasks early
+
+        Returns:
+            dict: Records fetched per adapter name
+        """
+        should_stop = should_stop or (lambda: False)
+        fetched = {adapter.name: 0 for adapter in self.adapters}
+
+        with metrics.timer('ingest.run'):
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self._run_task, adapter, task, handle, should_stop): adapter.name
+                    for adapter in self.adapters for task in self._tasks(adapter)
+                }
+                for future in as_completed(futures):
+                    fetched[futures[future]] += future.result()
+        return fetched
+
+
+def load_yield_tracker(args, known_urls) -> Optional[YieldTracker]:
+    """Yield tracker for Reddit search tasks, unless --no-yield-tracking"""
+    if args.no_yield_tracking:
+        return None
+    tracker = YieldTracker.load(min_yield=args.min_yield)
+    tracker.start_run(known_urls)
+    return tracker
+
+
+def build_adapters(args) -> List[SourceAdapter]:
+    adapters = []
+    if args.reddit:
+        with open(args.config) as f:
+            config = json.load(f)
+        plan = None if args.no_query_plan else plan_queries(config['search_phrases'])
+        adapters.append(RedditAdapter(config['subreddits'], config['search_phrases'], plan=plan))
+    if args.file:
+        adapters.append(FileAdapter(args.file, source_name=args.source_name))
+    return adapters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest posts from several sources into the master dataset")
+    parser.add_argument('--reddit', action='store_true', help="Search the subreddits/phrases in scraper_config.json")
+    parser.add_argument('--config', default='scraper_config.json', help="Reddit search config")
+    parser.add_argument('--no-query-plan', action='store_true', help="Search every phrase separately instead of merged OR queries")
+    parser.add_argument('--no-yield-tracking', action='store_true', help="Don't record per-search yield or prune unproductive searches")
+    parser.add_argument('--min-yield', type=float, default=MIN_YIELD, help="Accepted posts per API call below which a search is pruned")
+    parser.add_argument('--file', action='append', default=[], help="Local .json/.jsonl/.html dump, glob or directory (repeatable)")
+    parser.add_argument('--source-name', default=None, help="Source label for file posts (default: File-<filename>)")
+    parser.add_argument('--max-posts', type=int, default=500, help="Max number of new posts to collect")
+    parser.add_argument('--max-age-days', type=int, default=180, help="Skip posts older than this (0 disables)")
+    parser.add_argument('--threads', type=int, default=4, help="Concurrent ingestion tasks across all sources")
+    parser.add_argument('--dedupe-threshold', type=float, default=0.7, help="Estimated Jaccard similarity above which posts are near-duplicates")
+    parser.add_argument('--log-level', default='INFO', help="Logging level")
+    parser.add_argument('--metrics-out', default=None, help="Path for the JSON run summary")
+    args = parser.parse_args(argv)
+
+    configure_logging(args.log_level)
+    adapters = build_adapters(args)
+    if not adapters:
+        parser.error("Give at least one source (--reddit and/or --file)")
+
+    master_file = get_master_file()
+    sink = MasterSink(master_file, get_existing_urls(master_file),
+                      load_near_duplicate_index(master_file, args.dedupe_threshold),
+                      max_new_posts=args.max_posts, max_age_days=args.max_age_days or None,
+                      store=PostStore())
+
+    tracker = load_yield_tracker(args, sink.existing_urls) if args.reddit else None
+    fetched = IngestScheduler(adapters, args.threads, tracker).run(sink.accept, should_stop=sink.full)
+    written = sink.flush()
+    if tracker is not None:
+        tracker.save()
+
+    print(f"\nIngestion complete. {sink.new_posts} new posts added ({written} rows).")
+    for name, count in fetched.items():
+        print(f"- {name}: {count} records fetched")
+    print(f"Near-duplicates skipped: {sink.near_duplicate_count}")
+    for adapter in adapters:
+        if getattr(adapter, 'plan', None) is not None:
+            adapter.plan.print_report(len(adapter.subreddits), adapter.listings_per_query)
+    if tracker is not None:
+        tracker.print_report()
+    print(f"Run summary saved to: {metrics.write_summary('ingest', args.metrics_out)}")
+
+
+if __name__ == '__main__':
+    main()
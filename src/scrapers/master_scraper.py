@@ -1,136 +1,131 @@
-import praw
 import csv
 import os
 import json
-import pandas as pd
-from datetime import datetime, timezone, timedelta
-from dotenv import load_dotenv
+from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 import argparse
+import logging
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics, configure_logging
+from utils.card_registry import detect_cards
+from utils.proximity_index import detect_decision, attribute_decisions, UNKNOWN
+from scrapers.sources import RedditAdapter
+from scrapers.query_planner import plan_queries
+from scrapers.yield_tracker import MIN_YIELD
+from database.post_store import PostStore
+from scrapers.ingest import (
+    get_master_file, get_existing_urls, load_near_duplicate_index, load_yield_tracker, MasterSink, IngestScheduler
+)
+from extractors.title_focused_extractor import (
+    extract_income_from_title_and_body,
+    extract_credit_score_from_title_and_body,
+    extract_approval_amount_from_title_and_body
+)
+
+logger = logging.getLogger(__name__)
 
 lock = Lock()
-results = []
-new_posts_counter = 0
+comment_api_calls = 0
 
-# Load environment variables
-load_dotenv()
-client_id = os.getenv('REDDIT_APP_ID')
-client_secret = os.getenv('REDDIT_APP_SECRET')
-user_agent = os.getenv('REDDIT_APP_NAME')
+COMMENTS_FILE = 'data/raw/freedom_cards_comments.csv'
+COMMENT_COLUMNS = [
+    'Comment_ID', 'Post_ID', 'Post_URL', 'Body', 'Source', 'Card_Name', 'Decision',
+    'Extracted Income', 'Extracted Credit Score', 'Extracted Approval Amount', 'Scraped_At'
+]
 
-reddit = praw.Reddit(client_id=client_id,
-                     client_secret=client_secret,
-                     user_agent=user_agent)
 
-def get_master_file():
-    master_file = 'data/raw/freedom_cards_dataset.csv'
+def get_comments_file():
     os.makedirs('data/raw', exist_ok=True)
-    
-    # Only create header if file doesn't exist
-    if not os.path.exists(master_file):
-        with open(master_file, 'w', newline='', encoding='utf-8') as f:
+
+    if not os.path.exists(COMMENTS_FILE):
+        with open(COMMENTS_FILE, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow(['Title', 'URL', 'Body', 'Source', 'Card_Name', 'Decision', 'Scraped_At'])
-    
-    return master_file
-
-def get_existing_urls(master_file):
-    existing_urls = set()
-    if os.path.exists(master_file):
-        try:
-            df = pd.read_csv(master_file)
-            if 'URL' in df.columns:
-                existing_urls.update(df['URL'].tolist())
-        except Exception as e:
-            print(f"Error reading master file: {e}")
-    return existing_urls
+            writer.writerow(COMMENT_COLUMNS)
+
+    return COMMENTS_FILE
 
 def detect_card(text):
-    text = text.lower()
-    premium_exclusions = ['sapphire', 'preferred', 'reserve', 'csr', 'csp', 'ink', 'business', 'amex', 'gold']
-    if any(x in text for x in premium_exclusions):
-        return None
-
-    freedom_unlimited_terms = ['freedom unlimited', 'cfu', 'chase freedom unlimited', 'freedom unlimited card', 'cfu card']
-    freedom_flex_terms = ['freedom flex', 'cff', 'chase freedom flex', 'freedom flex card', 'cff card']
-
-    if any(term in text for term in freedom_unlimited_terms):
-        return 'Freedom Unlimited'
-    elif any(term in text for term in freedom_flex_terms):
-        return 'Freedom Flex'
-    elif 'freedom' in text:
-        return 'Freedom (Generic)'
-    return None
-
-def detect_decision(text):
-    text = text.lower()
-    if 'denied' in text or 'rejected' in text:
-        return 'Denied'
-    if 'preapproved' in text or 'pre-approval' in text:
-        return 'Pre-Approved'
-    if 'approved' in text or 'got approved' in text:
-        return 'Approved'
-    return 'Unknown'
-
-def is_card_contextually_relevant(text, card_terms, decision_terms):
-    tokens = text.lower().split()
-    for i, token in enumerate(tokens):
-        if any(card in token for card in card_terms):
-            window = tokens[max(i - 12, 0):i + 13]
-            if any(decision in w for decision in decision_terms for w in window):
-                return True
-    return False
-
-def process_phrase(subreddit_name, phrase, existing_urls, master_file, max_new_posts):
-    global new_posts_counter
-    subreddit = reddit.subreddit(subreddit_name)
-    seen_post_ids = set()
-
-    for sort_method in ['new', 'top']:
-        try:
-            for post in subreddit.search(phrase, sort=sort_method, limit=100):
-                with lock:
-                    if new_posts_counter >= max_new_posts:
-                        return
-
-                if post.id in seen_post_ids or post.url in existing_urls:
-                    continue
-                seen_post_ids.add(post.id)
-
-                post_time = datetime.fromtimestamp(post.created_utc, tz=timezone.utc)
-                if post_time < datetime.now(timezone.utc) - timedelta(days=180):
-                    continue
-
-                combined_text = f"{post.title.lower()} {post.selftext.lower()}"
-                card_name = detect_card(combined_text)
-                decision = detect_decision(combined_text)
-
-                card_terms = ['freedom unlimited', 'cfu', 'freedom flex', 'cff']
-                decision_terms = ['approved', 'denied', 'rejected', 'preapproved', 'pre-approval']
-
-                if card_name and decision != 'Unknown':
-                    # Less strict filtering - just check for basic relevance
-                    if len(post.selftext) > 30 and not any(x in combined_text for x in ['amex', 'gold', 'sapphire', 'csp', 'csr']):
-                            with lock:
-                                # Clean the text to avoid CSV parsing issues
-                                clean_title = post.title.replace('\n', ' ').replace('\r', ' ')
-                                clean_body = post.selftext.replace('\n', ' ').replace('\r', ' ')
-                                results.append([
-                                    clean_title, post.url, clean_body,
-                                    f'Reddit-{subreddit_name}', card_name,
-                                    decision, datetime.now().isoformat()
-                                ])
-                                existing_urls.add(post.url)
-                                new_posts_counter += 1
-                                print(f"Added ({new_posts_counter}): {post.title[:60]}...")
-                    else:
-                        print(f"Skipped: not contextually relevant - {post.title[:50]}")
-                else:
-                    print(f"Skipped: no card match or unclear decision - {post.title[:50]}")
-
-        except Exception as e:
-            print(f"Error with phrase '{phrase}' in r/{subreddit_name}: {e}")
+    """First tracked card mentioned in the text (see cards_config.json), or None"""
+    cards = detect_cards(text)
+    return cards[0] if cards else None
+
+def reserve_comment_calls(requested, api_budget):
+    """Reserve up to `requested` API calls from the shared comment budget"""
+    global comment_api_calls
+    with lock:
+        granted = max(0, min(requested, api_budget - comment_api_calls))
+        comment_api_calls += granted
+    return granted
+
+def harvest_post_comments(post, card_name, subreddit_name, args):
+    """Expand one submission's comment tree and keep comments that carry a data point"""
+    # One call for the initial comment listing, the rest for MoreComments expansion
+    granted = reserve_comment_calls(1 + args.comment_more_limit, args.comment_api_budget)
+    if granted == 0:
+        return []
+
+    post.comment_sort = 'top'
+    with metrics.timer('comments.expand'):
+        post.comments.replace_more(limit=granted - 1)
+    metrics.incr('comments.api_calls_reserved', granted)
+
+    rows = []
+    for comment in post.comments.list()[:args.max_comments_per_post]:
+        metrics.incr('comments.seen')
+        body = getattr(comment, 'body', '') or ''
+        if len(body) < 20 or body in ('[deleted]', '[removed]'):
+            continue
+
+        # Comments rarely restate the card, so fall back to the parent post's card
+        card_rows = attribute_decisions(body)
+        if card_rows:
+            comment_card, decision = card_rows[0]
+        elif not detect_cards(body):
+            comment_card, decision = card_name, detect_decision(body)
+        else:
+            continue
+        if decision == UNKNOWN:
+            continue
+
+        income = extract_income_from_title_and_body('', body)
+        credit_score = extract_credit_score_from_title_and_body('', body)
+        approval_amount = extract_approval_amount_from_title_and_body('', body)
+
+        rows.append([
+            comment.id, post.id, post.url, body.replace('\n', ' ').replace('\r', ' '),
+            f'Reddit-{subreddit_name}-comment', comment_card, decision,
+            income or '', credit_score or '', approval_amount or '',
+            datetime.now().isoformat()
+        ])
+    return rows
+
+def harvest_comments(posts, args):
+    """Harvest comments for accepted posts in parallel within the API-call budget"""
+    comments_file = get_comments_file()
+    comment_rows = []
+
+    with ThreadPoolExecutor(max_workers=args.comment_threads) as executor:
+        futures = {
+            executor.submit(harvest_post_comments, post, card_name, subreddit_name, args): post
+            for post, card_name, subreddit_name in posts
+        }
+        for future in as_completed(futures):
+            try:
+                comment_rows.extend(future.result())
+            except Exception as e:
+                metrics.incr('comments.errors')
+                logger.error(f"Error harvesting comments for {futures[future].id}: {e}")
+
+    with open(comments_file, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerows(comment_rows)
+
+    metrics.incr('comments.added', len(comment_rows))
+    print(f"Comment harvesting complete. {len(comment_rows)} comments added using {comment_api_calls} API calls.")
+    return comment_rows
 
 def scrape_all(args):
     with open('scraper_config.json') as f:
@@ -140,31 +135,64 @@ def scrape_all(args):
     search_phrases = config['search_phrases']
 
     master_file = get_master_file()
-    existing_urls = get_existing_urls(master_file)
+    sink = MasterSink(master_file, get_existing_urls(master_file),
+                      load_near_duplicate_index(master_file, args.dedupe_threshold),
+                      max_new_posts=args.max_posts, store=PostStore())
 
-    with ThreadPoolExecutor(max_workers=args.threads) as executor:
-        futures = []
-        for subreddit in subreddits:
-            for phrase in search_phrases:
-                futures.append(executor.submit(process_phrase, subreddit, phrase, existing_urls, master_file, args.max_posts))
-        for _ in as_completed(futures):
-            pass
+    # Near-identical phrases are merged into a few OR queries unless --no-query-plan
+    plan = None if args.no_query_plan else plan_queries(search_phrases)
 
-    # Append new results to existing file
-    with open(master_file, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerows(results)
+    # One task per (subreddit, query, sort) on the shared ingestion scheduler;
+    # the PRAW client is created from the environment on the first search
+    source = RedditAdapter(subreddits, search_phrases, plan=plan)
+    # Past yield orders the searches and skips unproductive ones
+    tracker = load_yield_tracker(args, sink.existing_urls)
+    with metrics.timer('scraper.search_stage'):
+        IngestScheduler([source], max_workers=args.threads, tracker=tracker).run(sink.accept, should_stop=sink.full)
 
-    print(f"\nScraping complete. {new_posts_counter} new posts added.")
+    # Append new results to existing file
+    sink.flush()
+    if tracker is not None:
+        tracker.save()
+
+    if args.harvest_comments and sink.accepted:
+        accepted_posts = [(record.raw, card_name, record.source.removeprefix('Reddit-'))
+                          for record, card_name in sink.accepted]
+        harvest_comments(accepted_posts, args)
+
+    print(f"\nScraping complete. {sink.new_posts} new posts added.")
+    print(f"Near-duplicates skipped: {sink.near_duplicate_count}")
+    if plan is not None:
+        plan.print_report(len(subreddits), source.listings_per_query)
+    if tracker is not None:
+        tracker.print_report()
     total_posts = sum(1 for line in open(master_file)) - 1
     print(f"Total posts in master file: {total_posts}")
 
-def main():
+    summary_file = metrics.write_summary('scrape', args.metrics_out)
+    print(f"Run summary saved to: {summary_file}")
+    if args.prometheus_out:
+        metrics.write_prometheus(args.prometheus_out)
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Reddit Scraper for Freedom Cards")
     parser.add_argument('--max-posts', type=int, default=500, help="Max number of new posts to collect")
     parser.add_argument('--threads', type=int, default=4, help="Number of parallel threads")
-    args = parser.parse_args()
-
+    parser.add_argument('--harvest-comments', action='store_true', help="Also harvest data points from comments of accepted posts")
+    parser.add_argument('--comment-threads', type=int, default=4, help="Parallel threads for comment harvesting")
+    parser.add_argument('--comment-more-limit', type=int, default=4, help="Max MoreComments expansions (API calls) per post")
+    parser.add_argument('--comment-api-budget', type=int, default=300, help="Total API calls allowed for comment harvesting")
+    parser.add_argument('--max-comments-per-post', type=int, default=200, help="Max comments examined per post")
+    parser.add_argument('--dedupe-threshold', type=float, default=0.7, help="Estimated Jaccard similarity above which posts are near-duplicates")
+    parser.add_argument('--no-query-plan', action='store_true', help="Search every phrase separately instead of merged OR queries")
+    parser.add_argument('--no-yield-tracking', action='store_true', help="Don't record per-search yield or prune unproductive searches")
+    parser.add_argument('--min-yield', type=float, default=MIN_YIELD, help="Accepted posts per API call below which a search is pruned")
+    parser.add_argument('--log-level', default='INFO', help="Logging level (DEBUG shows every added/skipped post)")
+    parser.add_argument('--metrics-out', default=None, help="Path for the JSON run summary (default: data/metrics/scrape_<timestamp>.json)")
+    parser.add_argument('--prometheus-out', default=None, help="Optional path for a Prometheus text-format export")
+    args = parser.parse_args(argv)
+
+    configure_logging(args.log_level)
     scrape_all(args)
 
 if __name__ == '__main__':
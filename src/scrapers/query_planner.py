@@ -0,0 +1,302 @@
+"""
+Search query planner: compiles the phrase list into a few boolean OR queries.
+
+Most configured phrases are a card name crossed with an outcome word
+("CFU approved", "CFU denied", "CFF approved", ...). Searching each one in
+every subreddit and sort costs one listing call per phrase and returns
+heavily overlapping posts. The planner
+
+- drops phrases whose results are already covered by a broader phrase
+  ("Chase Freedom approved" is implied by "Freedom approved"),
+- factors the rest into rectangles `(A OR B) (x OR y)` that match exactly
+  the phrases they replace (greedy biclique cover), and
+- packs rectangles into OR queries within Reddit's query length limit,
+  capping phrases per query so the per-query result limit can scale with it.
+
+At run time it records which query returned which post, so the overlap
+between queries and the listing calls actually made can be reported against
+the one-query-per-phrase expansion.
+
+    python src/scrapers/query_planner.py
+    python src/scrapers/query_planner.py --keep-subsumed --max-phrases 6
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import shlex
+import sys
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics
+
+# Reddit rejects longer search queries
+MAX_QUERY_LENGTH = 512
+# Results per listing page; one API call each
+PAGE_SIZE = 100
+# Reddit listings stop at 1000 items however the query is paged
+MAX_LISTING = 1000
+MAX_PHRASES_PER_QUERY = MAX_LISTING // PAGE_SIZE
+
+Terms = Tuple[str, ...]
+
+
+def parse_phrase(phrase: str) -> Terms:
+    """Search terms of a phrase; quoted parts stay one term ('"Freedom Unlimited" approved')"""
+    terms = []
+    for token in shlex.split(phrase):
+        terms.append(f'"{token}"' if ' ' in token else token)
+    return tuple(terms)
+
+
+def _words(term: str) -> Tuple[str, ...]:
+    return tuple(re.findall(r"[a-z0-9'-]+", term.lower()))
+
+
+def subsumes(broad: Terms, narrow: Terms) -> bool:
+    """
+    Whether every post matching `narrow` also matches `broad`.
+
+    Terms are ANDed, so this holds when each term of `broad` is contained
+    (as a contiguous word sequence) in some term of `narrow`.
+    """
+    def contained(term, other):
+        needle, haystack = _words(term), _words(other)
+        return any(haystack[i:i + len(needle)] == needle for i in range(len(haystack) - len(needle) + 1))
+    return all(any(contained(term, other) for other in narrow) for term in broad)
+
+
+@dataclass
+class Rectangle:
+    """Heads x tails; matches exactly the phrases head + tail"""
+    heads: List[Terms]
+    tails: List[Terms]
+
+    @property
+    def phrases(self) -> List[Terms]:
+        return [head + tail for head in self.heads for tail in self.tails]
+
+    def render(self) -> str:
+        def alternatives(parts):
+            rendered = [' '.join(part) for part in parts]
+            if len(rendered) == 1:
+                return rendered[0]
+            return '(' + ' OR '.join(f'({r})' if len(p) > 1 else r for r, p in zip(rendered, parts)) + ')'
+        return ' '.join(part for part in (alternatives(self.heads), alternatives(self.tails)) if part)
+
+
+@dataclass
+class PlannedQuery:
+    text: str
+    phrases: List[str]
+
+    def limit(self, per_phrase_limit: int) -> int:
+        """Listing limit giving each merged phrase the room it had on its own"""
+        return min(MAX_LISTING, per_phrase_limit * len(self.phrases))
+
+
+@dataclass
+class QueryPlan:
+    """The compiled queries plus run-time overlap tracking"""
+    phrases: List[str]
+    queries: List[PlannedQuery]
+    subsumed: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._by_text = {query.text: query for query in self.queries}
+        self._lock = Lock()
+        self._returned: Dict[Tuple[str, str, str], int] = {}
+        self._seen: Dict[Tuple[str, str], Set[str]] = {}
+
+    @property
+    def texts(self) -> List[str]:
+        return [query.text for query in self.queries]
+
+    def limit_for(self, text: str, per_phrase_limit: int) -> int:
+        query = self._by_text.get(text)
+        return query.limit(per_phrase_limit) if query else per_phrase_limit
+
+    def record(self, subreddit: str, sort: str, text: str, post_id: str):
+        """Note that a query returned a post; repeats across queries are overlap"""
+        with self._lock:
+            self._returned[(subreddit, sort, text)] = self._returned.get((subreddit, sort, text), 0) + 1
+            seen = self._seen.setdefault((subreddit, sort), set())
+            duplicate = post_id in seen
+            seen.add(post_id)
+        metrics.incr('planner.posts_returned')
+        if duplicate:
+            metrics.incr('planner.overlapping_returns')
+
+    def report(self, n_subreddits: int, n_listings: int) -> Dict[str, object]:
+        """
+        Listing calls for the naive expansion vs this plan (estimated and, after a run, observed).
+
+        n_listings is the number of searches per query and subreddit (sorts x time filters).
+        """
+        naive_calls = n_subreddits * n_listings * len(self.phrases)
+        planned_queries = n_subreddits * n_listings * len(self.queries)
+        returned = sum(self._returned.values())
+        # Every query costs at least one call, and one more per extra page of results
+        observed_calls = sum(max(1, math.ceil(count / PAGE_SIZE)) for count in self._returned.values())
+        unseen_queries = planned_queries - len(self._returned)
+        report = {
+            'phrases': len(self.phrases),
+            'subsumed_phrases': len(self.subsumed),
+            'queries': len(self.queries),
+            'naive_listing_calls_min': naive_calls,
+            'planned_listing_calls_min': planned_queries,
+            'listing_calls_saved_min': naive_calls - planned_queries,
+        }
+        if self._returned:
+            unique = sum(len(seen) for seen in self._seen.values())
+            report.update({
+                'posts_returned': returned,
+                'unique_posts': unique,
+                'overlap_rate': round(1 - unique / returned, 4) if returned else 0.0,
+                'observed_listing_calls': observed_calls + max(0, unseen_queries)
+            })
+        return report
+
+    def print_report(self, n_subreddits: int, n_listings: int):
+        report = self.report(n_subreddits, n_listings)
+        print(f"Query plan: {report['phrases']} phrases -> {report['queries']} queries "
+              f"({report['subsumed_phrases']} covered by broader phrases)")
+        print(f"- Listing calls: at least {report['naive_listing_calls_min']} one-per-phrase vs "
+              f"{report['planned_listing_calls_min']} planned ({report['listing_calls_saved_min']} saved)")
+        if 'posts_returned' in report:
+            print(f"- Posts returned: {report['posts_returned']} ({report['unique_posts']} unique, "
+                  f"{report['overlap_rate']:.1%} overlap between queries); "
+                  f"~{report['observed_listing_calls']} listing calls made")
+
+
+def drop_subsumed(phrases: Dict[str, Terms]) -> Tuple[Dict[str, Terms], Dict[str, str]]:
+    """Remove phrases implied by a broader one; returns (kept, {dropped: broader})"""
+    kept, dropped = {}, {}
+    # Broader (fewer-word) phrases first, so chains collapse onto the broadest
+    for phrase, terms in sorted(phrases.items(), key=lambda item: (sum(len(_words(t)) for t in item[1]), item[0])):
+        broader = next((other for other, other_terms in kept.items() if subsumes(other_terms, terms)), None)
+        if broader:
+            dropped[phrase] = broader
+        else:
+            kept[phrase] = terms
+    return kept, dropped
+
+
+def cover_with_rectangles(phrases: List[Terms], max_phrases: int) -> List[Rectangle]:
+    """
+    Greedy biclique cover: repeatedly take the largest heads x tails block
+    whose every combination is a remaining phrase.
+    """
+    remaining: Set[Terms] = set(phrases)
+    rectangles = []
+    while remaining:
+        # Tails available to each head at every split point of the remaining phrases
+        # (single-term phrases can only stand alone, as a head with an empty tail)
+        tails_by_head: Dict[Terms, Set[Terms]] = {}
+        for terms in remaining:
+            for split in range(1, max(2, len(terms))):
+                tails_by_head.setdefault(terms[:split], set()).add(terms[split:])
+
+        best: Optional[Tuple[int, List[Terms], FrozenSet[Terms]]] = None
+        for tails in {frozenset(t) for t in tails_by_head.values()}:
+            heads = sorted(head for head, available in tails_by_head.items() if tails <= available)
+            area = len(heads) * len(tails)
+            if best is None or area > best[0]:
+                best = (area, heads, tails)
+
+        _, heads, tails = best
+        rectangle = Rectangle(heads, sorted(tails))
+        rectangles.extend(_split_rectangle(rectangle, max_phrases))
+        remaining -= set(rectangle.phrases)
+    return rectangles
+
+
+def _split_rectangle(rectangle: Rectangle, max_phrases: int) -> List[Rectangle]:
+    """Chunk the longer side so each piece has at most max_phrases combinations"""
+    heads, tails = rectangle.heads, rectangle.tails
+    if len(heads) * len(tails) <= max_phrases:
+        return [rectangle]
+    if len(tails) >= len(heads):
+        step = max(1, max_phrases // len(heads))
+        if step * len(heads) <= max_phrases:
+            return [Rectangle(heads, tails[i:i + step]) for i in range(0, len(tails), step)]
+    step = max(1, max_phrases // len(tails))
+    if step * len(tails) <= max_phrases:
+        return [Rectangle(heads[i:i + step], tails) for i in range(0, len(heads), step)]
+    # Both sides too long: one row at a time, chunked
+    return [piece for head in heads for piece in _split_rectangle(Rectangle([head], tails), max_phrases)]
+
+
+def plan_queries(phrases: List[str], max_length: int = MAX_QUERY_LENGTH,
+                 max_phrases: int = MAX_PHRASES_PER_QUERY, keep_subsumed: bool = False) -> QueryPlan:
+    """
+    Compile search phrases into OR queries.
+
+    Args:
+        phrases: Search phrases as in scraper_config.json
+        max_length: Longest query text allowed
+        max_phrases: Most phrases merged into one query
+        keep_subsumed: Search phrases implied by broader ones anyway
+
+    Returns:
+        QueryPlan: queries, each with the phrases it covers
+    """
+    parsed = {phrase: parse_phrase(phrase) for phrase in dict.fromkeys(phrases)}
+    subsumed = {}
+    if not keep_subsumed:
+        parsed, subsumed = drop_subsumed(parsed)
+    original = {terms: phrase for phrase, terms in parsed.items()}
+
+    # Pack rectangles into OR queries (first fit, largest first)
+    bins: List[Tuple[List[str], List[str]]] = []
+    for rectangle in sorted(cover_with_rectangles(list(parsed.values()), max_phrases),
+                            key=lambda r: -len(r.phrases)):
+        clause = rectangle.render()
+        covered = [original[terms] for terms in rectangle.phrases]
+        for clauses, bin_phrases in bins:
+            text = ' OR '.join(f'({c})' for c in clauses + [clause])
+            if len(text) <= max_length and len(bin_phrases) + len(covered) <= max_phrases:
+                clauses.append(clause)
+                bin_phrases.extend(covered)
+                break
+        else:
+            bins.append(([clause], covered))
+
+    queries = [PlannedQuery(clauses[0] if len(clauses) == 1 else ' OR '.join(f'({c})' for c in clauses),
+                            bin_phrases) for clauses, bin_phrases in bins]
+    metrics.set_gauge('planner.phrases', len(phrases))
+    metrics.set_gauge('planner.queries', len(queries))
+    metrics.set_gauge('planner.subsumed_phrases', len(subsumed))
+    return QueryPlan(list(dict.fromkeys(phrases)), queries, subsumed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile scraper search phrases into OR queries")
+    parser.add_argument('--config', default='scraper_config.json', help="Scraper config with subreddits and search_phrases")
+    parser.add_argument('--max-length', type=int, default=MAX_QUERY_LENGTH, help="Longest query text allowed")
+    parser.add_argument('--max-phrases', type=int, default=MAX_PHRASES_PER_QUERY, help="Most phrases merged into one query")
+    parser.add_argument('--keep-subsumed', action='store_true', help="Keep phrases implied by broader phrases")
+    parser.add_argument('--sorts', type=int, default=2, help="Searches per query and subreddit (sorts x time filters)")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+
+    plan = plan_queries(config['search_phrases'], args.max_length, args.max_phrases, args.keep_subsumed)
+    for query in plan.queries:
+        print(f"[{len(query.phrases):2d} phrases] {query.text}")
+    if plan.subsumed:
+        print("\nCovered by broader phrases:")
+        for phrase, broader in plan.subsumed.items():
+            print(f"- {phrase}  <=  {broader}")
+    print()
+    plan.print_report(len(config['subreddits']), args.sorts)
+
+
+if __name__ == '__main__':
+    main()
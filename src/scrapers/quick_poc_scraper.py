@@ -4,6 +4,10 @@ import pandas as pd
 from dotenv import load_dotenv
 import os
 from datetime import datetime
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.card_registry import detect_cards
 
 def check_existing_posts():
     """Check what posts we already have to avoid duplicates"""
@@ -106,35 +110,9 @@ def scrape_quick_poc_freedom_cards():
                         body_lower = post.selftext.lower()
                         combined_text = f"{title_lower} {body_lower}"
 
-                        # Comprehensive card detection logic
-                        card_detected = None
-                        
-                        # Check for Freedom Unlimited variations
-                        freedom_unlimited_terms = [
-                            'freedom unlimited', 'cfu', 'chase freedom unlimited',
-                            'freedom unlimited card', 'cfu card'
-                        ]
-                        
-                        # Check for Freedom Flex variations  
-                        freedom_flex_terms = [
-                            'freedom flex', 'cff', 'chase freedom flex',
-                            'freedom flex card', 'cff card'
-                        ]
-                        
-                        # Check for Freedom cards (exclude premium cards)
-                        premium_exclusions = ['sapphire', 'preferred', 'reserve', 'csr', 'csp', 'ink', 'business']
-                        
-                        if not any(exclusion in combined_text for exclusion in premium_exclusions):
-                            # Check Freedom Unlimited first
-                            if any(term in combined_text for term in freedom_unlimited_terms):
-                                card_detected = 'Freedom Unlimited'
-                            # Check Freedom Flex if Unlimited not found
-                            elif any(term in combined_text for term in freedom_flex_terms):
-                                card_detected = 'Freedom Flex'
-                            # Check generic Freedom only if no specific card mentioned
-                            elif 'freedom' in combined_text:
-                                if not any(term in combined_text for term in freedom_unlimited_terms + freedom_flex_terms):
-                                    card_detected = 'Freedom (Generic)'
+                        # Card detection via the registry (cards_config.json); first tracked card mentioned
+                        tracked_cards = detect_cards(combined_text)
+                        card_detected = tracked_cards[0] if tracked_cards else None
 
                         # Tighter approval/denial/preapproval detection
                         outcome_keywords = [
@@ -3,6 +3,10 @@ import csv
 from dotenv import load_dotenv
 import os
 from datetime import datetime
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.card_registry import detect_cards
 
 def scrape_freedom_cards_posts():
     """Scrape Freedom Unlimited and Freedom Flex approval/denial posts from Reddit"""
@@ -79,21 +83,9 @@ def scrape_freedom_cards_posts():
                 body_lower = post.selftext.lower()
                 combined_text = f"{title_lower} {body_lower}"
 
-                # Card detection logic - be more strict about Freedom cards only
-                card_detected = None
-                
-                # Check for Freedom Unlimited (exclude Sapphire mentions)
-                if ('freedom unlimited' in combined_text or 'cfu' in combined_text) and 'sapphire' not in combined_text:
-                    card_detected = 'Freedom Unlimited'
-                
-                # Check for Freedom Flex (only if Unlimited not found and no Sapphire)
-                elif card_detected is None and ('freedom flex' in combined_text or 'cff' in combined_text) and 'sapphire' not in combined_text:
-                    card_detected = 'Freedom Flex'
-                
-                # Generic Freedom only if no specific card and no Sapphire
-                elif card_detected is None and 'freedom' in combined_text and 'sapphire' not in combined_text:
-                    if 'unlimited' not in combined_text and 'flex' not in combined_text:
-                        card_detected = 'Freedom (Generic)'
+                # Card detection via the registry (cards_config.json); first tracked card mentioned
+                tracked_cards = detect_cards(combined_text)
+                card_detected = tracked_cards[0] if tracked_cards else None
 
                 # Approval/denial language
                 approval_keywords = [
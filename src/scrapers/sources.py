@@ -0,0 +1,306 @@
+"""
+Source adapters and the common post record.
+
+Every source (Reddit, local HTML/JSON dumps, and later forums or review
+sites) is exposed as a `SourceAdapter` that splits its work into
+independent tasks and yields `PostRecord`s for each one. Downstream code
+only sees `PostRecord`, so nothing past ingestion depends on PRAW objects.
+"""
+
+import glob
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.metrics import metrics
+from utils.proximity_index import rule_version
+
+# Rule_Version records which card/decision rules produced Card_Name and Decision
+MASTER_COLUMNS = ['Title', 'URL', 'Body', 'Source', 'Card_Name', 'Decision', 'Scraped_At', 'Rule_Version']
+
+
+@dataclass
+class PostRecord:
+    """A post from any source, normalized to the fields the pipeline uses"""
+    post_id: str
+    source: str
+    title: str
+    body: str
+    url: str
+    created_utc: Optional[float] = None
+    author: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # Source-native object (e.g. the PRAW submission) for source-specific follow-ups
+    raw: Any = field(default=None, repr=False, compare=False)
+
+    @property
+    def text(self) -> str:
+        return f"{self.title} {self.body}"
+
+    def to_master_row(self, card_name: str, decision: str, scraped_at: Optional[str] = None) -> List[str]:
+        """Row in the master CSV layout (MASTER_COLUMNS)"""
+        clean_title = self.title.replace('\n', ' ').replace('\r', ' ')
+        clean_body = self.body.replace('\n', ' ').replace('\r', ' ')
+        return [clean_title, self.url, clean_body, self.source, card_name, decision,
+                scraped_at or datetime.now().isoformat(), rule_version()]
+
+
+class SourceAdapter:
+    """
+    Base class for ingestion sources.
+
+    `tasks()` lists independent units of work (a search query, a file, a
+    page range); `fetch(task)` yields the PostRecords for one of them. The
+    ingestion scheduler runs tasks from all adapters concurrently.
+    """
+    name = 'source'
+
+    def tasks(self) -> List[Any]:
+        return [None]
+
+    def fetch(self, task) -> Iterator[PostRecord]:
+        raise NotImplementedError
+
+
+def reddit_from_env():
+    """PRAW client from REDDIT_APP_ID / REDDIT_APP_SECRET / REDDIT_APP_NAME"""
+    import praw
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return praw.Reddit(client_id=os.getenv('REDDIT_APP_ID'),
+                       client_secret=os.getenv('REDDIT_APP_SECRET'),
+                       user_agent=os.getenv('REDDIT_APP_NAME'))
+
+
+class RedditAdapter(SourceAdapter):
+    """
+    Subreddit searches; one task per (subreddit, phrase, sort, time filter).
+
+    Time filters only apply to ranked sorts ('top', 'relevance', 'comments');
+    'new' is always searched over 'all'.
+
+    With a query plan (`scrapers.query_planner`), the phrases are the plan's
+    merged OR queries: each gets a listing limit scaled to the phrases it
+    covers, and every returned post is recorded for the overlap report.
+    """
+    name = 'reddit'
+    RANKED_SORTS = ('top', 'relevance', 'comments')
+
+    def __init__(self, subreddits: List[str], phrases: List[str], reddit=None,
+                 sorts=('new', 'top'), limit: int = 100, plan=None, time_filters=('all',)):
+        self.subreddits = subreddits
+        self.phrases = plan.texts if plan is not None else phrases
+        self.sorts = sorts
+        self.time_filters = time_filters
+        self.limit = limit
+        self.plan = plan
+        self._reddit = reddit
+
+    @property
+    def reddit(self):
+        if self._reddit is None:
+            self._reddit = reddit_from_env()
+        return self._reddit
+
+    def _time_filters(self, sort):
+        return self.time_filters if sort in self.RANKED_SORTS else ('all',)
+
+    @property
+    def listings_per_query(self) -> int:
+        """Searches run per query and subreddit (sort x time filter)"""
+        return sum(len(self._time_filters(sort)) for sort in self.sorts)
+
+    def tasks(self):
+        return [(subreddit, phrase, sort, time_filter) for subreddit in self.subreddits
+                for phrase in self.phrases for sort in self.sorts
+                for time_filter in self._time_filters(sort)]
+
+    def fetch(self, task) -> Iterator[PostRecord]:
+        subreddit_name, phrase, sort_method, time_filter = task
+        limit = self.plan.limit_for(phrase, self.limit) if self.plan is not None else self.limit
+        listing = self.reddit.subreddit(subreddit_name).search(phrase, sort=sort_method,
+                                                               time_filter=time_filter, limit=limit)
+        for post in metrics.timed_iter(listing, 'scraper.api_fetch'):
+            if self.plan is not None:
+                self.plan.record(subreddit_name, sort_method, phrase, post.id)
+            yield self.from_submission(post, subreddit_name)
+
+    @staticmethod
+    def from_submission(post, subreddit_name: str) -> PostRecord:
+        return PostRecord(
+            post_id=post.id,
+            source=f'Reddit-{subreddit_name}',
+            title=post.title or '',
+            body=post.selftext or '',
+            url=post.url,
+            created_utc=post.created_utc,
+            author=str(post.author) if getattr(post, 'author', None) else None,
+            metadata={'score': getattr(post, 'score', None), 'num_comments': getattr(post, 'num_comments', None)},
+            raw=post
+        )
+
+
+class _ArticleParser(HTMLParser):
+    """Collects <article> elements (or the whole page) as title/body/url/id"""
+
+    HEADINGS = {'h1', 'h2', 'h3'}
+    SKIP = {'script', 'style', 'nav', 'header', 'footer'}
+
+    def __init__(self):
+        super().__init__()
+        self.articles: List[Dict[str, Any]] = []
+        self.page = {'title': '', 'body': [], 'url': None, 'id': None}
+        self._current = None
+        self._in_heading = False
+        self._in_title = False
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag == 'article':
+            self._current = {'title': '', 'body': [], 'url': attrs.get('data-url'), 'id': attrs.get('id')}
+        elif tag in self.HEADINGS:
+            self._in_heading = True
+        elif tag == 'title':
+            self._in_title = True
+        elif tag == 'a' and self._current is not None and not self._current['url']:
+            self._current['url'] = attrs.get('href')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'article' and self._current is not None:
+            self.articles.append(self._current)
+            self._current = None
+        elif tag in self.HEADINGS:
+            self._in_heading = False
+        elif tag == 'title':
+            self._in_title = False
+
+    def handle_data(self, data):
+        text = data.strip()
+        if not text or self._skip_depth:
+            return
+        if self._in_title:
+            self.page['title'] = self.page['title'] or text
+            return
+        target = self._current if self._current is not None else self.page
+        if self._in_heading and not target['title']:
+            target['title'] = text
+        else:
+            target['body'].append(text)
+
+
+class FileAdapter(SourceAdapter):
+    """
+    Local dumps: .json (a list, or {"posts": [...]}), .jsonl and .html files.
+
+    JSON fields are mapped through `field_map` (record field -> JSON key), so
+    exports from other sites can be ingested without reshaping them first.
+    HTML pages yield one post per <article>, or the whole page otherwise.
+    """
+    name = 'file'
+
+    DEFAULT_FIELD_MAP = {
+        'post_id': 'id', 'title': 'title', 'body': 'body', 'url': 'url',
+        'created_utc': 'created_utc', 'author': 'author'
+    }
+
+    def __init__(self, paths: List[str], source_name: Optional[str] = None,
+                 field_map: Optional[Dict[str, str]] = None):
+        self.paths = paths
+        self.source_name = source_name
+        self.field_map = {**self.DEFAULT_FIELD_MAP, **(field_map or {})}
+
+    def tasks(self):
+        files = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                files.extend(sorted(os.path.join(path, f) for f in os.listdir(path)
+                                    if f.lower().endswith(('.json', '.jsonl', '.html', '.htm'))))
+            else:
+                files.extend(sorted(glob.glob(path)) or [path])
+        return files
+
+    def _source_for(self, path):
+        return self.source_name or f"File-{os.path.splitext(os.path.basename(path))[0]}"
+
+    def fetch(self, path) -> Iterator[PostRecord]:
+        lower = path.lower()
+        if lower.endswith(('.html', '.htm')):
+            yield from self._fetch_html(path)
+        else:
+            yield from self._fetch_json(path, lines=lower.endswith('.jsonl'))
+
+    def _fetch_json(self, path, lines=False):
+        with open(path, encoding='utf-8') as f:
+            if lines:
+                items = [json.loads(line) for line in f if line.strip()]
+            else:
+                data = json.load(f)
+                items = data.get('posts', []) if isinstance(data, dict) else data
+
+        source = self._source_for(path)
+        for position, item in enumerate(items):
+            def get(name, default=None):
+                value = item.get(self.field_map[name], default)
+                return default if value is None else value
+
+            title = str(get('title', ''))
+            body = str(get('body', ''))
+            post_id = str(get('post_id', '') or _content_id(path, position, title))
+            yield PostRecord(
+                post_id=post_id,
+                source=source,
+                title=title,
+                body=body,
+                url=str(get('url', '') or f"file://{os.path.abspath(path)}#{post_id}"),
+                created_utc=_as_timestamp(get('created_utc')),
+                author=get('author'),
+                metadata={k: v for k, v in item.items() if k not in self.field_map.values()},
+                raw=item
+            )
+
+    def _fetch_html(self, path):
+        parser = _ArticleParser()
+        with open(path, encoding='utf-8', errors='replace') as f:
+            parser.feed(f.read())
+
+        articles = parser.articles or [parser.page]
+        source = self._source_for(path)
+        for position, article in enumerate(articles):
+            title = article['title']
+            post_id = article['id'] or _content_id(path, position, title)
+            yield PostRecord(
+                post_id=post_id,
+                source=source,
+                title=title,
+                body=' '.join(article['body']),
+                url=article['url'] or f"file://{os.path.abspath(path)}#{post_id}",
+                created_utc=os.path.getmtime(path)
+            )
+
+
+def _content_id(path, position, title) -> str:
+    return hashlib.sha1(f"{os.path.abspath(path)}|{position}|{title}".encode('utf-8')).hexdigest()[:16]
+
+
+def _as_timestamp(value) -> Optional[float]:
+    """Epoch seconds from an epoch number or an ISO-8601 string"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
@@ -0,0 +1,240 @@
+"""
+Live ingestion from a subreddit stream.
+
+Instead of re-running every search to find what is new, this keeps one
+long-lived `subreddit.stream.submissions` listing open over a multireddit of
+the configured subreddits (e.g. CreditCards+Chase+churning+personalfinance).
+Each new submission goes through the shared acceptance rules (`MasterSink`:
+card and decision attribution, near-duplicates) and accepted posts are
+appended to the master dataset every few seconds.
+
+The last seen post ids are kept in `data/raw/stream_state.json`, so a
+restarted stream skips the backlog PRAW replays on connect; dropped
+connections are retried with backoff. `ReplayReddit` stands in for PRAW by
+replaying saved posts, for testing without API access:
+
+    python src/scrapers/stream_scraper.py
+    python src/scrapers/stream_scraper.py --replay data/raw/freedom_cards_dataset.csv --max-posts 50
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics, configure_logging
+from utils.checkpoint import interruptible
+from scrapers.sources import RedditAdapter, reddit_from_env
+from scrapers.ingest import get_master_file, get_existing_urls, load_near_duplicate_index, MasterSink
+from database.post_store import PostStore
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'data/raw/stream_state.json'
+# Ids remembered for restarts; PRAW replays up to 100 recent posts on connect
+RECENT_IDS = 1000
+MAX_BACKOFF_SECONDS = 300
+# Posts from a slow subreddit in the multireddit can arrive after newer ones;
+# only posts older than this before the newest seen are skipped by timestamp
+SEEN_GRACE_SECONDS = 3600
+
+
+class StreamState:
+    """Recently seen post ids and the newest creation time, persisted between runs"""
+
+    def __init__(self, path: str = STATE_FILE, keep: int = RECENT_IDS):
+        self.path = path
+        self.recent_ids = deque(maxlen=keep)
+        self._recent_set = set()
+        self.last_created_utc: Optional[float] = None
+
+    @classmethod
+    def load(cls, path: str = STATE_FILE, keep: int = RECENT_IDS) -> 'StreamState':
+        state = cls(path, keep)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            for post_id in data.get('recent_ids', []):
+                state._remember(post_id)
+            state.last_created_utc = data.get('last_created_utc')
+        return state
+
+    def _remember(self, post_id: str):
+        if len(self.recent_ids) == self.recent_ids.maxlen:
+            self._recent_set.discard(self.recent_ids[0])
+        self.recent_ids.append(post_id)
+        self._recent_set.add(post_id)
+
+    def seen(self, post_id: str, created_utc: Optional[float]) -> bool:
+        """Already handled in this or an earlier run"""
+        if post_id in self._recent_set:
+            return True
+        # Too old to still be among the remembered ids
+        return (self.last_created_utc is not None and created_utc is not None
+                and created_utc < self.last_created_utc - SEEN_GRACE_SECONDS)
+
+    def mark(self, post_id: str, created_utc: Optional[float]):
+        self._remember(post_id)
+        if created_utc is not None:
+            self.last_created_utc = max(created_utc, self.last_created_utc or created_utc)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'recent_ids': list(self.recent_ids), 'last_created_utc': self.last_created_utc}, f)
+
+
+class ReplayReddit:
+    """
+    PRAW stand-in whose subreddit streams replay saved posts.
+
+    Reads a .jsonl file of submission fields (id, title, selftext, url,
+    created_utc, subreddit) or a master-format CSV (Title, URL, Body,
+    Source). Posts are replayed in creation order; with `pause_after` the
+    stream yields None every `pause_every` posts, like PRAW when a poll
+    brings nothing new, and the stream ends once the posts run out.
+    """
+
+    def __init__(self, path: str, pause_every: int = 25):
+        self.posts = self._load(path)
+        self.pause_every = pause_every
+
+    @staticmethod
+    def _load(path) -> List[SimpleNamespace]:
+        if path.lower().endswith('.jsonl'):
+            with open(path, encoding='utf-8') as f:
+                items = [json.loads(line) for line in f if line.strip()]
+        else:
+            df = pd.read_csv(path)
+            items = [{
+                'id': f"replay{position}",
+                'title': row['Title'],
+                'selftext': row['Body'],
+                'url': row['URL'],
+                'created_utc': pd.Timestamp(row['Scraped_At']).timestamp() if 'Scraped_At' in row else position,
+                'subreddit': str(row.get('Source', '')).removeprefix('Reddit-')
+            } for position, row in enumerate(df.to_dict('records'))]
+
+        posts = []
+        for item in sorted(items, key=lambda item: item.get('created_utc') or 0):
+            posts.append(SimpleNamespace(
+                id=str(item['id']), title=str(item.get('title') or ''), selftext=str(item.get('selftext') or ''),
+                url=item.get('url'), created_utc=item.get('created_utc'), author=item.get('author'),
+                score=item.get('score'), num_comments=item.get('num_comments'),
+                subreddit=SimpleNamespace(display_name=item.get('subreddit', ''))
+            ))
+        return posts
+
+    def subreddit(self, name: str):
+        names = {part.lower() for part in name.split('+')}
+        posts = [post for post in self.posts if post.subreddit.display_name.lower() in names]
+        return SimpleNamespace(stream=SimpleNamespace(
+            submissions=lambda pause_after=None, skip_existing=False: self._stream(posts, pause_after)))
+
+    def _stream(self, posts, pause_after) -> Iterator[Optional[SimpleNamespace]]:
+        for position, post in enumerate(posts, 1):
+            yield post
+            if pause_after is not None and position % self.pause_every == 0:
+                yield None
+
+
+def stream_ingest(reddit, subreddits: List[str], sink: MasterSink, state: StreamState,
+                  flush_seconds: float = 30.0) -> int:
+    """
+    Feed a multireddit stream into the sink until stopped, full, or the stream ends.
+
+    Accepted rows and the stream state are flushed every `flush_seconds`
+    and on exit (including Ctrl-C). Returns the number of posts accepted.
+    """
+    multireddit = '+'.join(subreddits)
+    backoff = 1
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal last_flush
+        written = sink.flush()
+        # Persist the state only with the rows it covers
+        state.save()
+        last_flush = time.monotonic()
+        if written:
+            logger.info(f"Flushed {written} rows ({sink.new_posts} posts accepted so far)")
+
+    with interruptible() as stop:
+        while not stop and not sink.full():
+            try:
+                # pause_after=0 hands control back (None) after every empty poll
+                for post in reddit.subreddit(multireddit).stream.submissions(pause_after=0):
+                    if post is not None:
+                        backoff = 1
+                        metrics.incr('stream.submissions')
+                        if state.seen(post.id, post.created_utc):
+                            metrics.incr('stream.skipped_seen')
+                        else:
+                            state.mark(post.id, post.created_utc)
+                            record = RedditAdapter.from_submission(post, post.subreddit.display_name)
+                            if sink.accept(record):
+                                metrics.incr('stream.accepted')
+                    if time.monotonic() - last_flush >= flush_seconds:
+                        flush()
+                    if stop or sink.full():
+                        break
+                else:
+                    # Only a replay runs out
+                    break
+            except Exception as e:
+                metrics.incr('stream.reconnects')
+                logger.warning(f"Stream error, reconnecting in {backoff}s: {e}")
+                flush()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+        flush()
+    return sink.new_posts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Continuously ingest new posts from a subreddit stream")
+    parser.add_argument('--config', default='scraper_config.json', help="Scraper config with the subreddits to stream")
+    parser.add_argument('--subreddits', default=None, help="Override, e.g. CreditCards+Chase")
+    parser.add_argument('--replay', default=None, help="Replay posts from a .jsonl or master-format .csv instead of Reddit")
+    parser.add_argument('--max-posts', type=int, default=0, help="Stop after this many accepted posts (0 runs until Ctrl-C)")
+    parser.add_argument('--flush-seconds', type=float, default=30, help="Seconds between writes to the master file")
+    parser.add_argument('--state-file', default=STATE_FILE, help="Where the last seen post ids are kept")
+    parser.add_argument('--dedupe-threshold', type=float, default=0.7, help="Estimated Jaccard similarity above which posts are near-duplicates")
+    parser.add_argument('--log-level', default='INFO', help="Logging level")
+    parser.add_argument('--metrics-out', default=None, help="Path for the JSON run summary")
+    args = parser.parse_args(argv)
+
+    configure_logging(args.log_level)
+    if args.subreddits:
+        subreddits = args.subreddits.split('+')
+    else:
+        with open(args.config) as f:
+            subreddits = json.load(f)['subreddits']
+
+    reddit = ReplayReddit(args.replay) if args.replay else reddit_from_env()
+    master_file = get_master_file()
+    sink = MasterSink(master_file, get_existing_urls(master_file),
+                      load_near_duplicate_index(master_file, args.dedupe_threshold),
+                      max_new_posts=args.max_posts or math.inf, max_age_days=None, store=PostStore())
+    state = StreamState.load(args.state_file)
+
+    print(f"Streaming r/{'+'.join(subreddits)}{' (replay)' if args.replay else ''}... Ctrl-C to stop")
+    with metrics.timer('stream.total'):
+        accepted = stream_ingest(reddit, subreddits, sink, state, args.flush_seconds)
+
+    print(f"\nStream stopped. {accepted} new posts added.")
+    print(f"Near-duplicates skipped: {sink.near_duplicate_count}")
+    print(f"Run summary saved to: {metrics.write_summary('stream', args.metrics_out)}")
+
+
+if __name__ == '__main__':
+    main()
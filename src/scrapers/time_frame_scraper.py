@@ -1,142 +1,98 @@
-import praw
-import csv
-import pandas as pd
-from dotenv import load_dotenv
+"""
+Continuous search-yield tracker across Reddit time filters.
+
+Originally a one-off test of which time filter ('day' ... 'all') turns up
+data for a single phrase. It now runs every configured search across every
+time filter on an interval, adds accepted posts to the master dataset, and
+records per (subreddit, query, sort, time filter) API calls, posts
+returned, new unique posts and accepted posts in the yield tracker. Each
+run orders searches by recent yield and skips the unproductive ones, so the
+API budget goes where new data actually appears.
+
+    python src/scrapers/time_frame_scraper.py                 # every 60 minutes until Ctrl-C
+    python src/scrapers/time_frame_scraper.py --runs 1 --report-top 20
+"""
+
+import argparse
+import json
+import logging
 import os
-from datetime import datetime
-
-def scrape_time_frame_test():
-    """Test different Reddit time frames to find best data"""
-    
-    # Load environment variables
-    load_dotenv()
-
-    client_id = os.getenv('REDDIT_APP_ID')
-    client_secret = os.getenv('REDDIT_APP_SECRET')
-    user_agent = os.getenv('REDDIT_APP_NAME')
-
-    reddit = praw.Reddit(client_id=client_id,
-                         client_secret=client_secret,
-                         user_agent=user_agent)
-
-    # Test subreddit
-    subreddit_name = 'CreditCards'
-    subreddit = reddit.subreddit(subreddit_name)
-
-    # Test search phrase
-    test_phrase = 'Freedom Unlimited approved'
-    
-    # Reddit time frames to test
-    time_frames = [
-        ('day', 'day'),
-        ('week', 'week'), 
-        ('month', 'month'),
-        ('year', 'year'),
-        ('all', 'all')
-    ]
-
-    # Create output directory
-    os.makedirs('data/raw', exist_ok=True)
-    
-    # Use fixed filename
-    filename = 'data/raw/time_frame_test.csv'
-
-    with open(filename, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Time_Frame', 'Title', 'URL', 'Body', 'Source', 'Card_Name', 'Scraped_At'])
-
-        total_posts = 0
-        
-        for time_name, time_param in time_frames:
-            print(f"\nTesting time frame: {time_name}")
-            
-            try:
-                # Search with specific time frame
-                for post in subreddit.search(test_phrase, sort='top', time_filter=time_param, limit=50):
-                    title_lower = post.title.lower()
-                    body_lower = post.selftext.lower()
-                    combined_text = f"{title_lower} {body_lower}"
-
-                    # Card detection logic
-                    card_detected = None
-                    
-                    # Check for Freedom Unlimited variations
-                    freedom_unlimited_terms = [
-                        'freedom unlimited', 'cfu', 'chase freedom unlimited',
-                        'freedom unlimited card', 'cfu card'
-                    ]
-                    
-                    # Check for Freedom Flex variations  
-                    freedom_flex_terms = [
-                        'freedom flex', 'cff', 'chase freedom flex',
-                        'freedom flex card', 'cff card'
-                    ]
-                    
-                    # Check for Freedom cards (exclude premium cards)
-                    premium_exclusions = ['sapphire', 'preferred', 'reserve', 'csr', 'csp', 'ink', 'business']
-                    
-                    if not any(exclusion in combined_text for exclusion in premium_exclusions):
-                        # Check Freedom Unlimited first
-                        if any(term in combined_text for term in freedom_unlimited_terms):
-                            card_detected = 'Freedom Unlimited'
-                        # Check Freedom Flex if Unlimited not found
-                        elif any(term in combined_text for term in freedom_flex_terms):
-                            card_detected = 'Freedom Flex'
-                        # Check generic Freedom only if no specific card mentioned
-                        elif 'freedom' in combined_text:
-                            if not any(term in combined_text for term in freedom_unlimited_terms + freedom_flex_terms):
-                                card_detected = 'Freedom (Generic)'
-
-                    # Outcome detection
-                    outcome_keywords = [
-                        'approved', 'denied', 'preapproved', 'pre-approval', 'pre approval',
-                        'rejected', 'rejection', 'got approved', 'got denied',
-                        'instant approval', 'application approved', 'application denied'
-                    ]
-
-                    # Quality check
-                    relevant = False
-                    if card_detected:
-                        if any(kw in combined_text for kw in outcome_keywords):
-                            if len(post.selftext) > 50 or any(kw in title_lower for kw in outcome_keywords):
-                                relevant = True
-
-                    if relevant and card_detected:
-                        writer.writerow([
-                            time_name,
-                            post.title, 
-                            post.url, 
-                            post.selftext,
-                            f'Reddit-{subreddit_name}',
-                            card_detected,
-                            datetime.now().isoformat()
-                        ])
-                        total_posts += 1
-                        print(f"  Found: {post.title[:60]}... ({card_detected})")
-            
-            except Exception as e:
-                print(f"  Error with {time_name}: {e}")
-                continue
-
-    print(f"\nTime frame test completed!")
-    print(f"Total posts found: {total_posts}")
-    print(f"Results saved to: {filename}")
-    
-    # Analyze results by time frame
-    if total_posts > 0:
-        df = pd.read_csv(filename)
-        print(f"\nPosts by time frame:")
-        print(df['Time_Frame'].value_counts())
-    
-    return filename
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import metrics, configure_logging
+from scrapers.sources import RedditAdapter
+from scrapers.query_planner import plan_queries
+from scrapers.yield_tracker import YieldTracker, MIN_YIELD
+from database.post_store import PostStore
+from scrapers.ingest import (
+    get_master_file, get_existing_urls, load_near_duplicate_index, MasterSink, IngestScheduler
+)
+
+logger = logging.getLogger(__name__)
+
+# Reddit time frames, narrowest first
+TIME_FILTERS = ('day', 'week', 'month', 'year', 'all')
+
+
+def track_once(config, args, tracker, reddit=None):
+    """One pass over all searches; returns the number of new posts added"""
+    master_file = get_master_file()
+    sink = MasterSink(master_file, get_existing_urls(master_file),
+                      load_near_duplicate_index(master_file, args.dedupe_threshold),
+                      max_new_posts=args.max_posts, max_age_days=args.max_age_days or None,
+                      store=PostStore())
+
+    plan = None if args.no_query_plan else plan_queries(config['search_phrases'])
+    source = RedditAdapter(config['subreddits'], config['search_phrases'], reddit=reddit, plan=plan,
+                           sorts=('new', 'top'), time_filters=TIME_FILTERS)
+
+    tracker.start_run(sink.existing_urls)
+    with metrics.timer('yield.run'):
+        IngestScheduler([source], args.threads, tracker).run(sink.accept, should_stop=sink.full)
+    sink.flush()
+    tracker.save()
+    return sink.new_posts
+
 
 def main():
-    """Main function to run the time frame test"""
-    print("Testing different Reddit time frames for Freedom card data...")
-    print("Searching: 'Freedom Unlimited approved' in r/CreditCards")
-    print("Testing: day, week, month, year, all")
-    filename = scrape_time_frame_test()
-    print(f"Time frame test completed. Data saved to: {filename}")
+    parser = argparse.ArgumentParser(description="Continuously track which searches and time filters yield new posts")
+    parser.add_argument('--config', default='scraper_config.json', help="Scraper config with subreddits and search_phrases")
+    parser.add_argument('--interval', type=float, default=60, help="Minutes between runs")
+    parser.add_argument('--runs', type=int, default=0, help="Stop after this many runs (0 runs until Ctrl-C)")
+    parser.add_argument('--max-posts', type=int, default=500, help="Max new posts per run")
+    # 'year' and 'all' searches reach far back; old posts stay out of the master dataset like in ingest
+    parser.add_argument('--max-age-days', type=int, default=180, help="Skip posts older than this (0 disables)")
+    parser.add_argument('--threads', type=int, default=4, help="Concurrent searches")
+    parser.add_argument('--min-yield', type=float, default=MIN_YIELD, help="Accepted posts per API call below which a search is pruned")
+    parser.add_argument('--no-query-plan', action='store_true', help="Search every phrase separately instead of merged OR queries")
+    parser.add_argument('--dedupe-threshold', type=float, default=0.7, help="Estimated Jaccard similarity above which posts are near-duplicates")
+    parser.add_argument('--report-top', type=int, default=10, help="Searches listed in the yield report")
+    parser.add_argument('--log-level', default='INFO', help="Logging level")
+    args = parser.parse_args()
+
+    configure_logging(args.log_level)
+    with open(args.config) as f:
+        config = json.load(f)
+
+    tracker = YieldTracker.load(min_yield=args.min_yield)
+    completed = 0
+    try:
+        while True:
+            added = track_once(config, args, tracker)
+            completed += 1
+            print(f"\nRun {tracker.runs}: {added} new posts added")
+            tracker.print_report(args.report_top)
+            if args.runs and completed >= args.runs:
+                break
+            time.sleep(args.interval * 60)
+    except KeyboardInterrupt:
+        print("\nStopping yield tracker")
+    finally:
+        tracker.save()
+    print(f"Run summary saved to: {metrics.write_summary('yield_tracker')}")
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
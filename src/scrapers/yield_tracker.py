@@ -0,0 +1,169 @@
+"""
+Per-search yield analytics and pruning.
+
+Every search task (subreddit, query, sort, time filter) accumulates API
+calls, posts returned, new unique posts and accepted posts across runs in
+`data/metrics/search_yield.json`. The marginal yield of a task is an EWMA of
+accepted posts per API call over its recent runs. `plan` orders tasks so
+the best yielders run first (the scheduler stops once the post budget is
+full) and drops tasks whose yield stays below a threshold, re-probing each
+dropped task every few runs in case new data starts to appear there.
+"""
+
+import json
+import math
+import os
+import zlib
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.metrics import metrics
+
+YIELD_FILE = 'data/metrics/search_yield.json'
+
+# Results per listing page; one API call each
+PAGE_SIZE = 100
+
+# Accepted posts per API call below which a task is pruned
+MIN_YIELD = 0.05
+# Runs a task gets before it can be pruned
+MIN_RUNS = 3
+# Pruned tasks are re-probed once every this many runs
+REPROBE_EVERY = 5
+# Weight of the latest run in the marginal yield
+YIELD_ALPHA = 0.3
+
+
+@dataclass
+class TaskStats:
+    calls: int = 0
+    returned: int = 0
+    new_unique: int = 0
+    accepted: int = 0
+    runs: int = 0
+    marginal_yield: Optional[float] = None
+    last_run: Optional[str] = None
+
+    @property
+    def lifetime_yield(self) -> float:
+        return self.accepted / self.calls if self.calls else 0.0
+
+
+def task_key(task) -> str:
+    return '|'.join(str(part) for part in task)
+
+
+class YieldTracker:
+    """Persistent per-task yield stats, updated from the ingestion scheduler"""
+
+    def __init__(self, path: str = YIELD_FILE, min_yield: float = MIN_YIELD,
+                 min_runs: int = MIN_RUNS, reprobe_every: int = REPROBE_EVERY):
+        self.path = path
+        self.min_yield = min_yield
+        self.min_runs = min_runs
+        self.reprobe_every = reprobe_every
+        self.stats: Dict[str, TaskStats] = {}
+        self.runs = 0
+        self._lock = Lock()
+        self._known_urls: Set[str] = set()
+        self._seen_this_run: Set[str] = set()
+        self._current: Dict[str, TaskStats] = {}
+
+    @classmethod
+    def load(cls, path: str = YIELD_FILE, **kwargs) -> 'YieldTracker':
+        tracker = cls(path, **kwargs)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            tracker.runs = data.get('runs', 0)
+            tracker.stats = {key: TaskStats(**stats) for key, stats in data.get('tasks', {}).items()}
+        return tracker
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock:
+            data = {'runs': self.runs, 'tasks': {key: asdict(stats) for key, stats in self.stats.items()}}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    def start_run(self, known_urls: Iterable[str] = ()):
+        """Begin a run; posts with these URLs don't count as new"""
+        with self._lock:
+            self.runs += 1
+            self._known_urls = set(known_urls)
+            self._seen_this_run = set()
+            self._current = {}
+
+    def _is_pruned(self, key: str) -> bool:
+        stats = self.stats.get(key)
+        if stats is None or stats.runs < self.min_runs or stats.marginal_yield is None:
+            return False
+        if stats.marginal_yield >= self.min_yield:
+            return False
+        # Spread re-probes over runs instead of retrying every pruned task together
+        return (self.runs + zlib.crc32(key.encode('utf-8'))) % self.reprobe_every != 0
+
+    def expected_yield(self, key: str) -> float:
+        stats = self.stats.get(key)
+        # Unseen tasks go first so they get measured
+        if stats is None or stats.marginal_yield is None:
+            return math.inf
+        return stats.marginal_yield
+
+    def plan(self, tasks: List[Tuple]) -> List[Tuple]:
+        """Tasks to run this run, best expected yield first; pruned tasks left out"""
+        kept = [task for task in tasks if not self._is_pruned(task_key(task))]
+        metrics.set_gauge('yield.tasks_planned', len(kept))
+        metrics.set_gauge('yield.tasks_pruned', len(tasks) - len(kept))
+        return sorted(kept, key=lambda task: -self.expected_yield(task_key(task)))
+
+    def observe(self, task, url: str, post_id: str, accepted: bool):
+        """One record returned by a task, and whether the sink accepted it"""
+        key = task_key(task)
+        with self._lock:
+            current = self._current.setdefault(key, TaskStats())
+            current.returned += 1
+            if url not in self._known_urls and post_id not in self._seen_this_run:
+                current.new_unique += 1
+            self._seen_this_run.add(post_id)
+            if accepted:
+                current.accepted += 1
+
+    def finish_task(self, task):
+        """Fold a finished task's counts into its stats; one call per started page"""
+        key = task_key(task)
+        with self._lock:
+            current = self._current.pop(key, TaskStats())
+            current.calls = max(1, math.ceil(current.returned / PAGE_SIZE))
+            stats = self.stats.setdefault(key, TaskStats())
+            stats.calls += current.calls
+            stats.returned += current.returned
+            stats.new_unique += current.new_unique
+            stats.accepted += current.accepted
+            stats.runs += 1
+            stats.last_run = datetime.now().isoformat()
+            run_yield = current.accepted / current.calls
+            stats.marginal_yield = run_yield if stats.marginal_yield is None else round(
+                stats.marginal_yield + YIELD_ALPHA * (run_yield - stats.marginal_yield), 4)
+        metrics.incr('yield.api_calls', current.calls)
+        metrics.incr('yield.new_unique', current.new_unique)
+
+    def abandon_task(self, task):
+        """Discard the counts of a task that was cut off before it finished; it isn't scored this run"""
+        with self._lock:
+            self._current.pop(task_key(task), None)
+        metrics.incr('yield.tasks_cut_off')
+
+    def report(self, top: int = 10) -> List[Tuple[str, TaskStats]]:
+        """Tasks by marginal yield, best first"""
+        ranked = sorted(self.stats.items(), key=lambda item: -(item[1].marginal_yield or 0))
+        return ranked[:top] if top else ranked
+
+    def print_report(self, top: int = 10):
+        pruned = sum(1 for key in self.stats if self._is_pruned(key))
+        print(f"Search yield ({len(self.stats)} tasks tracked over {self.runs} runs, {pruned} currently pruned):")
+        for key, stats in self.report(top):
+            print(f"- {key}: {stats.marginal_yield or 0:.2f} accepted/call recently, "
+                  f"{stats.accepted} accepted / {stats.new_unique} new / {stats.returned} returned in {stats.calls} calls")
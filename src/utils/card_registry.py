@@ -0,0 +1,183 @@
+"""
+Card and issuer registry compiled into a single token automaton.
+
+Cards, their aliases/abbreviations and issuers live in `cards_config.json`.
+All aliases are compiled into one token trie, so a post is scanned once,
+left to right, taking the longest alias at each position; the cost depends
+on the post length (and the longest alias), not on how many cards are
+registered. Detection returns every card mentioned, so an outcome can be
+attributed to more than one card instead of the post being dropped.
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+CARD_REGISTRY_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'cards_config.json')
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_TERMINAL = '$'
+
+
+@dataclass
+class Card:
+    name: str
+    issuer: str
+    family: str
+    aliases: List[str] = field(default_factory=list)
+    tracked: bool = False
+    generic: bool = False
+
+
+@dataclass
+class Mention:
+    """A card or issuer alias found in a post, as token positions [start, end)"""
+    kind: str
+    name: str
+    start: int
+    end: int
+    card: Optional[Card] = None
+
+
+def tokenize(text) -> List[str]:
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class CardRegistry:
+    """Registered cards and issuers plus the compiled alias trie"""
+
+    def __init__(self, cards: List[Card], issuers: Dict[str, List[str]]):
+        self.cards = {card.name: card for card in cards}
+        self.issuers = issuers
+        # Content hash of the config it was loaded from; part of the labeling rule version
+        self.digest = ''
+        self._trie: Dict = {}
+        self.max_alias_tokens = 0
+
+        for card in cards:
+            for alias in card.aliases:
+                self._insert(alias, ('card', card.name))
+        for issuer, aliases in issuers.items():
+            for alias in aliases:
+                self._insert(alias, ('issuer', issuer))
+
+    @classmethod
+    def load(cls, path: str = CARD_REGISTRY_FILE) -> 'CardRegistry':
+        with open(path, 'rb') as f:
+            content = f.read()
+        config = json.loads(content)
+        cards = [Card(**card) for card in config['cards']]
+        issuers = {issuer['name']: issuer['aliases'] for issuer in config.get('issuers', [])}
+        registry = cls(cards, issuers)
+        registry.digest = hashlib.sha1(content).hexdigest()
+        return registry
+
+    def _insert(self, alias: str, entry):
+        tokens = tokenize(alias)
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # A card alias wins over an issuer alias with the same spelling
+        if _TERMINAL not in node or entry[0] == 'card':
+            node[_TERMINAL] = entry
+        self.max_alias_tokens = max(self.max_alias_tokens, len(tokens))
+
+    @property
+    def tracked_cards(self) -> List[str]:
+        return [name for name, card in self.cards.items() if card.tracked]
+
+    def scan_tokens(self, tokens: List[str]) -> List[Mention]:
+        """Longest non-overlapping alias matches, in order of appearance"""
+        mentions = []
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            match = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _TERMINAL in node:
+                    match = (node[_TERMINAL], j)
+
+            if match is None:
+                i += 1
+                continue
+
+            (kind, name), end = match
+            mentions.append(Mention(kind, name, i, end, self.cards.get(name) if kind == 'card' else None))
+            i = end
+        return mentions
+
+    def scan(self, text) -> List[Mention]:
+        return self.scan_tokens(tokenize(text))
+
+    def fold_generic(self, mentions: List[Mention]) -> List[Mention]:
+        """
+        Mentions with each generic card mention (e.g. 'my freedom') credited to
+        the nearest specific card of the same family, when one is mentioned.
+
+        Generic mentions stay generic when the post names no specific card of
+        their family.
+        """
+        specific = [m for m in mentions if m.kind == 'card' and not m.card.generic]
+        folded = []
+        for mention in mentions:
+            if mention.kind == 'card' and mention.card.generic:
+                same_family = [m for m in specific if m.card.family == mention.card.family]
+                if same_family:
+                    nearest = min(same_family, key=lambda m: abs(m.start - mention.start))
+                    mention = Mention('card', nearest.name, mention.start, mention.end, nearest.card)
+            folded.append(mention)
+        return folded
+
+    def cards_in(self, mentions: List[Mention], tracked_only: bool = True) -> List[str]:
+        """
+        Distinct cards from a scan, in order of first mention.
+
+        A generic entry (e.g. 'Freedom (Generic)') is only reported when no
+        specific card of the same family is mentioned.
+        """
+        names = []
+        for mention in self.fold_generic(mentions):
+            if mention.kind == 'card' and mention.name not in names:
+                if not tracked_only or mention.card.tracked:
+                    names.append(mention.name)
+        return names
+
+    def detect_cards(self, text, tracked_only: bool = True) -> List[str]:
+        """Cards mentioned in a post (tracked cards only by default)"""
+        return self.cards_in(self.scan(text), tracked_only)
+
+    def issuers_in(self, text) -> List[str]:
+        """Issuers mentioned directly or through one of their cards"""
+        issuers = []
+        for mention in self.scan(text):
+            issuer = mention.card.issuer if mention.card else mention.name
+            if issuer not in issuers:
+                issuers.append(issuer)
+        return issuers
+
+    def mentions_card(self, text, card_name: str) -> bool:
+        """Whether the specific card (not only its generic family) is mentioned"""
+        return any(mention.name == card_name for mention in self.scan(text))
+
+
+_default_registry: Optional[CardRegistry] = None
+
+
+def get_registry() -> CardRegistry:
+    """The registry loaded from cards_config.json (cached)"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = CardRegistry.load()
+    return _default_registry
+
+
+def detect_cards(text, tracked_only: bool = True) -> List[str]:
+    return get_registry().detect_cards(text, tracked_only)
@@ -0,0 +1,161 @@
+"""
+Append-only checkpoints for long-running LLM passes.
+
+Completed rows are appended to a JSONL sidecar as {"id": ..., "values": {...}}
+every few rows, so a multi-hour run that dies part way keeps its finished
+work. With resume enabled, rows whose id is already in the sidecar are
+restored from it instead of being sent to the LLM again. `interruptible`
+turns the first Ctrl-C into a graceful stop: the current row finishes, the
+checkpoint is flushed, and the pass raises RunInterrupted instead of writing
+an incomplete output file.
+"""
+
+import json
+import logging
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = 'data/processed/checkpoints'
+
+
+def checkpoint_path(run_name: str, input_file: str) -> str:
+    """Stable sidecar path for a pass over an input file"""
+    base = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(CHECKPOINT_DIR, f'{run_name}_{base}.jsonl')
+
+
+def row_key(row) -> str:
+    """Post id used in checkpoints: URL, plus the card for one-row-per-card datasets"""
+    key = str(row.get('URL'))
+    card = row.get('Card_Name')
+    return f"{key}|{card}" if card is not None and card == card else key
+
+
+class Checkpoint:
+    """Buffered, thread-safe JSONL sidecar of completed rows"""
+
+    def __init__(self, path: str, resume: bool = False, flush_every: int = 20):
+        self.path = path
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self.completed: Dict[str, Dict[str, Any]] = {}
+
+        if resume:
+            self.completed = self._load()
+            if self.completed:
+                print(f"Resuming: {len(self.completed)} completed rows found in {path}")
+        elif os.path.exists(path):
+            # A fresh run must not pick up stale rows later
+            os.remove(path)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be torn if the process was killed mid-write
+                    continue
+                completed[entry['id']] = entry['values']
+        return completed
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.completed
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.completed.get(key)
+
+    def record(self, key: str, values: Dict[str, Any]):
+        """Mark a row complete; written to disk every `flush_every` rows"""
+        line = json.dumps({'id': key, 'values': values}, default=str)
+        with self._lock:
+            self.completed[key] = values
+            self._buffer.append(line)
+            should_flush = len(self._buffer) >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        metrics.incr('checkpoint.rows_flushed', len(lines))
+
+    def complete(self):
+        """The pass finished and its output is saved; the sidecar is no longer needed"""
+        with self._lock:
+            self._buffer = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class RunInterrupted(Exception):
+    """A pass stopped early on Ctrl-C; completed rows are in the checkpoint"""
+
+
+class StopRequest:
+    """Set by the SIGINT handler; checked by the processing loop between rows"""
+
+    def __init__(self):
+        self.requested = False
+
+    def __bool__(self):
+        return self.requested
+
+    def check(self):
+        """Raise RunInterrupted if a stop was requested"""
+        if self.requested:
+            raise RunInterrupted("Interrupted; rerun with --resume to continue")
+
+
+@contextmanager
+def interruptible(checkpoint: Optional[Checkpoint] = None):
+    """
+    Graceful Ctrl-C for a processing loop.
+
+    Yields a StopRequest that becomes true on the first SIGINT; the loop
+    should stop submitting work, keep the results already in flight, and
+    then call `check`. A second SIGINT raises
+    KeyboardInterrupt as usual. The checkpoint is flushed on the way out
+    either way.
+    """
+    stop = StopRequest()
+    previous = None
+
+    def handle(signum, frame):
+        if stop.requested:
+            raise KeyboardInterrupt
+        stop.requested = True
+        print("\nInterrupt received - finishing in-flight requests and saving progress (Ctrl-C again to abort)...")
+
+    # Signal handlers can only be installed from the main thread
+    if threading.current_thread() is threading.main_thread():
+        previous = signal.signal(signal.SIGINT, handle)
+    try:
+        yield stop
+    finally:
+        if previous is not None:
+            signal.signal(signal.SIGINT, previous)
+        if checkpoint is not None:
+            checkpoint.flush()
+            if stop:
+                print(f"Progress saved to {checkpoint.path}; rerun with --resume to continue")
@@ -0,0 +1,342 @@
+"""
+Shared client for the local Ollama server.
+
+Every stage that talks to `/api/generate` should go through `OllamaClient`
+so timeouts, retries, latency metrics and concurrency are handled in one
+place. `ModelCascade` layers small-to-large model escalation on top of it.
+
+Calls from every client in the process share one AIMD concurrency limiter,
+so loops can submit work through `adaptive_map` instead of sleeping between
+calls: the number of requests in flight grows while latency stays flat and
+backs off when the server starts queueing or failing.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = "http://localhost:11434"
+
+# Small fast model first; only uncertain answers reach the large one
+DEFAULT_CASCADE = "phi3:mini,mistral"
+
+# Upper bound for concurrent /api/generate calls; match OLLAMA_NUM_PARALLEL on big boxes
+MAX_CONCURRENCY = int(os.getenv('OLLAMA_MAX_CONCURRENCY', '8'))
+
+
+class LLMClientError(Exception):
+    """Raised when the LLM server can't produce a response after retries"""
+    pass
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on concurrent LLM calls.
+
+    Latency is measured per generated token when the server reports a token
+    count, since raw latency mostly tracks answer length. Each successful
+    call updates a latency EWMA; the baseline is the lowest
+    that EWMA has been, creeping slowly upwards so a change of model or
+    prompt mix is eventually accepted. While recent latency stays within
+    `tolerance` of the baseline (latency is flat), the limit grows by one per
+    limit-worth of successes; when it rises above that, the limit is
+    multiplied by `backoff`, and by `error_backoff` on a failed call.
+
+    Cuts happen at most once per recent call duration (an EWMA of raw,
+    not per-token, latency), so one burst of slow responses counts once.
+    """
+
+    def __init__(self, initial: int = 1, min_limit: int = 1, max_limit: int = MAX_CONCURRENCY,
+                 tolerance: float = 1.5, backoff: float = 0.7, error_backoff: float = 0.5):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.error_backoff = error_backoff
+
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.reset(initial)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def reset(self, initial: int = 1):
+        """
+        Start over from `initial` concurrent calls, forgetting measured latency.
+
+        Callers that know how much parallelism they want (e.g. verification's
+        `max_concurrent_batches`) seed the shared limiter with it instead of
+        ramping up from one call.
+        """
+        with self._condition:
+            self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+            self._recent: Optional[float] = None
+            self._baseline: Optional[float] = None
+            # Raw call duration; the window between cuts
+            self._recent_seconds: Optional[float] = None
+            self._last_cut = 0.0
+            self._publish()
+            self._condition.notify_all()
+
+    def _publish(self):
+        metrics.set_gauge('llm.concurrency.limit', self.limit)
+        metrics.set_gauge('llm.concurrency.in_flight', self._in_flight)
+        if self._recent is not None:
+            metrics.set_gauge('llm.concurrency.latency_recent_seconds', round(self._recent, 4))
+            metrics.set_gauge('llm.concurrency.latency_baseline_seconds', round(self._baseline, 4))
+
+    @contextmanager
+    def slot(self):
+        """Hold one in-flight slot for the duration of a call"""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            self._publish()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._publish()
+                self._condition.notify_all()
+
+    def _cut(self, factor: float):
+        # Called with the condition held
+        now = time.monotonic()
+        if self._recent_seconds is not None and now - self._last_cut < self._recent_seconds:
+            return
+        self._last_cut = now
+        self._limit = max(self.min_limit, self._limit * factor)
+        metrics.incr('llm.concurrency.decreases')
+
+    def on_success(self, latency: float, tokens: Optional[int] = None):
+        seconds = latency
+        if tokens:
+            latency /= tokens
+        with self._condition:
+            if self._recent_seconds is None:
+                self._recent_seconds = seconds
+            else:
+                self._recent_seconds += 0.3 * (seconds - self._recent_seconds)
+            if self._recent is None:
+                self._recent = self._baseline = latency
+            else:
+                self._recent += 0.3 * (latency - self._recent)
+                self._baseline = min(self._recent, self._baseline + 0.005 * (self._recent - self._baseline))
+
+            if self._recent > self._baseline * self.tolerance:
+                self._cut(self.backoff)
+            elif self._limit < self.max_limit:
+                before = self.limit
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                if self.limit > before:
+                    metrics.incr('llm.concurrency.increases')
+            self._publish()
+            self._condition.notify_all()
+
+    def on_error(self):
+        with self._condition:
+            self._cut(self.error_backoff)
+            self._publish()
+
+
+# Shared by every OllamaClient in the process
+concurrency_limiter = AdaptiveConcurrencyLimiter()
+
+
+def adaptive_map(fn: Callable[[Any], Any], items: Iterable[Any], max_workers: Optional[int] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[Any, Any]]:
+    """
+    Yield (item, fn(item)) in input order, running calls on worker threads.
+
+    Up to `max_workers` calls are submitted ahead of the consumer; how many
+    actually hit the server at once is decided by the shared limiter. Once
+    `should_stop()` is true no new calls are submitted, queued ones are
+    cancelled, and calls already running are still yielded so their results
+    aren't lost.
+    """
+    max_workers = max_workers or concurrency_limiter.max_limit
+    should_stop = should_stop or (lambda: False)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+
+    def next_result():
+        while pending:
+            item, future = pending.popleft()
+            if should_stop() and future.cancel():
+                continue
+            return item, future.result()
+        return None
+
+    try:
+        for item in items:
+            if should_stop():
+                break
+            pending.append((item, executor.submit(fn, item)))
+            if len(pending) > max_workers:
+                result = next_result()
+                if result is not None:
+                    yield result
+        while pending:
+            result = next_result()
+            if result is not None:
+                yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class OllamaClient:
+    """Minimal Ollama `/api/generate` client with timeouts and retries"""
+
+    def __init__(self, model: str = "mistral", base_url: str = OLLAMA_URL,
+                 timeout_seconds: float = 30, max_retries: int = 3,
+                 options: Optional[Dict[str, Any]] = None):
+        self.model = model
+        self.base_url = base_url.rstrip('/')
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.options = options or {"temperature": 0.1}
+        # One pooled HTTP session per client keeps connections alive across calls
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=max(10, MAX_CONCURRENCY)))
+        self.limiter = concurrency_limiter
+
+    def is_available(self) -> bool:
+        """Check whether the Ollama server is reachable"""
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def generate(self, prompt: str, model: Optional[str] = None, **options) -> str:
+        """Return the model's response text for a prompt"""
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {**self.options, **options}
+        }
+
+        last_error = None
+        for attempt in range(1, self.max_retries + 1):
+            metrics.incr('llm.calls')
+            start = time.perf_counter()
+            try:
+                with self.limiter.slot():
+                    start = time.perf_counter()
+                    response = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                                 timeout=self.timeout_seconds)
+                    latency = time.perf_counter() - start
+                metrics.observe('llm.latency_seconds', latency)
+                if response.status_code == 200:
+                    body = response.json()
+                    self.limiter.on_success(latency, body.get("eval_count"))
+                    return body["response"]
+                last_error = LLMClientError(f"Ollama API error: {response.status_code}")
+            except (requests.RequestException, ValueError, KeyError) as e:
+                metrics.observe('llm.latency_seconds', time.perf_counter() - start)
+                last_error = e
+
+            metrics.incr('llm.errors')
+            self.limiter.on_error()
+            logger.warning(f"LLM call failed (attempt {attempt}/{self.max_retries}): {last_error}")
+            if attempt < self.max_retries:
+                time.sleep(min(2 ** (attempt - 1), 8))
+
+        raise LLMClientError(f"LLM call failed after {self.max_retries} attempts: {last_error}")
+
+
+class ModelCascade:
+    """
+    Try models from smallest to largest, escalating only when needed.
+
+    Each tier's response is parsed by the caller's `parse` function and kept
+    if `accept(result)` is true; otherwise the next (larger) model is asked.
+    A tier whose call fails (after the client's retries) or whose answer
+    can't be parsed escalates too. The last tier's answer is always kept,
+    and its errors propagate. Calls, errors, escalations and latency are
+    recorded per tier as `cascade.<model>.*` metrics.
+    """
+
+    def __init__(self, models: List[str], client: Optional[OllamaClient] = None):
+        if not models:
+            raise ValueError("ModelCascade needs at least one model")
+        self.models = list(models)
+        self.client = client or OllamaClient(model=self.models[-1])
+
+    def run(self, prompt: str, parse: Callable[[str], Any],
+            accept: Callable[[Any], bool], **options) -> Tuple[Any, str]:
+        """Return (parsed result, model that produced it)"""
+        for tier, model in enumerate(self.models):
+            last_tier = tier == len(self.models) - 1
+            metrics.incr(f'cascade.{model}.calls')
+            start = time.perf_counter()
+            try:
+                result = parse(self.client.generate(prompt, model=model, **options))
+            except (LLMClientError, ValueError, KeyError, TypeError) as e:
+                # Model missing, server errors or unparseable output: let a larger model try
+                metrics.incr(f'cascade.{model}.errors')
+                if last_tier:
+                    raise
+                logger.warning(f"{model} failed ({e}); escalating to {self.models[tier + 1]}")
+                metrics.incr(f'cascade.{model}.escalations')
+                continue
+            finally:
+                metrics.observe(f'cascade.{model}.latency_seconds', time.perf_counter() - start)
+
+            if last_tier or accept(result):
+                metrics.incr(f'cascade.{model}.resolved')
+                return result, model
+
+            metrics.incr(f'cascade.{model}.escalations')
+            logger.debug(f"Escalating from {model} to {self.models[tier + 1]}")
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tier calls, escalation rate and mean latency from the metrics registry"""
+        report = {}
+        for model in self.models:
+            calls = metrics.counters.get(f'cascade.{model}.calls', 0)
+            escalations = metrics.counters.get(f'cascade.{model}.escalations', 0)
+            latency = metrics.histograms.get(f'cascade.{model}.latency_seconds')
+            report[model] = {
+                'calls': int(calls),
+                'errors': int(metrics.counters.get(f'cascade.{model}.errors', 0)),
+                'resolved': int(metrics.counters.get(f'cascade.{model}.resolved', 0)),
+                'escalation_rate': round(escalations / calls, 4) if calls else None,
+                'mean_latency_seconds': round(latency.sum / latency.count, 4) if latency and latency.count else None
+            }
+        return report
+
+    def print_report(self):
+        if len(self.models) < 2:
+            return
+        print("Model cascade:")
+        for model, stats in self.report().items():
+            rate = f"{stats['escalation_rate']:.1%}" if stats['escalation_rate'] is not None else 'n/a'
+            latency = f"{stats['mean_latency_seconds']:.2f}s" if stats['mean_latency_seconds'] is not None else 'n/a'
+            print(f"- {model}: {stats['calls']} calls, {stats['resolved']} resolved, {stats['errors']} errors, "
+                  f"escalated {rate}, mean latency {latency}")
+
+
+def parse_model_list(spec: str) -> List[str]:
+    """'phi3:mini,mistral' -> ['phi3:mini', 'mistral'] (smallest first)"""
+    return [model.strip() for model in str(spec).split(',') if model.strip()]
@@ -0,0 +1,214 @@
+"""
+Lightweight instrumentation shared by the scraper and extractor stages.
+
+Provides counters, gauges, histograms and stage timers behind one
+process-wide registry (`metrics`). A run ends by writing a JSON summary and,
+optionally, a Prometheus text-format export of the same numbers.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# Latency-oriented bucket bounds (seconds) for the Prometheus export
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRICS_DIR = 'data/metrics'
+
+
+class Histogram:
+    """Running count/sum/min/max, fixed buckets and a bounded sample reservoir for quantiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, reservoir_size: int = 5000):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.reservoir_size = reservoir_size
+        self.samples = []
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+        # Reservoir sampling keeps quantiles cheap on long runs
+        if len(self.samples) < self.reservoir_size:
+            self.samples.append(value)
+        else:
+            slot = random.randint(0, self.count - 1)
+            if slot < self.reservoir_size:
+                self.samples[slot] = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99)
+        }
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.started_at = time.time()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time a block and record it as a `<name>_seconds` histogram observation"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start)
+
+    def timed_iter(self, iterable: Iterable, name: str) -> Iterator:
+        """Yield from an iterable, timing each `next()` (i.e. page fetches for API listings)"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.observe(f"{name}_seconds", time.perf_counter() - start)
+            yield item
+
+    def summary(self) -> Dict[str, Any]:
+        """Snapshot of every metric plus derived rates and cache hit ratios"""
+        with self._lock:
+            elapsed = time.time() - self.started_at
+            counters = dict(self.counters)
+            summary = {
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+                'elapsed_seconds': round(elapsed, 3),
+                'counters': counters,
+                'gauges': dict(self.gauges),
+                'histograms': {name: hist.summary() for name, hist in self.histograms.items()},
+                'rates_per_second': {name: round(value / elapsed, 3) for name, value in counters.items()} if elapsed > 0 else {},
+                'hit_ratios': {}
+            }
+
+        # Any `<prefix>.hits` / `<prefix>.misses` pair is reported as a cache hit ratio
+        for name, hits in counters.items():
+            if name.endswith('.hits'):
+                prefix = name[:-len('.hits')]
+                total = hits + counters.get(f"{prefix}.misses", 0)
+                summary['hit_ratios'][prefix] = round(hits / total, 4) if total else None
+
+        return summary
+
+    def write_summary(self, run_name: str, path: Optional[str] = None) -> str:
+        """Write the JSON run summary and return its path"""
+        if path is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            path = os.path.join(METRICS_DIR, f'{run_name}_{timestamp}.json')
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        summary = self.summary()
+        summary['run'] = run_name
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, default=str)
+        return path
+
+    def to_prometheus(self, prefix: str = 'opencard') -> str:
+        """Render metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = _prometheus_name(prefix, name) + '_total'
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+
+            for name, value in sorted(self.gauges.items()):
+                metric = _prometheus_name(prefix, name)
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+
+            for name, hist in sorted(self.histograms.items()):
+                metric = _prometheus_name(prefix, name)
+                lines.append(f"# TYPE {metric} histogram")
+                for bound, count in zip(hist.buckets, hist.bucket_counts):
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+                lines.append(f"{metric}_sum {hist.sum}")
+                lines.append(f"{metric}_count {hist.count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str, prefix: str = 'opencard') -> str:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus(prefix))
+        return path
+
+
+def _prometheus_name(prefix: str, name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', f"{prefix}_{name}")
+
+
+def configure_logging(level: str = 'INFO'):
+    """Route per-record progress messages through logging at the chosen level"""
+    logging.basicConfig(level=getattr(logging, str(level).upper(), logging.INFO),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+
+# Process-wide registry used by every stage
+metrics = Metrics()
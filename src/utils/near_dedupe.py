@@ -0,0 +1,226 @@
+"""
+Near-duplicate and cross-post detection using MinHash + LSH.
+
+Exact dedupe (post ids and URLs) misses the same story cross-posted to
+several subreddits or reposted with small edits. Each post is reduced to a
+MinHash signature over character shingles of its title and body, and the
+signature is split into LSH bands so that lookups only compare against
+posts sharing at least one band bucket instead of the whole store.
+"""
+
+import os
+import re
+import zlib
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Same constants as the usual universal hashing scheme for MinHash
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+DEFAULT_INDEX_FILE = 'data/raw/freedom_cards_dataset.lsh.npz'
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace/punctuation so small edits don't change shingles"""
+    text = str(text).lower()
+    text = re.sub(r'https?://\S+', ' ', text)
+    text = re.sub(r'[^a-z0-9$]+', ' ', text)
+    return text.strip()
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Character shingles of the normalized text"""
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """MinHash signatures plus banded LSH buckets, with union-find clusters"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.7,
+                 shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.seed = seed
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = generator.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        self.keys: List[str] = []
+        self._key_pos: Dict[str, int] = {}
+        self._signatures: List[np.ndarray] = []
+        self._parent: List[int] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [dict() for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._key_pos
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature for a piece of text"""
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+
+        hashes = np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams),
+                             dtype=np.uint64, count=len(grams))
+        # (a * x + b) mod p for every permutation at once: shape (num_perm, n_shingles)
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _find(self, pos: int) -> int:
+        while self._parent[pos] != pos:
+            self._parent[pos] = self._parent[self._parent[pos]]
+            pos = self._parent[pos]
+        return pos
+
+    def _union(self, a: int, b: int):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            # Keep the earliest post as the cluster representative
+            if root_b < root_a:
+                root_a, root_b = root_b, root_a
+            self._parent[root_b] = root_a
+
+    def query(self, text: str, signature: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Return (key, estimated_jaccard) for indexed posts similar to the text"""
+        if signature is None:
+            signature = self.signature(text)
+
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+
+        matches = []
+        for pos in candidates:
+            similarity = float(np.mean(self._signatures[pos] == signature))
+            if similarity >= self.threshold:
+                matches.append((self.keys[pos], similarity))
+
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def add(self, key: str, text: str) -> Optional[str]:
+        """
+        Index a post and return the key of the cluster it belongs to.
+
+        Returns None when the post starts a new cluster, otherwise the key of
+        the earliest post it is a near-duplicate of.
+        """
+        if key in self._key_pos:
+            root = self.keys[self._find(self._key_pos[key])]
+            return None if root == key else root
+
+        signature = self.signature(text)
+        matches = self.query(text, signature)
+
+        pos = len(self.keys)
+        self.keys.append(key)
+        self._key_pos[key] = pos
+        self._signatures.append(signature)
+        self._parent.append(pos)
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(pos)
+
+        for match_key, _ in matches:
+            self._union(pos, self._key_pos[match_key])
+
+        root = self.keys[self._find(pos)]
+        return None if root == key else root
+
+    def cluster_of(self, key: str) -> Optional[str]:
+        """Representative key of the cluster containing key"""
+        if key not in self._key_pos:
+            return None
+        return self.keys[self._find(self._key_pos[key])]
+
+    def clusters(self, min_size: int = 2) -> Dict[str, List[str]]:
+        """Map of cluster representative -> member keys"""
+        groups: Dict[str, List[str]] = {}
+        for pos, key in enumerate(self.keys):
+            groups.setdefault(self.keys[self._find(pos)], []).append(key)
+        return {root: members for root, members in groups.items() if len(members) >= min_size}
+
+    def save(self, path: str = DEFAULT_INDEX_FILE):
+        """Persist signatures and clusters next to the post store"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        signatures = np.vstack(self._signatures) if self._signatures else np.empty((0, self.num_perm), dtype=np.uint64)
+        parents = np.array([self._find(pos) for pos in range(len(self.keys))], dtype=np.int64)
+        params = np.array([self.num_perm, self.bands, self.shingle_size, self.seed], dtype=np.int64)
+
+        # np.savez appends .npz when missing, so write through a file handle
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, keys=np.array(self.keys, dtype=str), signatures=signatures,
+                                parents=parents, params=params, threshold=np.array([self.threshold]))
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_FILE, **kwargs) -> 'NearDuplicateIndex':
+        """Load a persisted index, or return an empty one if the file doesn't exist"""
+        if not os.path.exists(path):
+            return cls(**kwargs)
+
+        data = np.load(path, allow_pickle=False)
+        num_perm, bands, shingle_size, seed = (int(v) for v in data['params'])
+        threshold = kwargs.get('threshold', float(data['threshold'][0]))
+        index = cls(num_perm=num_perm, bands=bands, threshold=threshold,
+                    shingle_size=shingle_size, seed=seed)
+
+        for pos, (key, signature) in enumerate(zip(data['keys'].tolist(), data['signatures'])):
+            index.keys.append(key)
+            index._key_pos[key] = pos
+            index._signatures.append(signature.astype(np.uint64))
+            for band, band_key in index._band_keys(index._signatures[-1]):
+                index._buckets[band].setdefault(band_key, []).append(pos)
+        index._parent = [int(p) for p in data['parents']]
+
+        return index
+
+
+def post_text(title, body) -> str:
+    """Text used for shingling a post"""
+    return f"{title} {body}"
+
+
+def drop_near_duplicates(df, key_column: str = 'URL', threshold: float = 0.7,
+                         index: Optional[NearDuplicateIndex] = None, group_column: Optional[str] = None):
+    """
+    Keep only the first post of each near-duplicate cluster in a DataFrame.
+
+    With `group_column` (e.g. Card_Name for multi-card posts stored as one
+    row per card), rows of a kept post are kept once per group value.
+    Returns the filtered DataFrame and the index, so callers can inspect
+    the clusters that were collapsed.
+    """
+    if index is None:
+        index = NearDuplicateIndex(threshold=threshold)
+
+    groups = df[group_column].astype(str) if group_column else [''] * len(df)
+    keep = []
+    decided = {}
+    seen = set()
+    for key, group, title, body in zip(df[key_column].astype(str), groups, df['Title'], df['Body']):
+        if key not in decided:
+            decided[key] = index.add(key, post_text(title, body)) is None
+        keep.append(decided[key] and (key, group) not in seen)
+        seen.add((key, group))
+
+    return df[keep], index
@@ -0,0 +1,147 @@
+"""
+Token-budgeted post context for LLM prompts.
+
+Long bodies dominate inference time and can overflow the model's context.
+`build_context` keeps the sentences that matter for our questions (card
+mentions, approval/denial language, numbers such as income, scores and
+limits) plus their immediate neighbours, and fits them to a token budget so
+prompt size - and therefore latency - is bounded by the budget rather than by
+the post length. Savings are recorded as `prompt.*` metrics.
+"""
+
+import re
+from typing import List, Tuple
+
+from utils.metrics import metrics
+
+# Body budgets (estimated tokens) for the different prompt types
+CLASSIFICATION_BODY_BUDGET = 300
+EXTRACTION_BODY_BUDGET = 300
+VERIFICATION_BODY_BUDGET = 150
+
+GAP_MARKER = ' [...] '
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+_CARD_RE = re.compile(r'\b(freedom|cfu|cff|chase|unlimited|flex)\b', re.IGNORECASE)
+_DECISION_RE = re.compile(
+    r'\b(approv\w*|den(y|ied|ial)|declin\w*|reject\w*|pending|recon\w*|instant\w*|'
+    r'accepted|got it|limit|sl|cl)\b', re.IGNORECASE)
+_NUMBER_RE = re.compile(r'\$?\d[\d,.]*\s*k?\b|\b\d{3}\b', re.IGNORECASE)
+
+CARD_WEIGHT = 3
+DECISION_WEIGHT = 3
+NUMBER_WEIGHT = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+
+def score_sentence(sentence: str) -> int:
+    """Relevance of one sentence: card, decision and numeric mentions"""
+    score = 0
+    if _CARD_RE.search(sentence):
+        score += CARD_WEIGHT
+    if _DECISION_RE.search(sentence):
+        score += DECISION_WEIGHT
+    if _NUMBER_RE.search(sentence):
+        score += NUMBER_WEIGHT
+    return score
+
+
+def build_context(text, budget_tokens: int = CLASSIFICATION_BODY_BUDGET, window: int = 1) -> Tuple[str, int, int]:
+    """
+    Select the relevant part of a post body within a token budget.
+
+    Sentences with relevant mentions are kept together with `window`
+    neighbours on each side; when those don't all fit, the highest-scoring
+    ones win. Kept sentences stay in their original order, and skipped
+    stretches are marked with ' [...] '.
+
+    Args:
+        text: Post body (non-strings are treated as empty)
+        budget_tokens (int): Maximum estimated tokens for the returned text
+        window (int): Neighbouring sentences kept around each relevant one
+
+    Returns:
+        tuple: (context text, estimated tokens before, estimated tokens after)
+    """
+    text = text if isinstance(text, str) else ''
+    tokens_in = estimate_tokens(text)
+
+    if tokens_in <= budget_tokens:
+        context = text
+    else:
+        sentences = split_sentences(text)
+        scores = [score_sentence(s) for s in sentences]
+
+        # Neighbours inherit a fraction of a relevant sentence's score so they're picked next
+        priority = list(scores)
+        for i, score in enumerate(scores):
+            for j in range(max(0, i - window), min(len(sentences), i + window + 1)):
+                if j != i and score:
+                    priority[j] = max(priority[j], score / 10)
+
+        # Without any relevant sentence, fall back to the head of the post
+        any_relevant = any(scores)
+        chosen = set()
+        used = 0
+        for i in sorted(range(len(sentences)), key=lambda i: (-priority[i], i)):
+            if priority[i] <= 0 and any_relevant:
+                break
+            cost = estimate_tokens(sentences[i]) + estimate_tokens(GAP_MARKER)
+            if used + cost > budget_tokens:
+                continue
+            chosen.add(i)
+            used += cost
+
+        if chosen:
+            parts = [GAP_MARKER.strip()] if min(chosen) > 0 else []
+            previous = None
+            for i in sorted(chosen):
+                if previous is not None and i != previous + 1:
+                    parts.append(GAP_MARKER.strip())
+                parts.append(sentences[i])
+                previous = i
+            if max(chosen) < len(sentences) - 1:
+                parts.append(GAP_MARKER.strip())
+            context = ' '.join(parts)
+        else:
+            # Nothing fits on its own (e.g. one huge sentence): keep the head of the post
+            context = text[:budget_tokens * 4 - len(GAP_MARKER)] + GAP_MARKER.rstrip()
+
+    tokens_out = estimate_tokens(context)
+    metrics.incr('prompt.body_tokens_in', tokens_in)
+    metrics.incr('prompt.body_tokens_out', tokens_out)
+    if tokens_out < tokens_in:
+        metrics.incr('prompt.bodies_trimmed')
+    return context, tokens_in, tokens_out
+
+
+def context_for_prompt(text, budget_tokens: int = CLASSIFICATION_BODY_BUDGET) -> str:
+    """`build_context` returning only the text"""
+    return build_context(text, budget_tokens)[0]
+
+
+def token_savings() -> dict:
+    """Body tokens sent vs. original, from the metrics registry"""
+    tokens_in = metrics.counters.get('prompt.body_tokens_in', 0)
+    tokens_out = metrics.counters.get('prompt.body_tokens_out', 0)
+    return {
+        'body_tokens_in': int(tokens_in),
+        'body_tokens_out': int(tokens_out),
+        'bodies_trimmed': int(metrics.counters.get('prompt.bodies_trimmed', 0)),
+        'saved_fraction': round(1 - tokens_out / tokens_in, 4) if tokens_in else 0.0
+    }
+
+
+def print_token_savings():
+    savings = token_savings()
+    if savings['bodies_trimmed']:
+        print(f"Prompt budgeting: {savings['body_tokens_out']:,} of {savings['body_tokens_in']:,} body tokens sent "
+              f"({savings['saved_fraction']:.0%} saved, {savings['bodies_trimmed']} bodies trimmed)")
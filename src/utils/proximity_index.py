@@ -0,0 +1,186 @@
+"""
+Card-decision association by token proximity.
+
+A post is tokenized once into a positional index of card mentions (from the
+card registry) and decision terms. Each decision term is then assigned to
+its nearest card mention with a single merge-style sweep over the two sorted
+position lists, so "approved for the CFU, denied for the CSP" credits each
+outcome to the right card in linear time. Crossing a clause boundary
+(, ; . ! ? or "but") counts as extra distance.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from utils.card_registry import CardRegistry, Mention, get_registry
+
+# Same reach as the old ±12-token context window
+MAX_DISTANCE = 12
+CLAUSE_PENALTY = 6
+
+UNKNOWN = 'Unknown'
+
+# Bump when the decision terms or attribution logic change; master rows
+# labeled under another version are re-derived by compaction
+RULES_VERSION = 2
+
+DECISION_TERMS = {
+    'approved': 'Approved', 'approval': 'Approved', 'accepted': 'Approved',
+    'denied': 'Denied', 'denial': 'Denied', 'rejected': 'Denied', 'rejection': 'Denied', 'declined': 'Denied',
+    'preapproved': 'Pre-Approved', 'preapproval': 'Pre-Approved', 'prequalified': 'Pre-Approved'
+}
+
+# Two-token forms ('pre approved', 'pre-approval') collapse onto one decision
+_PRE_PREFIX = 'pre'
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[,;.!?]")
+_CLAUSE_BREAKS = {',', ';', '.', '!', '?', 'but'}
+
+
+@dataclass
+class DecisionMention:
+    decision: str
+    position: int
+    clause: int
+
+
+class PostIndex:
+    """Token positions of card mentions and decision terms for one post"""
+
+    def __init__(self, text, registry: Optional[CardRegistry] = None):
+        registry = registry or get_registry()
+
+        self.tokens: List[str] = []
+        self.clauses: List[int] = []
+        clause = 0
+        for token in _TOKEN_RE.findall(str(text).lower()):
+            if token in _CLAUSE_BREAKS:
+                clause += 1
+                if token != 'but':
+                    continue
+            self.tokens.append(token)
+            self.clauses.append(clause)
+
+        # Generic family mentions count for the specific card of that family the post names
+        mentions = registry.fold_generic(registry.scan_tokens(self.tokens))
+        self.cards: List[Mention] = [m for m in mentions if m.kind == 'card']
+        self.issuers: List[Mention] = [m for m in mentions if m.kind == 'issuer']
+        self.decisions: List[DecisionMention] = []
+        for i, token in enumerate(self.tokens):
+            decision = DECISION_TERMS.get(token)
+            if decision is None:
+                continue
+            if i > 0 and self.tokens[i - 1] == _PRE_PREFIX and decision == 'Approved':
+                decision = 'Pre-Approved'
+            self.decisions.append(DecisionMention(decision, i, self.clauses[i]))
+
+    def _coordinate(self, position: int) -> int:
+        # Monotonic in position, so nearest-neighbour sweeps stay linear
+        return position + CLAUSE_PENALTY * self.clauses[position]
+
+    def assign_decisions(self, max_distance: int = MAX_DISTANCE) -> List[tuple]:
+        """
+        (decision, card mention, distance) for each decision term with a card in reach.
+
+        Cards and decisions are both in position order; a pointer walks the
+        card list once while the decisions are visited in order.
+        """
+        assignments = []
+        if not self.cards:
+            return assignments
+
+        card_coords = [self._coordinate(m.start) for m in self.cards]
+        c = 0
+        for decision in self.decisions:
+            coord = self._coordinate(decision.position)
+            # Advance to the last card at or before the decision
+            while c + 1 < len(self.cards) and card_coords[c + 1] <= coord:
+                c += 1
+
+            best = None
+            for candidate in (c, c + 1):
+                if candidate < len(self.cards):
+                    distance = abs(card_coords[candidate] - coord)
+                    if best is None or distance < best[1]:
+                        best = (candidate, distance)
+
+            if best[1] <= max_distance:
+                assignments.append((decision.decision, self.cards[best[0]], best[1]))
+        return assignments
+
+    def card_decisions(self, max_distance: int = MAX_DISTANCE, tracked_only: bool = False) -> Dict[str, str]:
+        """Card name -> decision of its closest assigned term (UNKNOWN when none is in reach)"""
+        closest: Dict[str, tuple] = {}
+        for decision, mention, distance in self.assign_decisions(max_distance):
+            if mention.name not in closest or distance < closest[mention.name][1]:
+                closest[mention.name] = (decision, distance)
+
+        result = {}
+        for mention in self.cards:
+            if tracked_only and not mention.card.tracked:
+                continue
+            result.setdefault(mention.name, closest.get(mention.name, (UNKNOWN,))[0])
+        return result
+
+    def other_mentions(self, card_name: str, registry: Optional[CardRegistry] = None) -> bool:
+        """Whether cards or issuers other than card_name (and its own issuer) are mentioned"""
+        registry = registry or get_registry()
+        card = registry.cards.get(card_name)
+        own_family = card.family if card else None
+        own_issuer = card.issuer if card else None
+
+        if any(m.card.family != own_family for m in self.cards):
+            return True
+        return any(m.name != own_issuer for m in self.issuers)
+
+
+def card_decisions(text, registry: Optional[CardRegistry] = None, max_distance: int = MAX_DISTANCE,
+                   tracked_only: bool = True) -> Dict[str, str]:
+    """Decision attributed to each card mentioned in a post"""
+    return PostIndex(text, registry).card_decisions(max_distance, tracked_only)
+
+
+def detect_decision(text) -> str:
+    """Post-level decision from keywords (used when no decision term is near a card)"""
+    text = text.lower()
+    if 'denied' in text or 'rejected' in text:
+        return 'Denied'
+    if 'preapproved' in text or 'pre-approval' in text:
+        return 'Pre-Approved'
+    if 'approved' in text or 'got approved' in text:
+        return 'Approved'
+    return UNKNOWN
+
+
+def attribute_decisions(text, registry: Optional[CardRegistry] = None) -> List[tuple]:
+    """
+    (card, decision) pairs for the tracked cards in a post.
+
+    Each card takes the decision term nearest to it; a lone card with no
+    decision in reach falls back to the post-level decision.
+    """
+    decisions = card_decisions(text, registry)
+    attributed = [(card, decision) for card, decision in decisions.items() if decision != UNKNOWN]
+    if not attributed and len(decisions) == 1:
+        attributed = [(card, detect_decision(text)) for card in decisions]
+    return [(card, decision) for card, decision in attributed if decision != UNKNOWN]
+
+
+def rule_version(registry: Optional[CardRegistry] = None) -> str:
+    """Version of the card/decision labels: the rules plus the card registry contents"""
+    registry = registry or get_registry()
+    return f"{RULES_VERSION}.{registry.digest[:8]}" if registry.digest else str(RULES_VERSION)
+
+
+def outcome_attributed_to_card(text, card_name: str, registry: Optional[CardRegistry] = None) -> bool:
+    """
+    Whether a post's outcome can be credited to card_name.
+
+    Posts that only talk about this card pass as before; when other cards or
+    issuers are mentioned, a decision term must sit closest to this card.
+    """
+    index = PostIndex(text, registry)
+    if not index.other_mentions(card_name, registry):
+        return True
+    return index.card_decisions().get(card_name, UNKNOWN) != UNKNOWN
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from database.analytics import Analytics
+
+
+def write_dataset(path, rows):
+    columns = ['Title', 'URL', 'Body', 'Source', 'Card_Name', 'Scraped_At', 'approval_status', 'target',
+               'income_clean', 'credit_score_clean', 'approval_amount_clean', 'title_quality_score', 'is_student',
+               'used_llm', 'llm_approval_status', 'llm_confidence']
+    pd.DataFrame(rows, columns=columns).to_csv(path, index=False)
+    return str(path)
+
+
+def test_views_type_the_display_values_and_keep_the_latest_row_per_post(tmp_path):
+    rules = write_dataset(tmp_path / 'a_rules.csv', [
+        ['CFU approved', 'u1', 'b', 'Reddit', 'Freedom Unlimited', '2024-05-01', 'approved', 1,
+         '$85,000', 'Not extracted', '5000', 7, 'Yes', 'No', '', 0],
+        ['CFF denied', 'u2', 'b', 'Reddit', 'Freedom Flex', '2024-05-02', 'denied', 0,
+         'Not extracted', '640', 'Not extracted', 3, 'No', 'No', '', 0],
+        ['Question', 'u3', 'b', 'Reddit', 'Freedom Flex', '2024-05-03', 'unknown', None,
+         'Not extracted', 'Not extracted', 'Not extracted', 1, 'No', 'No', '', 0],
+    ])
+    llm = write_dataset(tmp_path / 'b_llm.csv', [
+        ['CFF denied', 'u2', 'b', 'Reddit', 'Freedom Flex', '2024-05-02', 'approved', 1,
+         'Not extracted', '640', 'Not extracted', 8, 'No', 'Yes', 'approved', 8],
+    ])
+    analytics = Analytics(str(tmp_path / 'analytics.db')).refresh([rules, llm])
+
+    approvals = analytics.query('SELECT url, target, income, credit_score, approval_amount FROM approvals ORDER BY url')
+    # Missing values come back as NULL (-1 here), numbers as integers; u3 has no decision, u2 is the LLM's version
+    assert approvals.set_index('url').fillna(-1).astype(int).to_dict('index') == {
+        'u1': {'target': 1, 'income': 85000, 'credit_score': -1, 'approval_amount': 5000},
+        'u2': {'target': 1, 'income': -1, 'credit_score': 640, 'approval_amount': -1},
+    }
+    assert analytics.query('SELECT is_student FROM features ORDER BY url')['is_student'].tolist() == [1, 0]
+    audit = analytics.query('SELECT url, llm_agrees, llm_overrode FROM llm_audit')
+    assert audit.values.tolist() == [['u2', 1, 0]]
+    rates = analytics.approval_rates()
+    assert rates.set_index('card_name')['approval_rate'].to_dict() == {'Freedom Unlimited': 1.0, 'Freedom Flex': 1.0}
+
+    # Unchanged files are not reloaded
+    analytics.refresh([rules, llm])
+    assert analytics.query('SELECT COUNT(*) AS n FROM processed')['n'].iloc[0] == 4
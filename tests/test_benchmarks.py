@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from run_benchmarks import run_target
+from synthetic_posts import generate_posts, write_posts
+
+
+def test_synthetic_posts_are_deterministic_per_seed():
+    first = generate_posts(200, seed=7)
+    assert first.equals(generate_posts(200, seed=7))
+    assert not first.equals(generate_posts(200, seed=8))
+    assert first['URL'].is_unique
+    assert set(first['Card_Name']) <= {'Freedom Unlimited', 'Freedom Flex', 'Freedom (Generic)'}
+
+
+def test_run_target_times_an_extractor_on_synthetic_posts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_file = write_posts(str(tmp_path / 'posts.csv'), 200)
+
+    result = run_target('extract_fields_title_focused', input_file, 200, str(tmp_path), repeat=2)
+    assert result['target'] == 'extract_fields_title_focused' and result['repeat'] == 2
+    assert 0 < result['best_seconds'] <= result['mean_seconds']
+    assert len(pd.read_csv(tmp_path / 'title_focused.csv')) > 0
@@ -0,0 +1,22 @@
+from utils.card_registry import Card, CardRegistry, get_registry
+
+
+def test_longest_alias_wins_and_every_card_is_reported():
+    registry = get_registry()
+    assert registry.detect_cards('Approved for the Chase Freedom Unlimited!') == ['Freedom Unlimited']
+    assert registry.detect_cards('CFF approved, CFU denied', tracked_only=True) == ['Freedom Flex', 'Freedom Unlimited']
+    assert registry.detect_cards('Got the CSP and a CFU', tracked_only=False) == ['Sapphire Preferred', 'Freedom Unlimited']
+
+
+def test_generic_mention_folds_into_the_named_card_of_its_family():
+    registry = get_registry()
+    assert registry.detect_cards('My freedom was approved') == ['Freedom (Generic)']
+    assert registry.detect_cards('Applied for the Freedom Flex; my freedom came with a $3k limit') == ['Freedom Flex']
+    assert not registry.mentions_card('My freedom was approved', 'Freedom Unlimited')
+
+
+def test_card_alias_beats_issuer_alias_with_the_same_spelling():
+    registry = CardRegistry([Card('Discover it', 'Discover', 'it', aliases=['discover', 'discover it'])],
+                            {'Discover': ['discover']})
+    assert [(m.kind, m.name) for m in registry.scan('discover approved me')] == [('card', 'Discover it')]
+    assert registry.issuers_in('discover it approved me') == ['Discover']
@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import cli
+from extractors import hybrid_extractor
+
+
+def test_parsing_does_not_import_the_heavy_dependencies():
+    code = ("import sys, cli; cli.build_parser().parse_known_args(['report']); "
+            "print(sorted({'pandas', 'praw', 'requests', 'numpy'} & set(sys.modules)))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '[]'
+
+
+def test_passthrough_subcommands_forward_their_arguments(monkeypatch):
+    received = []
+    monkeypatch.setattr(hybrid_extractor, 'main', received.append)
+    assert cli.main(['hybrid', '--no-llm', '--input', 'raw.csv']) == 0
+    assert received == [['--no-llm', '--input', 'raw.csv']]
+
+    with pytest.raises(SystemExit):
+        cli.main(['report', '--no-llm'])
+
+
+def test_report_prints_the_newest_summary_of_a_run(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(cli, 'METRICS_DIR', str(tmp_path))
+    summary = {'run': 'hybrid', 'started_at': '2024-05-01T12:00:00', 'elapsed_seconds': 3.5,
+               'counters': {'hybrid.rows_in': 300}, 'histograms': {}}
+    (tmp_path / 'hybrid_20240501.json').write_text(json.dumps(summary))
+
+    assert cli.main(['report', '--run', 'hybrid']) == 0
+    assert 'hybrid.rows_in: 300' in capsys.readouterr().out
+    assert cli.main(['report', '--run', 'scrape']) == 1
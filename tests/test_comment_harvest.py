@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from scrapers import master_scraper
+from scrapers.master_scraper import harvest_post_comments
+
+
+class CommentTree:
+    def __init__(self, bodies):
+        self.comments = [SimpleNamespace(id=f'c{i}', body=body) for i, body in enumerate(bodies)]
+        self.more_limit = None
+
+    def replace_more(self, limit):
+        self.more_limit = limit
+
+    def list(self):
+        return self.comments
+
+
+def harvest_args(**overrides):
+    return SimpleNamespace(**{'comment_more_limit': 2, 'comment_api_budget': 10, 'max_comments_per_post': 50,
+                              **overrides})
+
+
+def test_comments_with_a_data_point_become_rows_for_the_posts_card(monkeypatch):
+    monkeypatch.setattr(master_scraper, 'comment_api_calls', 0)
+    tree = CommentTree([
+        'Same here, got approved with FICO 740 and a $4,000 limit!',
+        'Congrats!',
+        'Thanks for sharing, I was wondering about the income requirements too.',
+    ])
+    post = SimpleNamespace(id='p1', url='https://reddit.com/p1', comments=tree)
+
+    rows = harvest_post_comments(post, 'Freedom Unlimited', 'CreditCards', harvest_args())
+    assert tree.more_limit == 2
+    assert len(rows) == 1
+    comment_id, post_id, _, _, source, card, decision, _, credit_score, amount, _ = rows[0]
+    assert (comment_id, post_id, source, card, decision) == ('c0', 'p1', 'Reddit-CreditCards-comment',
+                                                            'Freedom Unlimited', 'Approved')
+    assert (credit_score, amount) == (740, 4000)
+
+
+def test_exhausted_api_budget_skips_the_post(monkeypatch):
+    monkeypatch.setattr(master_scraper, 'comment_api_calls', 10)
+    post = SimpleNamespace(id='p1', url='u', comments=CommentTree(['Approved with 700 score, $3k SL']))
+    assert harvest_post_comments(post, 'Freedom Unlimited', 'CreditCards', harvest_args()) == []
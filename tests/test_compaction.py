@@ -0,0 +1,67 @@
+import csv
+
+from database.compaction import compact_master
+from scrapers.sources import MASTER_COLUMNS
+from utils.proximity_index import rule_version
+
+LEGACY_COLUMNS = [column for column in MASTER_COLUMNS if column != 'Rule_Version']
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def legacy_row(title, url, card, decision, body=''):
+    return [title, url, body, 'Reddit', card, decision, '2025-01-01T00:00:00']
+
+
+def test_output_leaves_legacy_master_untouched(tmp_path):
+    master = tmp_path / 'master.csv'
+    write_csv(master, LEGACY_COLUMNS, [
+        legacy_row('Approved for Freedom Unlimited', 'https://reddit.com/r/x/comments/abc/p', 'Freedom Unlimited', 'Approved')
+    ])
+    before = master.read_bytes()
+
+    compact_master(str(master), output_file=str(tmp_path / 'out.csv'))
+
+    assert master.read_bytes() == before
+    with open(tmp_path / 'out.csv', newline='', encoding='utf-8') as f:
+        assert next(csv.reader(f)) == MASTER_COLUMNS
+
+
+def test_dedupe_relabel_and_unmatched_posts(tmp_path):
+    master = tmp_path / 'master.csv'
+    write_csv(master, LEGACY_COLUMNS, [
+        # The same post under two URL forms collapses to one row
+        legacy_row('Approved for Freedom Unlimited', 'https://reddit.com/r/x/comments/abc/p', 'Freedom Unlimited', 'Approved'),
+        legacy_row('Approved for Freedom Unlimited', 'https://www.reddit.com/comments/abc?utm_source=x', 'Freedom Unlimited', 'Approved'),
+        # Mislabeled under older rules
+        legacy_row('Denied for Freedom Flex', 'https://reddit.com/r/x/comments/def/p', 'Freedom Flex', 'Approved',
+                   body='too many inquiries'),
+        # The current rules find no card/decision in it
+        legacy_row('Question about points', 'https://reddit.com/r/x/comments/ghi/p', 'Freedom Flex', 'Approved'),
+    ])
+    output = tmp_path / 'out.csv'
+
+    report = compact_master(str(master), output_file=str(output))
+
+    rows = {row['URL'].split('/comments/')[1][:3]: row for row in read_csv(output)}
+    assert report.rows_in == 4 and report.rows_out == 3
+    assert report.duplicates_dropped == 1
+    assert rows['abc']['Rule_Version'] == rule_version()
+    assert rows['def']['Decision'] == 'Denied'
+    assert report.labels_changed == 1
+    # Kept with its old labels rather than deleted
+    assert rows['ghi']['Decision'] == 'Approved'
+    assert report.unmatched_posts == 1 and report.unmatched_dropped == 0
+
+    report = compact_master(str(master), output_file=str(output), drop_unmatched=True)
+    assert report.rows_out == 2 and report.unmatched_dropped == 1
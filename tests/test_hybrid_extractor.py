@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from extractors import hybrid_extractor
+from extractors.hybrid_extractor import main, stream_hybrid_extract
+
+BODY = 'Got the Freedom Unlimited approved today.'
+
+
+def post(title, url, body=BODY):
+    return {'Title': title, 'URL': url, 'Body': body, 'Card_Name': 'Freedom Unlimited', 'Decision': 'Approved'}
+
+
+def test_confident_rule_results_are_emitted_before_pending_llm_calls(monkeypatch):
+    llm_may_answer = threading.Event()
+
+    def classify(title, body, card_name, model, rule_status=None):
+        llm_may_answer.wait(5)
+        off_topic = 'Flex' in body
+        reasoning = 'Not about Freedom cards' if off_topic else 'Clear approval'
+        status = 'unknown' if off_topic else 'approved'
+        return {'approval_status': status, 'confidence': 9, 'income': None, 'credit_score': 760,
+                'approval_amount': None, 'reasoning': reasoning}
+
+    monkeypatch.setattr(hybrid_extractor, 'setup_ollama_client', lambda model: None)
+    monkeypatch.setattr(hybrid_extractor, 'llm_classify_post', classify)
+
+    records = [
+        post('Freedom Unlimited', 'u1'),                              # low title score: waits on the LLM
+        post('Freedom Unlimited', 'u2', BODY + ' Also looking at the Flex.'),
+        post('Got approved for Freedom Unlimited', 'u3', 'Instant approval with a 780 FICO and $9k limit.'),
+        post('Got approved for Freedom Unlimited', 'u4', 'Instant approval with a 780 FICO and $9k limit.'),
+    ]
+    stream = stream_hybrid_extract(records, confidence_threshold=5)
+
+    # u3 comes out while both LLM calls are still blocked; u4 is its near-duplicate
+    first = next(stream)
+    assert first['URL'] == 'u3' and first['used_llm'] is False
+    llm_may_answer.set()
+    rest = list(stream)
+    assert [row['URL'] for row in rest] == ['u1']
+    assert rest[0]['used_llm'] is True and rest[0]['Extracted Credit Score'] == 760
+
+
+@pytest.mark.parametrize('flag', ['--resume', '--display'])
+def test_stream_rejects_flags_it_cannot_honour(flag, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--stream', flag, '--input', 'missing.csv'])
+    assert exit_info.value.code == 2
+    assert "--stream can't be combined" in capsys.readouterr().err
@@ -0,0 +1,51 @@
+import json
+import time
+
+from scrapers.ingest import IngestScheduler, MasterSink
+from scrapers.sources import FileAdapter
+from utils.near_dedupe import NearDuplicateIndex
+
+APPROVED = 'Got approved for the Chase Freedom Unlimited today with a 740 score and a $5,000 limit.'
+DENIED = 'Chase denied my Freedom Flex application, too many recent inquiries on my report.'
+
+
+def test_file_adapter_maps_json_fields_and_splits_html_articles(tmp_path):
+    (tmp_path / 'export.json').write_text(json.dumps({'posts': [
+        {'uid': 'x1', 'headline': 'CFU approved', 'text': APPROVED, 'created': '2024-05-01T12:00:00Z', 'score': 3}
+    ]}))
+    (tmp_path / 'forum.html').write_text(
+        '<html><title>Forum</title><nav>Home</nav>'
+        '<article id="a1" data-url="https://forum.example/a1"><h2>Denied for Flex</h2><p>' + DENIED + '</p></article>'
+        '<article><h2>Second</h2><a href="https://forum.example/a2">link</a><p>Body text</p></article></html>')
+
+    adapter = FileAdapter([str(tmp_path)], field_map={'post_id': 'uid', 'title': 'headline', 'body': 'text',
+                                                      'created_utc': 'created'})
+    records = [record for path in adapter.tasks() for record in adapter.fetch(path)]
+
+    json_record = next(r for r in records if r.source == 'File-export')
+    assert (json_record.post_id, json_record.title, json_record.metadata) == ('x1', 'CFU approved', {'score': 3})
+    assert json_record.created_utc == 1714564800.0
+    html_records = [r for r in records if r.source == 'File-forum']
+    assert [(r.post_id, r.title, r.url) for r in html_records] == [
+        ('a1', 'Denied for Flex', 'https://forum.example/a1'), (html_records[1].post_id, 'Second', 'https://forum.example/a2')]
+    assert html_records[0].body == DENIED
+
+
+def test_scheduler_feeds_every_source_through_the_acceptance_rules(tmp_path):
+    now = time.time()
+    posts = [
+        {'id': 'p1', 'title': 'CFU approved', 'body': APPROVED, 'url': 'u1', 'created_utc': now},
+        {'id': 'p2', 'title': 'CFU approved', 'body': APPROVED, 'url': 'u2', 'created_utc': now},  # repost
+        {'id': 'p3', 'title': 'Flex denied', 'body': DENIED, 'url': 'u3', 'created_utc': now - 400 * 86400},
+        {'id': 'p4', 'title': 'Sapphire question', 'body': 'Which Sapphire card is better for travel rewards?',
+         'url': 'u4', 'created_utc': now},
+    ]
+    (tmp_path / 'posts.jsonl').write_text('\n'.join(json.dumps(post) for post in posts))
+
+    sink = MasterSink(str(tmp_path / 'master.csv'), {'u9'}, NearDuplicateIndex())
+    fetched = IngestScheduler([FileAdapter([str(tmp_path / 'posts.jsonl')])]).run(sink.accept, should_stop=sink.full)
+
+    assert fetched == {'file': 4}
+    assert sink.new_posts == 1 and sink.near_duplicate_count == 1
+    assert [row[1] for row in sink.results] == ['u1']
+    assert sink.results[0][4:6] == ['Freedom Unlimited', 'Approved']
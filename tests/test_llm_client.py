@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils import llm_client
+from utils.llm_client import AdaptiveConcurrencyLimiter, LLMClientError, ModelCascade
+from utils.metrics import metrics
+
+
+def test_burst_of_slow_token_timed_responses_cuts_once(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(llm_client, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    limiter = AdaptiveConcurrencyLimiter(initial=8, max_limit=8)
+
+    # Flat latency: 2s calls of 100 tokens (0.02s per token)
+    for _ in range(50):
+        limiter.on_success(2.0, tokens=100)
+        clock.now += 2.0
+    assert limiter.limit == 8
+
+    # One burst of slow responses arriving 20ms apart
+    for _ in range(5):
+        limiter.on_success(8.0, tokens=100)
+        clock.now += 0.02
+    assert limiter.limit == int(8 * limiter.backoff)
+
+
+def test_reset_seeds_the_limit_and_forgets_latency():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+    assert limiter.limit == 1
+    limiter.on_success(2.0)
+    limiter.on_error()
+
+    limiter.reset(initial=4)
+    assert limiter.limit == 4
+    limiter.reset(initial=50)
+    assert limiter.limit == 8
+    # The first call after a reset sets a new baseline instead of looking slow
+    limiter.on_success(30.0)
+    assert limiter.limit == 8
+
+
+class StubClient:
+    """generate() answers from a per-model function"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def generate(self, prompt, model=None, **options):
+        self.calls.append(model)
+        return self.answers[model]()
+
+
+def fail(error):
+    def answer():
+        raise error
+    return answer
+
+
+def test_cascade_escalates_when_a_lower_tier_fails():
+    client = StubClient({'small': fail(LLMClientError('404 model not found')), 'large': lambda: 'yes'})
+    cascade = ModelCascade(['small', 'large'], client)
+
+    assert cascade.run('prompt', parse=str.strip, accept=lambda answer: True) == ('yes', 'large')
+    assert client.calls == ['small', 'large']
+    assert metrics.counters['cascade.small.errors'] >= 1
+
+
+def test_cascade_escalates_on_unparseable_answer_and_raises_on_the_last_tier():
+    client = StubClient({'small': lambda: 'not json', 'large': lambda: '{"ok": true}'})
+    cascade = ModelCascade(['small', 'large'], client)
+    assert cascade.run('prompt', parse=json.loads, accept=lambda answer: True) == ({'ok': True}, 'large')
+
+    client = StubClient({'small': lambda: 'not json', 'large': fail(LLMClientError('down'))})
+    with pytest.raises(LLMClientError):
+        ModelCascade(['small', 'large'], client).run('prompt', parse=json.loads, accept=lambda answer: True)
@@ -0,0 +1,51 @@
+import json
+
+import pandas as pd
+import pytest
+
+from extractors.llm_verification import LLMVerificationError, _verify_batch, _resolve_config
+from utils.llm_client import LLMClientError
+
+
+class ScriptedClient:
+    """Returns (or raises) the scripted responses in order"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def batch():
+    return pd.DataFrame({'Title': ['Approved!'], 'Body': ['720 score, $5k limit']}, index=[7])
+
+
+def answer(row_id):
+    return json.dumps([{'row_id': row_id, 'income_confidence': 10, 'credit_score_confidence': 90,
+                        'approval_amount_confidence': 80, 'suggested_corrections': [],
+                        'missing_data_suggestions': [], 'overall_quality_score': 70}])
+
+
+def test_unparseable_response_is_retried_once():
+    client = ScriptedClient('not json', answer(7))
+    results = _verify_batch(batch(), client, _resolve_config())
+    assert [result['row_id'] for result in results] == [7]
+    assert client.calls == 2
+
+    client = ScriptedClient('not json', 'still not json', answer(7))
+    with pytest.raises(LLMVerificationError):
+        _verify_batch(batch(), client, _resolve_config())
+    assert client.calls == 2
+
+
+def test_transport_errors_are_not_retried_again():
+    client = ScriptedClient(LLMClientError('LLM call failed after 3 attempts'), answer(7))
+    with pytest.raises(LLMClientError):
+        _verify_batch(batch(), client, _resolve_config())
+    assert client.calls == 1
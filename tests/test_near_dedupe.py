@@ -0,0 +1,31 @@
+import pandas as pd
+
+from utils.near_dedupe import NearDuplicateIndex, drop_near_duplicates, post_text
+
+STORY = ("Approved for the Freedom Unlimited with a 720 credit score and $65k income. "
+         "Started with a $5,000 limit after two years of history with Chase, no hard pulls in the last year.")
+
+
+def test_crosspost_with_small_edits_joins_the_first_posts_cluster(tmp_path):
+    index = NearDuplicateIndex()
+    assert index.add('a', post_text('CFU approved!', STORY)) is None
+    assert index.add('b', post_text('CFU approved!!', STORY + ' Edit: thanks all')) == 'a'
+    assert index.add('c', post_text('Denied for Sapphire', 'Too many new accounts, 5/24 got me.')) is None
+    assert index.clusters() == {'a': ['a', 'b']}
+
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    reloaded = NearDuplicateIndex.load(path)
+    assert reloaded.cluster_of('b') == 'a'
+    assert reloaded.query(post_text('CFU approved!', STORY))[0][0] == 'a'
+
+
+def test_drop_near_duplicates_keeps_each_card_row_of_the_first_post():
+    df = pd.DataFrame({
+        'URL': ['u1', 'u1', 'u2', 'u3'],
+        'Card_Name': ['Freedom Unlimited', 'Sapphire Preferred', 'Freedom Unlimited', 'Freedom Unlimited'],
+        'Title': ['Two approvals', 'Two approvals', 'Two approvals', 'Denied'],
+        'Body': [STORY, STORY, STORY, 'Denied for too many inquiries, reconsideration did not help.'],
+    })
+    kept, _ = drop_near_duplicates(df, group_column='Card_Name')
+    assert kept['URL'].tolist() == ['u1', 'u1', 'u3']
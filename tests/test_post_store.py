@@ -0,0 +1,33 @@
+from database.post_store import PostStore, STORE_COLUMNS, to_timestamp
+
+
+def row(post_id, created, card='Freedom Unlimited', decision='Approved', scraped_at='2024-06-30T00:00:00'):
+    values = {'Post_Id': post_id, 'Created_Utc': to_timestamp(created) if created else '', 'Title': f'post {post_id}',
+              'URL': f'https://reddit.com/r/CreditCards/comments/{post_id}/', 'Body': 'body', 'Source': 'Reddit-CreditCards',
+              'Card_Name': card, 'Decision': decision, 'Scraped_At': scraped_at, 'Rule_Version': 'v1'}
+    return [values[column] for column in STORE_COLUMNS]
+
+
+def test_rows_land_in_creation_month_and_reads_prune_partitions(tmp_path):
+    store = PostStore(str(tmp_path), index_file=None)
+    store.append([row('a', '2024-01-15'), row('b', '2024-02-10'), row('c', '2024-03-05'),
+                  row('d', None, scraped_at='2024-03-20T08:00:00')])
+
+    assert store.partitions() == ['2024-01', '2024-02', '2024-03']
+    assert store.prune('2024-02-20', '2024-03-01') == ['2024-02']
+    assert store.read('2024-02-20', '2024-04-01')['Post_Id'].tolist() == ['c', 'd']
+    assert store.read(end='2024-02-01')['Post_Id'].tolist() == ['a']
+
+
+def test_compaction_merges_parts_and_keeps_the_latest_row_per_key(tmp_path):
+    store = PostStore(str(tmp_path), index_file=None)
+    store.append([row('b', '2024-01-20')])
+    store.append([row('a', '2024-01-10')])
+    store.append([row('b', '2024-01-20', decision='Denied')])
+
+    report = store.compact()
+    assert (report['files_before'], report['files_after'], report['rows_dropped']) == (3, 1, 1)
+    assert len(store.part_files('2024-01')) == 1
+    df = store.read()
+    assert df['Post_Id'].tolist() == ['a', 'b']
+    assert df['Decision'].tolist() == ['Approved', 'Denied']
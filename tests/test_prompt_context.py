@@ -0,0 +1,29 @@
+from utils.prompt_context import GAP_MARKER, build_context, estimate_tokens
+
+FILLER = 'We went hiking over the weekend and the weather was lovely the whole time.'
+
+
+def test_short_bodies_are_sent_unchanged():
+    body = 'Approved for the Freedom Unlimited at 720.'
+    assert build_context(body, budget_tokens=100) == (body, estimate_tokens(body), estimate_tokens(body))
+    assert build_context(float('nan'))[0] == ''
+
+
+def test_long_body_keeps_relevant_sentences_in_order_within_budget():
+    body = ' '.join([FILLER] * 20 + [
+        'Background first.',
+        'Applied for the Chase Freedom Unlimited yesterday.',
+        'Got approved with a $6,000 limit and a 745 score.',
+    ] + [FILLER] * 20)
+
+    context, tokens_in, tokens_out = build_context(body, budget_tokens=60)
+    assert tokens_out <= 60 < tokens_in
+    assert context.index('Applied for the Chase') < context.index('Got approved with a $6,000')
+    assert context.startswith(GAP_MARKER.strip()) and context.endswith(GAP_MARKER.strip())
+
+
+def test_one_huge_sentence_falls_back_to_the_head():
+    body = 'approved ' * 400
+    context, _, tokens_out = build_context(body, budget_tokens=50)
+    assert context.startswith('approved approved') and context.endswith(GAP_MARKER.rstrip())
+    assert tokens_out <= 50
@@ -0,0 +1,17 @@
+from utils.card_registry import detect_cards
+from utils.proximity_index import attribute_decisions
+
+
+def test_generic_mention_is_credited_to_the_specific_card():
+    text = "got my cfu last year. my freedom was approved"
+    assert detect_cards(text) == ['Freedom Unlimited']
+    assert attribute_decisions(text) == [('Freedom Unlimited', 'Approved')]
+
+
+def test_generic_mention_without_a_specific_card_stays_generic():
+    assert attribute_decisions("my freedom was approved") == [('Freedom (Generic)', 'Approved')]
+
+
+def test_each_card_keeps_its_own_decision():
+    text = "approved for the cfu, denied for the freedom flex"
+    assert sorted(attribute_decisions(text)) == [('Freedom Flex', 'Denied'), ('Freedom Unlimited', 'Approved')]
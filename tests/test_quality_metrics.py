@@ -0,0 +1,19 @@
+import pandas as pd
+
+from extractors.quality_metrics import QualityMetricsStore
+
+
+def day_metrics(rows_by_day):
+    return pd.DataFrame({'rows': rows_by_day}).rename_axis('batch_date')
+
+
+def test_rerecorded_batch_replaces_every_day_of_the_old_recording(tmp_path):
+    store = QualityMetricsStore(str(tmp_path / 'quality.csv'))
+    store.append(day_metrics({'2024-01-01': 5, '2024-01-02': 3}), 'batch_a.csv')
+    store.append(day_metrics({'2024-01-01': 2}), 'batch_b.csv')
+    # batch_a re-run after a dedupe fix: its 2024-01-02 posts are gone
+    store.append(day_metrics({'2024-01-01': 4}), 'batch_a.csv')
+
+    by_day = store.totals(by_day=True)['rows'].to_dict()
+    assert by_day == {'2024-01-01': 6}
+    assert store.totals()['rows'].iloc[0] == 6
@@ -0,0 +1,31 @@
+import json
+import os
+
+from scrapers.query_planner import cover_with_rectangles, parse_phrase, plan_queries, subsumes
+
+CONFIG = os.path.join(os.path.dirname(__file__), '..', 'scraper_config.json')
+
+
+def test_subsumption_is_word_containment_of_every_term():
+    assert subsumes(parse_phrase('Freedom approved'), parse_phrase('Chase Freedom approved'))
+    assert subsumes(parse_phrase('Freedom approved'), parse_phrase('"Chase Freedom" approved'))
+    assert not subsumes(parse_phrase('Freedom approved'), parse_phrase('Freedom denied'))
+
+
+def test_card_by_outcome_grid_becomes_one_rectangle():
+    phrases = [parse_phrase(p) for p in ['CFU approved', 'CFU denied', 'CFF approved', 'CFF denied', 'CSP approved']]
+    rectangles = cover_with_rectangles(phrases, max_phrases=10)
+    assert rectangles[0].render() == '(CFF OR CFU) (approved OR denied)'
+    assert sorted(p for r in rectangles for p in r.phrases) == sorted(phrases)
+
+
+def test_plan_covers_every_phrase_within_the_limits():
+    with open(CONFIG) as f:
+        phrases = json.load(f)['search_phrases']
+    plan = plan_queries(phrases, max_length=200, max_phrases=4)
+
+    assert len(plan.queries) < len(set(phrases))
+    assert all(len(query.text) <= 200 and len(query.phrases) <= 4 for query in plan.queries)
+    covered = [phrase for query in plan.queries for phrase in query.phrases]
+    assert sorted(covered + list(plan.subsumed)) == sorted(set(phrases))
+    assert all(subsumes(parse_phrase(plan.subsumed[p]), parse_phrase(p)) for p in plan.subsumed)
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from extractors.schema import (
+    apply_schema, format_for_display, parse_int_column, parse_int_value, read_processed, MISSING_DISPLAY
+)
+
+
+def test_parse_int_column_handles_formatting_and_sentinels():
+    values = parse_int_column(pd.Series(['$5,000', '720.0', 'Not extracted', '', None, '7.5']))
+    assert str(values.dtype) == 'Int32'
+    assert values.tolist()[:2] == [5000, 720]
+    assert values.iloc[2:].isna().all()
+
+
+def test_values_too_large_for_int32_are_nulled_not_wrapped():
+    values = parse_int_column(pd.Series(['5000000000', '-5000000000', '60000']))
+    assert values.isna().tolist() == [True, True, False]
+    assert parse_int_value('5000000000') is None
+    assert parse_int_value(2 ** 31 - 1) == 2 ** 31 - 1
+
+
+def test_display_export_round_trips_to_the_typed_schema(tmp_path):
+    typed = apply_schema(pd.DataFrame({
+        'URL': ['a', 'b'],
+        'income_clean': [55000, None],
+        'approval_status': ['approved', 'denied'],
+        'is_student': ['Yes', 'No']
+    }))
+    display = format_for_display(typed)
+    assert display['income_clean'].tolist() == [55000, MISSING_DISPLAY]
+
+    path = tmp_path / 'out.csv'
+    display.to_csv(path, index=False)
+    restored = read_processed(path)
+    assert restored['income_clean'].tolist()[0] == 55000 and pd.isna(restored['income_clean'].iloc[1])
+    assert restored['is_student'].tolist() == [True, False]
+    assert str(restored['approval_status'].dtype) == 'category'
@@ -0,0 +1,44 @@
+import pytest
+
+from database.post_store import PostStore, STORE_COLUMNS, to_timestamp
+from database.search_index import SearchIndex, to_match_query
+
+
+def row(post_id, created, title, body, card='Freedom Unlimited'):
+    values = {'Post_Id': post_id, 'Created_Utc': to_timestamp(created), 'Title': title, 'URL': f'u/{post_id}',
+              'Body': body, 'Source': 'Reddit-CreditCards', 'Card_Name': card, 'Decision': 'Approved',
+              'Scraped_At': created, 'Rule_Version': 'v1'}
+    return [values[column] for column in STORE_COLUMNS]
+
+
+@pytest.fixture
+def index(tmp_path):
+    store = PostStore(str(tmp_path / 'posts'), index_file=str(tmp_path / 'search.db'))
+    store.append([
+        row('a', '2024-01-10', 'Denied under 5/24', 'Chase said too many new accounts.'),
+        row('a', '2024-01-10', 'Denied under 5/24', 'Chase said too many new accounts.', card='Freedom Flex'),
+        row('b', '2024-03-02', 'CFU pre-approved in branch', 'The banker showed a pre approved offer at 5/24.'),
+        row('c', '2024-03-05', 'Approved online', 'Instant approval, no branch visit needed.'),
+    ])
+    return SearchIndex(str(tmp_path / 'search.db'))
+
+
+def test_plain_queries_quote_every_term():
+    assert to_match_query('5/24 pre-approved') == '"5/24" "pre-approved"'
+    assert to_match_query('"in branch" OR') == '"in branch" "OR"'
+    assert to_match_query('  ""  ') == ''
+
+
+def test_search_ranks_title_matches_and_filters_by_time_and_card(index):
+    assert index.count() == 3
+    assert [hit.post_id for hit in index.search('5/24')] == ['a', 'b']
+    assert [hit.post_id for hit in index.search('5/24', start=to_timestamp('2024-02-01'))] == ['b']
+    assert [hit.post_id for hit in index.search('5/24', card='Freedom Flex')] == ['a']
+    assert index.search('5/24')[0].cards == 'Freedom Unlimited|Freedom Flex'
+    assert index.search('branch OR') == []
+
+
+def test_raw_queries_use_fts5_syntax_and_report_bad_syntax(index):
+    assert sorted(hit.post_id for hit in index.search('denied OR instant', raw=True)) == ['a', 'c']
+    with pytest.raises(ValueError, match='Invalid FTS5 query'):
+        index.search('pre-approved AND', raw=True)
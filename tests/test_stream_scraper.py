@@ -0,0 +1,51 @@
+import json
+
+from scrapers.stream_scraper import ReplayReddit, StreamState, stream_ingest
+
+
+class ListSink:
+    """Accepts every record; stands in for MasterSink"""
+
+    def __init__(self):
+        self.records = []
+
+    @property
+    def new_posts(self):
+        return len(self.records)
+
+    def accept(self, record):
+        self.records.append(record)
+        return True
+
+    def flush(self):
+        return 0
+
+    def full(self):
+        return False
+
+
+def write_posts(path, posts):
+    with open(path, 'w', encoding='utf-8') as f:
+        for post_id, created_utc, subreddit in posts:
+            f.write(json.dumps({'id': post_id, 'title': post_id, 'selftext': '', 'url': f'https://reddit.com/{post_id}',
+                                'created_utc': created_utc, 'subreddit': subreddit}) + '\n')
+    return str(path)
+
+
+def ingest(path, state):
+    sink = ListSink()
+    stream_ingest(ReplayReddit(path), ['CreditCards', 'Chase'], sink, state, flush_seconds=0)
+    return [record.title for record in sink.records]
+
+
+def test_restart_skips_replayed_posts_but_keeps_late_arrivals(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    first = write_posts(tmp_path / 'first.jsonl', [('a', 10_000, 'CreditCards'), ('b', 20_000, 'CreditCards')])
+    assert ingest(first, StreamState(state_file)) == ['a', 'b']
+
+    # On reconnect the stream replays a and b; c (from a slower subreddit) is older
+    # than b but within the grace window, old is far older and was never seen
+    second = write_posts(tmp_path / 'second.jsonl', [
+        ('old', 1_000, 'Chase'), ('a', 10_000, 'CreditCards'), ('c', 19_000, 'Chase'), ('b', 20_000, 'CreditCards')
+    ])
+    assert ingest(second, StreamState.load(state_file)) == ['c']
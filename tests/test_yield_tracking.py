@@ -0,0 +1,58 @@
+import itertools
+from threading import Lock
+
+from scrapers.ingest import IngestScheduler
+from scrapers.sources import PostRecord, SourceAdapter
+from scrapers.yield_tracker import YieldTracker
+
+TASKS = [('CreditCards', f'q{i}', 'new', 'month') for i in range(6)]
+
+
+class FreshPostsAdapter(SourceAdapter):
+    """Every task returns posts nobody has seen before"""
+    name = 'reddit'
+
+    def __init__(self, posts_per_task=50):
+        self.posts_per_task = posts_per_task
+        self.ids = itertools.count()
+
+    def tasks(self):
+        return list(TASKS)
+
+    def fetch(self, task):
+        for _ in range(self.posts_per_task):
+            post_id = str(next(self.ids))
+            yield PostRecord(post_id, 'reddit', 'Approved', '', f'https://reddit.com/comments/{post_id}')
+
+
+class BudgetSink:
+    def __init__(self, budget):
+        self.budget = budget
+        self.accepted = 0
+        self.lock = Lock()
+
+    def full(self):
+        return self.accepted >= self.budget
+
+    def accept(self, record):
+        with self.lock:
+            if self.full():
+                return False
+            self.accepted += 1
+            return True
+
+
+def test_tasks_cut_off_by_the_budget_are_not_pruned(tmp_path):
+    adapter = FreshPostsAdapter()
+    for _ in range(4):
+        tracker = YieldTracker.load(str(tmp_path / 'yield.json'))
+        tracker.start_run()
+        sink = BudgetSink(60)
+        IngestScheduler([adapter], max_workers=1, tracker=tracker).run(sink.accept, should_stop=sink.full)
+        tracker.save()
+
+    tracker = YieldTracker.load(str(tmp_path / 'yield.json'))
+    assert sorted(tracker.plan(TASKS)) == sorted(TASKS)
+    # Scored tasks were only credited with posts the sink had room for
+    for stats in tracker.stats.values():
+        assert stats.accepted == stats.returned